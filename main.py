@@ -1,9 +1,14 @@
 import streamlit as st
 import time
-from streamlit.components.v1 import html
+import uuid
+
+# Server time of this script run, for the page render timings
+RUN_STARTED = time.perf_counter()
 
 # Assuming these models exist; if not, they can be mocked or implemented as needed
-from models import quiz_gen, notes_maker
+from models import quiz_gen, notes_maker, quiz_pool, post_submit, adaptive_quiz, profile_store, quiz_state
+from utils import quiz_tracker, render_timing
+from utils.model import models
 import sys, os
 sys.path.append(os.path.dirname(__file__))
 
@@ -68,6 +73,9 @@ gate_cse_subjects = [
     "Computer Networks"
 ]
 
+# Keep pre-generated quizzes warm in the background (started once per server process)
+quiz_pool.start()
+
 # Dummy user profile for quiz generation
 dummy_user_profile = {
     "user_id": "test_user_01",
@@ -84,21 +92,39 @@ if "userdata" not in st.session_state:
     st.session_state.userdata = {}
 if "quiz_state" not in st.session_state:
     st.session_state.quiz_state = "none"
-if "quiz_data" not in st.session_state:
-    st.session_state.quiz_data = {}
+if "quiz" not in st.session_state:
+    st.session_state.quiz = None  # models.quiz_state.QuizState of the quiz being taken
 if "current_question_index" not in st.session_state:
     st.session_state.current_question_index = 0
 if "quiz_submitted" not in st.session_state:
     st.session_state.quiz_submitted = False
 if "start_time" not in st.session_state:
     st.session_state.start_time = time.time()
-if "last_question_switch_time" not in st.session_state:
-    st.session_state.last_question_switch_time = time.time()
-
-# Function to initialize quiz data with dummy if not set
-def initialize_quiz_data():
-    if not st.session_state.quiz_data:
-        st.session_state.quiz_data = {
+if "quiz_token" not in st.session_state:
+    st.session_state.quiz_token = uuid.uuid4().hex
+if "hint_nonce" not in st.session_state:
+    st.session_state.hint_nonce = 0
+if "flush_token" not in st.session_state:
+    st.session_state.flush_token = None
+if "quiz_stream" not in st.session_state:
+    st.session_state.quiz_stream = None
+if "post_submit" not in st.session_state:
+    st.session_state.post_submit = None
+if "adaptive" not in st.session_state:
+    st.session_state.adaptive = None
+if "disputed_questions" not in st.session_state:
+    st.session_state.disputed_questions = []
+if "user_id" not in st.session_state:
+    # Each browser session is its own student in the profile store
+    st.session_state.user_id = f"session_{uuid.uuid4().hex[:16]}"
+
+# Longest the submit waits for answer-key checks that are not cached yet
+ANSWER_CHECK_TIMEOUT_SECONDS = 15
+
+# Function to initialize the quiz with dummy data if not set
+def initialize_quiz():
+    if not st.session_state.quiz:
+        st.session_state.quiz = quiz_state.QuizState.from_quiz_data({
             "questions": [
                 {
                     "question_id": "DS_TREE_01",
@@ -141,21 +167,287 @@ def initialize_quiz_data():
                     "explanation": "2NF eliminates partial dependencies on the primary key."
                 }
             ]
-        }
-    for item in st.session_state.quiz_data["questions"]:
-        if 'user_answer_index' not in item:
-            item['user_answer_index'] = None
-        if 'status' not in item:
-            item['status'] = "unanswered"
-        if 'time_spent_seconds' not in item:
-            item['time_spent_seconds'] = 0.0
-
-# Utility function for time tracking
-def update_time_spent():
-    time_spent = time.time() - st.session_state.last_question_switch_time
-    previous_index = st.session_state.get('previous_question_index', st.session_state.current_question_index)
-    st.session_state.quiz_data["questions"][previous_index]['time_spent_seconds'] += time_spent
-    st.session_state.last_question_switch_time = time.time()
+        })
+
+# Start a quiz: take a ready one from the pool or the quiz cache, or stream a
+# new one and open it as soon as the first question is ready
+def start_quiz(quiz_info):
+    pooled_quiz = quiz_pool.pop(quiz_info) or quiz_gen.get_cached_quiz(dummy_user_profile, quiz_info)
+    if pooled_quiz is not None:
+        stream = None
+        questions = pooled_quiz["questions"]
+        quiz_title = pooled_quiz.get("quiz_title")
+    else:
+        stream = quiz_gen.start_quiz_stream(dummy_user_profile, quiz_info)
+        with st.spinner("Please Wait"):
+            stream.wait_for_first()
+        questions = []
+        stream.drain_into(questions)
+        quiz_title = None
+    if not questions:
+        st.error(stream.error or "AI returned an empty or invalid quiz structure. Please try again.")
+        return
+    open_quiz(quiz_title, questions, stream=stream)
+
+# Start an adaptive quiz: questions come one at a time from the question bank,
+# each chosen for the student's current ability estimate
+def start_adaptive_quiz(quiz_info):
+    stored = profile_store.get_profile(st.session_state.user_id)
+    user_profile = profile_store.thaw(stored.data) if stored else dummy_user_profile
+    with st.spinner("Please Wait"):
+        session = adaptive_quiz.start_session(user_profile, quiz_info, max_questions=quiz_info["Num ques"])
+        question = session.next_question()
+    if question is None:
+        st.error("Not enough questions in the bank for these subjects yet. Try a regular quiz first.")
+        return
+    open_quiz("Adaptive Quiz", [question], adaptive=session)
+
+def open_quiz(quiz_title, questions, stream=None, adaptive=None):
+    # Answers, grades and timings live in the QuizState arrays, not in the question dicts
+    st.session_state.quiz = quiz_state.QuizState(quiz_title, questions)
+    st.session_state.quiz_stream = stream
+    st.session_state.adaptive = adaptive
+    st.session_state.current_question_index = 0
+    st.session_state.quiz_submitted = False
+    st.session_state.start_time = time.time()
+    st.session_state.quiz_token = uuid.uuid4().hex  # Fresh browser-side timings for this attempt
+    st.session_state.flush_token = None
+    st.session_state.disputed_questions = []
+    st.session_state.current_page = "quiz_take"
+    st.rerun()
+
+# Move questions that finished streaming into the quiz
+def sync_quiz_stream():
+    stream = st.session_state.quiz_stream
+    if stream is None:
+        return
+    done = stream.is_done()  # Checked before draining so the last questions are not missed
+    arrived = []
+    stream.drain_into(arrived)
+    st.session_state.quiz.extend(arrived)
+    if done:
+        if stream.quiz_title:
+            st.session_state.quiz.quiz_title = stream.quiz_title
+        st.session_state.quiz_stream = None
+
+def stop_quiz_stream():
+    if st.session_state.quiz_stream is not None:
+        st.session_state.quiz_stream.cancel()
+        st.session_state.quiz_stream = None
+
+# Polls the background generation and reruns the page when new questions arrive
+@st.fragment(run_every=1)
+def watch_quiz_stream():
+    stream = st.session_state.quiz_stream
+    if stream is None:
+        return
+    if stream.has_new() or stream.is_done():
+        st.rerun()
+    st.caption("⏳ More questions are on the way...")
+
+# Results sections filled in by the post-submit pipeline
+def render_notes(pipeline):
+    if pipeline.notes_future.exception() is not None:
+        st.error("Error: Could not generate notes at this time.")
+    else:
+        st.markdown(pipeline.notes.text())
+
+def render_profile_update(pipeline):
+    try:
+        result = pipeline.metrics.result()
+    except Exception as e:
+        print(f"ERROR: Profile update failed: {e}")
+        result = {"error": "Could not update your profile at this time."}
+    if "error" in result:
+        st.info(result["error"])
+        # Fall back to the demo profile so the section is never empty
+        weaknesses = dummy_user_profile["cognitive_skill_weaknesses"]
+        mastery = dummy_user_profile["mastery_scores"]
+        st.write("Based on your performance:")
+        st.write(f"- Weaknesses identified: {', '.join(weaknesses)}")
+        for topic, score in mastery.items():
+            st.write(f"- Mastery in {topic}: {score}%")
+        st.info("Recommendations: Focus on multi-step analytical problems and revise Dynamic Programming concepts.")
+        return
+    updated = result["updated_profile_data"]
+    st.write("Based on your performance:")
+    for topic, score in updated.get("mastery_scores", {}).items():
+        st.write(f"- Mastery in {topic}: {score:.1f}%")
+    for skill, score in updated.get("cognitive_skill_fingerprint", {}).items():
+        st.write(f"- {skill}: {score:.1f}%")
+    try:
+        st.info(pipeline.insight.result())
+    except Exception as e:
+        print(f"ERROR: AI insight generation failed: {e}")
+        st.info("Could not generate AI insight at this time.")
+
+# While a section is pending, poll it; once it finishes, one full rerun renders it statically
+@st.fragment(run_every=0.5)
+def live_notes(pipeline):
+    if pipeline.notes_future.done():
+        st.rerun()
+    text = pipeline.notes.text()
+    if text:
+        st.markdown(text)
+    else:
+        st.caption("✍️ Your personal tutor is writing your notes...")
+
+@st.fragment(run_every=0.5)
+def live_profile_update(pipeline):
+    if pipeline.metrics.done() and pipeline.insight.done():
+        st.rerun()
+    st.caption("🧠 Updating your profile...")
+
+# Adaptive quizzes: score the current answer and fetch the next question
+def on_adaptive_next():
+    session = st.session_state.adaptive
+    quiz = st.session_state.quiz
+    last = len(quiz) - 1
+    session.record_answer(quiz.question(last), quiz.answer(last))
+    question = session.next_question()
+    if question is not None:
+        st.session_state.current_question_index = quiz.append(question)
+    st.session_state.palette_stale = True
+
+# The question panel (with the progress bar) and the palette are fragments:
+# changing an answer or opening a hint reruns only the panel instead of the
+# whole script. The palette only changes when a question becomes answered or
+# unanswered or the current question moves; those callbacks flag it, and the
+# panel then reruns the page once so the palette redraws.
+def on_answer_change(index, key):
+    quiz = st.session_state.quiz
+    if quiz.answer(index) is None:
+        st.session_state.palette_stale = True
+    quiz.set_answer(index, st.session_state[key])
+
+def on_clear_answer(index, key):
+    st.session_state.quiz.set_answer(index, None)
+    st.session_state.pop(key, None)  # Recreate the radio with nothing selected
+    st.session_state.palette_stale = True
+
+def on_nav_button_click(direction):
+    st.session_state.current_question_index += direction
+    st.session_state.palette_stale = True
+
+def on_hint_click(index):
+    st.session_state.quiz.mark_hint_used(index)
+    st.session_state.hint_nonce += 1
+
+# Submit first asks the browser for its latest timings; the dialog opens once they arrive
+def on_submit_click():
+    st.session_state.flush_token = uuid.uuid4().hex
+
+@st.fragment
+def question_panel():
+    if st.session_state.pop("palette_stale", False):
+        st.rerun()  # The whole page, so the palette shows the new marks
+    with render_timing.measure("quiz_take: question panel"):
+        quiz = st.session_state.quiz
+        total_questions = len(quiz)
+        answered_questions = quiz.answered_count()
+        st.progress(answered_questions / total_questions, text=f"{answered_questions} of {total_questions} Answered")
+        st.write("---")
+
+        index = st.session_state.current_question_index
+        question_data = quiz.question(index)
+        user_answer_index = quiz.answer(index)
+        adaptive = st.session_state.adaptive
+        # In an adaptive quiz an answer is final once the next question was chosen from it
+        locked = adaptive is not None and index < total_questions - 1
+        radio_key = f"q_{question_data.question_id}"
+
+        # Live clock plus per-question focus time, hint views and answer changes, measured in the browser
+        batch = quiz_tracker.quiz_tracker(
+            st.session_state.quiz_token,
+            str(question_data.question_id),
+            user_answer_index,
+            st.session_state.hint_nonce,
+            st.session_state.start_time,
+            flush_token=st.session_state.flush_token,
+        )
+        submit_ready = False
+        if batch and batch.get("token") == st.session_state.quiz_token:
+            quiz_tracker.apply_batch(quiz, batch)
+            if st.session_state.flush_token and batch.get("ack") == st.session_state.flush_token:
+                st.session_state.flush_token = None
+                submit_ready = True
+
+        with st.container(border=True):
+            st.subheader(f"Question {index + 1}")
+            st.markdown(f"**{question_data.question_text}**")
+
+            st.radio(
+                "Choose your answer:",
+                options=range(len(question_data.options)),
+                format_func=lambda i: question_data.options[i],
+                index=user_answer_index,
+                key=radio_key,
+                disabled=locked,
+                on_change=on_answer_change,
+                args=(index, radio_key)
+            )
+
+            hint, clr = st.columns(2)
+            if user_answer_index is not None and not locked:
+                clr.button("Clear Selection 🗑️", on_click=on_clear_answer, args=(index, radio_key))
+            st.write("")
+            if hint.button("💡 Hint", on_click=on_hint_click, args=(index,)):
+                st.info(question_data.hint)
+
+        st.write("---")
+
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("⬅️ Previous", use_container_width=True, disabled=(index == 0), on_click=on_nav_button_click, args=(-1,))
+
+        with col3:
+            if adaptive is not None and index == total_questions - 1:
+                if adaptive.is_finished():
+                    st.success("Your level is measured. Submit to see your results!")
+                else:
+                    st.button("Next ➡️", use_container_width=True, disabled=(user_answer_index is None), on_click=on_adaptive_next)
+            else:
+                st.button("Next ➡️", use_container_width=True, disabled=(index >= total_questions - 1), on_click=on_nav_button_click, args=(1,))
+
+        st.write("")
+
+        st.button("Submit Quiz ✅", type="primary", use_container_width=True, on_click=on_submit_click)
+        if submit_ready:
+            confirm_submit()
+        elif st.session_state.flush_token:
+            st.caption("⏳ Saving your question timings...")
+            if st.button("Submit without timings"):
+                confirm_submit()
+
+# Jumping to a question changes the panel too, so a palette click reruns the page
+@st.fragment
+def question_palette():
+    with render_timing.measure("quiz_take: palette"):
+        st.subheader("Question Palette")
+        answered = st.session_state.quiz.answered_mask()
+        current = st.session_state.current_question_index
+        cols = st.columns(2)
+        for i, is_answered in enumerate(answered):
+            label = f"✅ Q {i+1}" if is_answered else f"Q {i+1}"
+            with cols[i % 2]:
+                if i == current:
+                    st.button(label, key=f"nav_{i}", use_container_width=True, type="primary")
+                elif st.button(label, key=f"nav_{i}", use_container_width=True):
+                    st.session_state.current_question_index = i
+                    st.rerun()
+
+# Answer keys are checked before grading. Generated questions were usually
+# checked in the background already, so their verdicts come from the cache.
+def verify_answer_keys(quiz):
+    verdicts = models.Verify_Quiz(quiz.questions, timeout=ANSWER_CHECK_TIMEOUT_SECONDS)
+    disputed = []
+    for i, verdict in enumerate(verdicts):
+        if verdict["status"] == "corrected":
+            options = [str(option) for option in quiz.question(i).options]
+            quiz.set_correct_answer(i, options.index(verdict["answer"]))
+        elif verdict["status"] == "disputed":
+            disputed.append(i)
+    return disputed
 
 # Confirmation dialog for submission
 @st.dialog("Are you sure you want to submit?")
@@ -164,12 +456,19 @@ def confirm_submit():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("✅ Yes, Submit"):
-            update_time_spent()
-            for q in st.session_state.quiz_data["questions"]:
-                if q['user_answer_index'] == q['correct_answer_index']:
-                    q['status'] = 'correct'
-                else:
-                    q['status'] = 'incorrect'
+            stop_quiz_stream()  # Grade only the questions the student has seen
+            quiz = st.session_state.quiz
+            if st.session_state.adaptive is not None:
+                # The last adaptive question was only picked, not asked; drop it if unanswered
+                if len(quiz) > 1 and quiz.answer(len(quiz) - 1) is None:
+                    quiz.pop()
+                    st.session_state.current_question_index = min(st.session_state.current_question_index, len(quiz) - 1)
+                st.session_state.adaptive = None
+            with st.spinner("Checking the answer keys..."):
+                st.session_state.disputed_questions = verify_answer_keys(quiz)
+            quiz.grade()
+            # Notes, profile metrics and insight start now, in parallel, while the results render
+            st.session_state.post_submit = post_submit.launch(quiz.to_quiz_data(), st.session_state.user_id)
             st.session_state.quiz_submitted = True
             st.rerun()
     with col2:
@@ -225,27 +524,23 @@ elif st.session_state.current_page == "quiz_design":
     st.header("Clurious")
     st.subheader("Design Your Custom Quiz")
 
-    x,y = st.tabs(["Full Syllabus","Custom"])
+    x,y,z = st.tabs(["Full Syllabus","Custom","Adaptive"])
 
     with x:
     # if quiz_type == "Full Syllabus":
         with st.form("full_syllabus_form"):
-            numberQues_full = st.number_input("Number of Questions", min_value=1, max_value=5, value=5, help="Number of Question can be maximum 5")
+            numberQues_full = st.number_input("Number of Questions", min_value=1, max_value=65, value=5, help="Up to 65 questions (a full GATE mock)")
             Mode = st.select_slider("Select the Level of Quiz", ["Easy", "Medium", "Hard"], value="Medium")
             if st.form_submit_button("🚀 Generate Full Syllabus Quiz"):
                 st.success("Quiz parameters received! Generating your quiz...")
                 quiz_info = {"subject/topic": "Full Syllabus Gate cse", "Num ques": numberQues_full, "difficulty": Mode}
-                with st.spinner("Please Wait"):
-                    st.session_state.quiz_data = quiz_gen.generate_quiz(dummy_user_profile, quiz_info)
-                st.session_state.current_page = "quiz_take"
-                initialize_quiz_data()  # Ensure initialization
-                st.rerun()
+                start_quiz(quiz_info)
 
     # elif quiz_type == "Custom":
     with y:
         with st.form("custom_quiz_form"):
             subject_name = st.multiselect("Choose Subjects", gate_cse_subjects, help="You can select Multiple Subjects")
-            numberQues_custom = st.number_input("Number of Questions", min_value=1, max_value=5, value=5, help="Number of Question can be maximum 5")
+            numberQues_custom = st.number_input("Number of Questions", min_value=1, max_value=65, value=5, help="Up to 65 questions (a full GATE mock)")
             Mode = st.select_slider("Select the Level of Quiz", ["Easy", "Medium", "Hard"], value="Medium")
             if st.form_submit_button("🚀 Generate Custom Quiz"):
                 if not subject_name:
@@ -253,18 +548,24 @@ elif st.session_state.current_page == "quiz_design":
                 else:
                     st.success("Quiz parameters received! Generating your quiz...")
                     quiz_info = {"subject/topic": subject_name, "Num ques": numberQues_custom, "difficulty": Mode}
-                    with st.spinner("Please Wait"):
-                        st.session_state.quiz_data = quiz_gen.generate_quiz(dummy_user_profile, quiz_info)
-                    st.session_state.current_page = "quiz_take"
-                    initialize_quiz_data()  # Ensure initialization
-                    st.rerun()
+                    start_quiz(quiz_info)
+
+    with z:
+        with st.form("adaptive_quiz_form"):
+            st.caption("Each question is picked for your current level, and the quiz ends as soon as your level is measured precisely.")
+            subject_adaptive = st.multiselect("Choose Subjects", gate_cse_subjects, help="Leave empty for the full syllabus", key="adaptive_subjects")
+            maxQues_adaptive = st.number_input("Maximum Questions", min_value=adaptive_quiz.MIN_QUESTIONS, max_value=65, value=adaptive_quiz.MAX_QUESTIONS)
+            if st.form_submit_button("🎯 Start Adaptive Quiz"):
+                quiz_info = {"subject/topic": subject_adaptive or "Full Syllabus Gate cse", "Num ques": maxQues_adaptive, "difficulty": "Medium"}
+                start_adaptive_quiz(quiz_info)
 
     if st.button("Back to Home"):
         st.session_state.current_page = "home"
         st.rerun()
 
 elif st.session_state.current_page == "quiz_take":
-    initialize_quiz_data()
+    initialize_quiz()
+    sync_quiz_stream()
 
     if st.session_state.quiz_submitted:
         st.session_state.current_page = "results"
@@ -275,116 +576,22 @@ elif st.session_state.current_page == "quiz_take":
         st.title("Clurious Navigator")
         st.write("---")
 
-        st.subheader("Time Elapsed")
-        st.markdown("<div id='live-timer' class='live-display' style='font-size: 1.75rem; font-weight: 600;'>00:00</div>", unsafe_allow_html=True)
-
-        start_time_ms = int(st.session_state.start_time * 1000)
-        live_update_js = f"""
-        <script>
-        var startTime = {start_time_ms};
-        function updateTimer() {{
-            var now = new Date().getTime();
-            var distance = now - startTime;
-            var minutes = Math.floor((distance % (1000 * 60 * 60)) / (1000 * 60));
-            var seconds = Math.floor((distance % (1000 * 60)) / 1000);
-            
-            minutes = minutes < 10 ? "0" + minutes : minutes;
-            seconds = seconds < 10 ? "0" + seconds : seconds;
-
-            var timerElement = window.parent.document.getElementById('live-timer');
-            if (timerElement) {{
-                timerElement.textContent = minutes + ":" + seconds;
-            }}
-            setTimeout(updateTimer, 1000);
-        }}
-        
-        updateTimer();
-        </script>
-        """
-        html(live_update_js, height=0)
-
-        total_questions = len(st.session_state.quiz_data["questions"])
-        answered_questions = sum(1 for q in st.session_state.quiz_data["questions"] if q['user_answer_index'] is not None)
+        question_palette()
 
-        st.subheader("Question Palette")
-        
-        cols = st.columns(2)
-        for i in range(total_questions):
-            with cols[i % 2]:
-                q_data = st.session_state.quiz_data["questions"][i]
-                def on_nav_click(new_index):
-                    st.session_state.previous_question_index = st.session_state.current_question_index
-                    update_time_spent()
-                    st.session_state.current_question_index = new_index
-
-                if st.session_state.current_question_index == i:
-                    if q_data['user_answer_index'] is not None:
-                        st.button(f"✅ Q {i+1}", key=f"nav_{i}", use_container_width=True, type="primary")
-                    else:
-                        st.button(f"Q {i+1}", key=f"nav_{i}", use_container_width=True, type="primary")
-                elif q_data['user_answer_index'] is not None:
-                    st.button(f"✅ Q {i+1}", key=f"nav_{i}", use_container_width=True, on_click=on_nav_click, args=(i,))
-                else:
-                    st.button(f"Q {i+1}", key=f"nav_{i}", use_container_width=True, on_click=on_nav_click, args=(i,))
+        if st.session_state.quiz_stream is not None:
+            watch_quiz_stream()
 
         st.write("---")
         if st.button("Exit Quiz 🚪", use_container_width=True):
+            stop_quiz_stream()
+            st.session_state.adaptive = None
             st.session_state.current_page = "home"
             st.rerun()
 
     # Main quiz content
     st.title("Clurious Micro-Quiz")
-    st.progress(answered_questions / total_questions, text=f"{answered_questions} of {total_questions} Answered")
-    st.write("---")
-
-    index = st.session_state.current_question_index
-    question_data = st.session_state.quiz_data["questions"][index]
-    
-    with st.container(border=True):
-        st.subheader(f"Question {index + 1}")
-        st.markdown(f"**{question_data['question_text']}**")
-
-        user_answer_index = st.radio(
-            "Choose your answer:",
-            options=range(len(question_data['options'])),
-            format_func=lambda i: question_data['options'][i],
-            index=question_data['user_answer_index'],
-            key=f"q_{question_data['question_id']}"
-        )
-        
-        if user_answer_index is not None and st.session_state.quiz_data["questions"][index]['user_answer_index'] != user_answer_index:
-            st.session_state.quiz_data["questions"][index]['user_answer_index'] = user_answer_index
-            st.rerun()
-
-        hint, clr = st.columns(2)
-        if question_data['user_answer_index'] is not None:
-            if clr.button("Clear Selection 🗑️"):
-                st.session_state.quiz_data["questions"][index]['user_answer_index'] = None
-                st.rerun()
-        st.write("")
-        if hint.button("💡 Hint"):
-            st.info(question_data['hint'])
-
-    st.write("---")
-
-    def on_nav_button_click(direction):
-        st.session_state.previous_question_index = st.session_state.current_question_index
-        update_time_spent()
-        st.session_state.current_question_index += direction
-
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col1:
-        if st.button("⬅️ Previous", use_container_width=True, disabled=(index == 0), on_click=on_nav_button_click, args=(-1,)):
-            pass
-
-    with col3:
-        if st.button("Next ➡️", use_container_width=True, disabled=(index >= total_questions - 1), on_click=on_nav_button_click, args=(1,)):
-            pass
-    
-    st.write("")
-    
-    if st.button("Submit Quiz ✅", type="primary", use_container_width=True):
-        confirm_submit()
+    question_panel()
+    render_timing.record_since("quiz_take: full run", RUN_STARTED)
 
 elif st.session_state.current_page == "results":
     st.title("🏆 Clurious Quiz Results")
@@ -395,15 +602,16 @@ elif st.session_state.current_page == "results":
             st.session_state.quiz_submitted = False
             st.rerun()
 
-    correct_answers = sum(1 for q in st.session_state.quiz_data["questions"] if q['status'] == 'correct')
-    score = (correct_answers / len(st.session_state.quiz_data["questions"])) * 100
-    total_time = sum(q['time_spent_seconds'] for q in st.session_state.quiz_data['questions'])
+    quiz = st.session_state.quiz
+    correct_answers = quiz.correct_count()
+    score = (correct_answers / len(quiz)) * 100
+    total_time = quiz.total_time()
 
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("Final Score", f"{score:.2f}%")
     with col2:
-        st.metric("Correct Answers", f"{correct_answers} / {len(st.session_state.quiz_data['questions'])}")
+        st.metric("Correct Answers", f"{correct_answers} / {len(quiz)}")
     with col3:
         st.metric("Total Time", f"{int(total_time // 60)}m {int(total_time % 60)}s")
 
@@ -411,34 +619,40 @@ elif st.session_state.current_page == "results":
 
     st.write("---")
     st.subheader("Detailed Review:")
-    for i, q in enumerate(st.session_state.quiz_data["questions"]):
-        with st.expander(f"**Question {i+1}: { 'Correct ✅' if q['status'] == 'correct' else 'Incorrect ❌'}**"):
-            st.markdown(f"**{q['question_text']}**")
-            user_answer = q['options'][q['user_answer_index']] if q['user_answer_index'] is not None else "Not Answered"
-            correct_answer = q['options'][q['correct_answer_index']]
+    for i, q in enumerate(quiz.questions):
+        status = quiz.status(i)
+        with st.expander(f"**Question {i+1}: { 'Correct ✅' if status == 'correct' else 'Incorrect ❌'}**"):
+            st.markdown(f"**{q.question_text}**")
+            answer_index = quiz.answer(i)
+            user_answer = q.options[answer_index] if answer_index is not None else "Not Answered"
+            correct_answer = q.options[q.correct_answer_index]
             
-            time_spent = q['time_spent_seconds']
+            time_spent = quiz.seconds_spent(i)
             st.caption(f"Time spent on this question: {int(time_spent // 60)}m {int(time_spent % 60)}s")
 
-            if q['status'] == 'correct':
+            if status == 'correct':
                 st.success(f"✔️ Your answer: {user_answer}")
             else:
                 st.error(f"❌ Your answer: {user_answer}")
                 st.info(f"💡 Correct answer: {correct_answer}")
 
-            st.write(q["explanation"])
+            st.write(q.explanation)
+            if i in st.session_state.disputed_questions:
+                st.warning("⚠️ An independent check of this question picked a different answer. It is under review.")
+
+    pipeline = st.session_state.post_submit
+    if pipeline is None:  # Results opened without a fresh submit (e.g. after a restart)
+        pipeline = st.session_state.post_submit = post_submit.launch(quiz.to_quiz_data(), st.session_state.user_id)
 
     st.write("---")
     st.subheader("Personalized Notes and Analysis")
-    st.write(notes_maker.generate_notes(st.session_state.quiz_data))
+    if pipeline.notes_future.done():
+        render_notes(pipeline)
+    else:
+        live_notes(pipeline)
 
-    # Proper user analysis (cognitive analysis placeholder)
     st.subheader("Cognitive Skill Analysis")
-    # This can be expanded with actual analysis logic based on quiz_data
-    weaknesses = dummy_user_profile["cognitive_skill_weaknesses"]
-    mastery = dummy_user_profile["mastery_scores"]
-    st.write("Based on your performance:")
-    st.write(f"- Weaknesses identified: {', '.join(weaknesses)}")
-    for topic, score in mastery.items():
-        st.write(f"- Mastery in {topic}: {score}%")
-    st.info("Recommendations: Focus on multi-step analytical problems and revise Dynamic Programming concepts.")
+    if pipeline.metrics.done() and pipeline.insight.done():
+        render_profile_update(pipeline)
+    else:
+        live_profile_update(pipeline)
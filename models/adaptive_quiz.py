@@ -0,0 +1,263 @@
+import random
+
+import numpy as np
+
+from models import question_bank, quiz_gen
+
+# --- 1. Configuration ---
+# Abilities are on the usual IRT logit scale: 0 is an average student, +-2
+# is very strong/weak. Each one is kept as a posterior over this grid.
+ABILITY_GRID = np.linspace(-4.0, 4.0, 81)
+PRIOR_THETA = 0.0
+PRIOR_SE = 1.0
+ABILITY_DRIFT_SE = 0.15  # Uncertainty added to a stored ability per quiz, since students keep learning
+
+# Item parameters by difficulty tag (3PL). GUESSING = 0 gives the 2PL model.
+DIFFICULTY_LOCATION = {"easy": -1.0, "medium": 0.0, "hard": 1.0}
+DISCRIMINATION = 1.7  # a = 1 on the normal-ogive scale (the usual D = 1.7 folded in)
+GUESSING = 0.25  # Chance of guessing a 4-option MCQ
+
+TARGET_SE = 0.5          # Stop once every topic asked is measured this precisely...
+MIN_QUESTIONS = 3        # ...but not before this many questions
+MAX_QUESTIONS = 20
+MIN_UNSEEN_ITEMS = 10    # Below this the bank is topped up with one generated batch
+
+
+# --- 2. The IRT Model ---
+def item_parameters(difficulties: list) -> tuple:
+    """Discrimination a, difficulty b and guessing c arrays for items with the given difficulty tags."""
+    b = np.array([DIFFICULTY_LOCATION.get(str(d or "medium").lower(), 0.0) for d in difficulties], dtype=np.float64)
+    return np.full(len(b), DISCRIMINATION), b, np.full(len(b), GUESSING)
+
+
+def probability(theta, a, b, c):
+    """P(correct) of a student of ability `theta` on items (a, b, c)."""
+    return c + (1.0 - c) / (1.0 + np.exp(-a * (theta - b)))
+
+
+def information(theta, a, b, c):
+    """Fisher information of items (a, b, c) at ability `theta`."""
+    p = probability(theta, a, b, c)
+    return a ** 2 * ((1.0 - p) / p) * ((p - c) / (1.0 - c)) ** 2
+
+
+class AbilityPosterior:
+    """
+    Posterior over one student's ability in one topic, on ABILITY_GRID.
+    Each answer multiplies in its likelihood, so the estimate (the
+    posterior mean) and its standard error are updated online.
+    """
+
+    __slots__ = ("log_density",)
+
+    def __init__(self, theta: float = PRIOR_THETA, se: float = PRIOR_SE):
+        self.log_density = -0.5 * ((ABILITY_GRID - theta) / se) ** 2
+
+    def observe(self, a, b, c, correct):
+        """Adds the answers to items (a, b, c); `correct` is a bool per item."""
+        p = probability(ABILITY_GRID[:, None], np.atleast_1d(a), np.atleast_1d(b), np.atleast_1d(c))
+        self.log_density += np.where(np.atleast_1d(correct), np.log(p), np.log1p(-p)).sum(axis=1)
+        self.log_density -= self.log_density.max()
+
+    def _weights(self) -> np.ndarray:
+        weights = np.exp(self.log_density)
+        return weights / weights.sum()
+
+    @property
+    def theta(self) -> float:
+        return float(self._weights() @ ABILITY_GRID)
+
+    @property
+    def se(self) -> float:
+        weights = self._weights()
+        mean = weights @ ABILITY_GRID
+        return float(np.sqrt(weights @ (ABILITY_GRID - mean) ** 2))
+
+    def as_dict(self) -> dict:
+        return {"theta": round(self.theta, 3), "se": round(self.se, 3)}
+
+
+def prior_for(abilities: dict, topic: str) -> AbilityPosterior:
+    """Starting posterior for a topic: the stored estimate, widened by ABILITY_DRIFT_SE."""
+    stored = abilities.get(topic)
+    if not stored:
+        return AbilityPosterior()
+    return AbilityPosterior(stored["theta"], float(np.hypot(stored["se"], ABILITY_DRIFT_SE)))
+
+
+def update_abilities(abilities: dict, attempt: dict) -> dict:
+    """
+    Folds the answered questions of one graded attempt (or attempt-log
+    record) into the per-topic abilities of a profile. Skipped questions
+    carry no information and are ignored.
+
+    Returns:
+        dict: The new {topic: {"theta", "se"}} map (the input is not modified).
+    """
+    by_topic = {}
+    for q in attempt.get("questions", []):
+        tags = q.get("tags") if isinstance(q.get("tags"), dict) else {}
+        if tags.get("topic") and q.get("status") in ("correct", "incorrect"):
+            by_topic.setdefault(tags["topic"], []).append((tags.get("difficulty"), q["status"] == "correct"))
+    result = dict(abilities)
+    for topic, answers in by_topic.items():
+        posterior = prior_for(abilities, topic)
+        difficulties, correct = zip(*answers)
+        posterior.observe(*item_parameters(difficulties), np.array(correct))
+        result[topic] = posterior.as_dict()
+    return result
+
+
+# --- 3. Item Pool ---
+class ItemPool:
+    """
+    The bank questions a session can ask, as parallel NumPy arrays (id,
+    topic, a, b, c). Choosing the next item is one vectorized pass over
+    them; question payloads are loaded only for the items actually asked.
+    """
+
+    def __init__(self, subjects: list = None):
+        ids, topics, difficulties = [], [], []
+        for subject in subjects or [None]:
+            subject_ids, subject_topics, subject_difficulties = question_bank.BANK.item_tags(subject)
+            for item_id, topic, difficulty in zip(subject_ids, subject_topics, subject_difficulties):
+                if topic:  # Untagged questions cannot be attributed to an ability
+                    ids.append(item_id)
+                    topics.append(topic)
+                    difficulties.append(difficulty)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.topic_names, self.topic_index = np.unique(np.array(topics, dtype=object), return_inverse=True)
+        self.a, self.b, self.c = item_parameters(difficulties)
+        self.available = np.ones(len(ids), dtype=bool)
+        self._position = {item_id: i for i, item_id in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return int(self.available.sum())
+
+    def position(self, item_id: int):
+        return self._position.get(item_id)
+
+    def best(self, theta: np.ndarray, variance: np.ndarray, rng: random.Random):
+        """
+        Index of the most informative available item, given each topic's
+        current ability estimate and its variance, or None if the pool is
+        used up.
+
+        Within a topic this is the item with maximum Fisher information at
+        the current estimate. Across topics, information is weighted by how
+        much it would shrink that topic's posterior variance
+        (I*v^2 / (1 + I*v)), so the least certain topic is measured first.
+        Ties (same topic and parameters) are broken at random, so students
+        do not all get the same questions.
+        """
+        if not self.available.any():
+            return None
+        topic_variance = variance[self.topic_index]
+        info = information(theta[self.topic_index], self.a, self.b, self.c)
+        gain = np.where(self.available, info * topic_variance ** 2 / (1.0 + info * topic_variance), -np.inf)
+        best = np.flatnonzero(gain >= gain.max() - 1e-12)
+        return int(best[rng.randrange(len(best))])
+
+
+# --- 4. The Adaptive Session ---
+def _subjects_of(quiz_ask: dict) -> list:
+    requested = quiz_ask.get("subject/topic")
+    return list(requested) if isinstance(requested, list) else []
+
+
+class AdaptiveSession:
+    """
+    One computerized adaptive test. Starts from the student's stored
+    per-topic abilities, asks the most informative bank question next,
+    re-estimates after every answer, and stops once each topic it asked
+    about is measured to TARGET_SE (or after `max_questions`).
+
+    Questions come from the local bank, so a session makes no LLM call at
+    all unless the bank has too few questions for the chosen subjects.
+    """
+
+    def __init__(self, user_profile: dict, quiz_ask: dict, max_questions: int = MAX_QUESTIONS,
+                 target_se: float = TARGET_SE, rng: random.Random = None):
+        self.quiz_ask = quiz_ask
+        self.max_questions = max_questions
+        self.target_se = target_se
+        self.rng = rng or random.Random()
+        self.generations = 0
+        self.pool = ItemPool(_subjects_of(quiz_ask))
+        if len(self.pool) < MIN_UNSEEN_ITEMS:
+            self._top_up(user_profile)
+
+        abilities = user_profile.get("topic_abilities", {})
+        self.posteriors = [prior_for(abilities, topic) for topic in self.pool.topic_names]
+        self.theta = np.array([p.theta for p in self.posteriors])
+        self.variance = np.array([p.se for p in self.posteriors]) ** 2
+        self.asked = []  # Pool index of every question asked, in order
+        self.answered = 0
+
+    def _top_up(self, user_profile: dict):
+        """Generates one batch of questions for the subjects into the bank."""
+        print(f"LOG: Only {len(self.pool)} bank questions for this adaptive quiz; generating more.")
+        try:
+            quiz_gen.generate_quiz(user_profile, {**self.quiz_ask, "Num ques": MIN_UNSEEN_ITEMS}, use_cache=False)
+            self.generations += 1
+        except Exception as e:
+            print(f"ERROR: Could not top up the question bank: {e}")
+        self.pool = ItemPool(_subjects_of(self.quiz_ask))
+
+    # --- Flow ---
+    def is_finished(self) -> bool:
+        if self.answered >= self.max_questions or len(self.pool) == 0:
+            return True
+        if self.answered < MIN_QUESTIONS:
+            return False
+        topics = np.unique(self.pool.topic_index[self.asked])
+        return bool(np.all(np.sqrt(self.variance[topics]) <= self.target_se))
+
+    def next_question(self):
+        """
+        Picks, loads and returns the next question (with `bank_id` and a
+        session-unique `question_id`), or None when the test is over.
+        """
+        if self.is_finished():
+            return None
+        while True:
+            index = self.pool.best(self.theta, self.variance, self.rng)
+            if index is None:
+                return None
+            self.pool.available[index] = False
+            item_id = int(self.pool.ids[index])
+            loaded = question_bank.BANK.get_many([item_id])
+            if loaded:
+                break
+        self.asked.append(index)
+        question = loaded[0]
+        question["bank_id"] = item_id
+        question["question_id"] = f"CAT_{item_id}"
+        return question
+
+    def record_answer(self, question: dict, answer_index):
+        """Updates the ability of the question's topic with the student's answer (None skips it)."""
+        index = self.pool.position(question.get("bank_id"))
+        if index is None:
+            return
+        self.answered += 1
+        if answer_index is None:
+            return
+        topic = self.pool.topic_index[index]
+        posterior = self.posteriors[topic]
+        posterior.observe(self.pool.a[index], self.pool.b[index], self.pool.c[index],
+                          answer_index == question.get("correct_answer_index"))
+        self.theta[topic] = posterior.theta
+        self.variance[topic] = posterior.se ** 2
+
+    def estimates(self) -> dict:
+        """Current {topic: {"theta", "se"}} of every topic asked so far."""
+        topics = dict.fromkeys(int(self.pool.topic_index[i]) for i in self.asked)
+        return {self.pool.topic_names[t]: self.posteriors[t].as_dict() for t in topics}
+
+
+def start_session(user_profile: dict, quiz_ask: dict, **options) -> AdaptiveSession:
+    """Opens an adaptive test for a student over the bank questions of the requested subjects."""
+    session = AdaptiveSession(user_profile, quiz_ask, **options)
+    print(f"LOG: Adaptive quiz started over {len(session.pool)} bank questions.")
+    return session
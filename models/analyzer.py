@@ -0,0 +1,316 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from models import attempt_log, question_bank
+
+# --- 1. Configuration ---
+ANALYTICS_DIR = os.path.join(question_bank.DATA_DIR, "analytics")
+AGGREGATES_PATH = os.path.join(ANALYTICS_DIR, "aggregates.json")  # What dashboards read
+STATE_PATH = os.path.join(ANALYTICS_DIR, "state.json")            # Raw counters, for incremental runs
+
+CHUNK_ATTEMPTS = 20000  # Attempt records turned into one set of column arrays at a time
+# Time-per-question histogram bin edges, in seconds (the last bin is open-ended)
+TIME_BIN_EDGES = np.array([0, 10, 20, 30, 45, 60, 90, 120, 180, 240, 300, 450, 600, 900], dtype=np.float64)
+MAX_DROPOFF_POSITION = 65  # Quizzes are at most 65 questions (a full GATE mock)
+UNKNOWN = "unknown"
+
+# Per (cohort, topic, difficulty) group: these counters, then the time histogram
+COUNTERS = ("questions", "answered", "correct", "hints", "hinted_correct", "seconds")
+N_TIME_BINS = len(TIME_BIN_EDGES)
+
+
+def cohort_of(ts: float) -> str:
+    """A student's cohort: the ISO week of their first attempt, e.g. '2025-W07'."""
+    return time.strftime("%G-W%V", time.gmtime(ts))
+
+
+# --- 2. Dictionary Encoding ---
+class Vocabulary:
+    """Maps strings (cohorts, topics, difficulties) to small ints, so chunks are pure integer columns."""
+
+    def __init__(self, names: list = None):
+        self.names = list(names or [])
+        self._ids = {name: i for i, name in enumerate(self.names)}
+
+    def id(self, name) -> int:
+        name = name if name else UNKNOWN
+        index = self._ids.get(name)
+        if index is None:
+            index = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+
+# --- 3. Columnar Chunks ---
+def _columns(records: list, cohorts: Vocabulary, topics: Vocabulary, difficulties: Vocabulary, user_cohort: dict) -> dict:
+    """
+    Flattens a chunk of attempt records into per-question NumPy columns
+    (plus the owning attempt's row), dictionary-encoding the string tags.
+    """
+    attempt, position, cohort_col, topic, difficulty = [], [], [], [], []
+    answered, correct, hint, seconds = [], [], [], []
+    attempt_cohorts = []
+    for row, record in enumerate(records):
+        cohort = user_cohort.get(record["user_id"])
+        if cohort is None:  # The log is in time order, so this is the student's first attempt
+            cohort = user_cohort[record["user_id"]] = cohorts.id(cohort_of(record.get("ts", 0.0)))
+        attempt_cohorts.append(cohort)
+        questions = record.get("questions", [])
+        attempt.extend([row] * len(questions))
+        position.extend(range(len(questions)))
+        cohort_col.extend([cohort] * len(questions))
+        for q in questions:
+            tags = q.get("tags") or {}
+            topic.append(topics.id(tags.get("topic")))
+            difficulty.append(difficulties.id(str(tags.get("difficulty") or UNKNOWN).lower()))
+            answered.append(q.get("user_answer_index") is not None)
+            correct.append(q.get("status") == "correct")
+            hint.append(bool(q.get("hint_used")))
+            seconds.append(q.get("time_spent_seconds") or 0.0)
+    return {
+        "attempt": np.array(attempt, dtype=np.int64),
+        "position": np.array(position, dtype=np.int64),
+        "cohort": np.array(cohort_col, dtype=np.int64),
+        "topic": np.array(topic, dtype=np.int64),
+        "difficulty": np.array(difficulty, dtype=np.int64),
+        "answered": np.array(answered, dtype=bool),
+        "correct": np.array(correct, dtype=bool),
+        "hint": np.array(hint, dtype=bool),
+        "seconds": np.array(seconds, dtype=np.float64),
+        "attempt_cohort": np.array(attempt_cohorts, dtype=np.int64),
+    }
+
+
+# --- 4. Aggregation ---
+class CohortAggregates:
+    """
+    Mergeable counters over the attempt log: per (cohort, topic,
+    difficulty) question, answer, accuracy, hint and time totals plus a
+    time-per-question histogram, and per cohort a histogram of the
+    position where students abandoned a quiz.
+
+    Every chunk is reduced with a few bincounts and added in, so memory
+    depends on the number of groups, never on the number of records.
+    """
+
+    def __init__(self):
+        self.cohorts, self.topics, self.difficulties = Vocabulary(), Vocabulary(), Vocabulary()
+        self.user_cohort = {}
+        self.groups = {}   # (cohort, topic, difficulty) -> counters followed by time histogram
+        self.dropoff = {}  # cohort -> attempts abandoned at each position, then completed attempts
+        self.attempts = 0
+        self.last_seq = 0
+
+    def add_chunk(self, records: list):
+        if not records:
+            return
+        cols = _columns(records, self.cohorts, self.topics, self.difficulties, self.user_cohort)
+        self._add_groups(cols)
+        self._add_dropoff(cols, len(records))
+        self.attempts += len(records)
+        self.last_seq = records[-1]["seq"]
+
+    def _add_groups(self, cols: dict):
+        if len(cols["attempt"]) == 0:
+            return
+        # One integer key per (cohort, topic, difficulty), so grouping is a 1-D unique
+        n_topics, n_difficulties = len(self.topics.names), len(self.difficulties.names)
+        keys = (cols["cohort"] * n_topics + cols["topic"]) * n_difficulties + cols["difficulty"]
+        unique_keys, group = np.unique(keys, return_inverse=True)
+        n_groups = len(unique_keys)
+        answered, correct, hint = cols["answered"], cols["correct"], cols["hint"]
+        timed = answered & (cols["seconds"] > 0)
+        counters = np.stack([
+            np.bincount(group, minlength=n_groups),
+            np.bincount(group, weights=answered, minlength=n_groups),
+            np.bincount(group, weights=correct, minlength=n_groups),
+            np.bincount(group, weights=hint, minlength=n_groups),
+            np.bincount(group, weights=hint & correct, minlength=n_groups),
+            np.bincount(group, weights=np.where(timed, cols["seconds"], 0.0), minlength=n_groups),
+        ], axis=1)
+        bins = np.searchsorted(TIME_BIN_EDGES, cols["seconds"][timed], side="right") - 1
+        histogram = np.bincount(group[timed] * N_TIME_BINS + bins, minlength=n_groups * N_TIME_BINS)
+        rows = np.hstack([counters, histogram.reshape(n_groups, N_TIME_BINS)])
+        cohort_topic, difficulty = np.divmod(unique_keys, n_difficulties)
+        cohort, topic = np.divmod(cohort_topic, n_topics)
+        for key, row in zip(zip(cohort.tolist(), topic.tolist(), difficulty.tolist()), rows):
+            total = self.groups.get(key)
+            self.groups[key] = row if total is None else total + row
+
+    def _add_dropoff(self, cols: dict, n_attempts: int):
+        """An attempt is abandoned at the first question of its trailing run of unanswered ones."""
+        length = np.bincount(cols["attempt"], minlength=n_attempts)
+        last_answered = np.full(n_attempts, -1)
+        answered = cols["answered"]
+        np.maximum.at(last_answered, cols["attempt"][answered], cols["position"][answered])
+        stop = last_answered + 1
+        completed = stop >= length
+        slot = np.where(completed, MAX_DROPOFF_POSITION + 1, np.minimum(stop, MAX_DROPOFF_POSITION))
+        width = MAX_DROPOFF_POSITION + 2
+        cohorts, cohort_index = np.unique(cols["attempt_cohort"], return_inverse=True)
+        counts = np.bincount(cohort_index * width + slot, minlength=len(cohorts) * width).reshape(len(cohorts), width)
+        for cohort, row in zip(cohorts.tolist(), counts):
+            total = self.dropoff.get(cohort)
+            self.dropoff[cohort] = row if total is None else total + row
+
+    # --- Persistence ---
+    def to_state(self) -> dict:
+        return {
+            "cohorts": self.cohorts.names,
+            "topics": self.topics.names,
+            "difficulties": self.difficulties.names,
+            "user_cohort": self.user_cohort,
+            "groups": [[*key, *row.tolist()] for key, row in self.groups.items()],
+            "dropoff": {str(cohort): counts.tolist() for cohort, counts in self.dropoff.items()},
+            "attempts": self.attempts,
+            "last_seq": self.last_seq,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict):
+        aggregates = cls()
+        aggregates.cohorts = Vocabulary(state["cohorts"])
+        aggregates.topics = Vocabulary(state["topics"])
+        aggregates.difficulties = Vocabulary(state["difficulties"])
+        aggregates.user_cohort = state["user_cohort"]
+        aggregates.groups = {tuple(int(v) for v in row[:3]): np.array(row[3:], dtype=np.float64) for row in state["groups"]}
+        aggregates.dropoff = {int(cohort): np.array(counts) for cohort, counts in state["dropoff"].items()}
+        aggregates.attempts = state["attempts"]
+        aggregates.last_seq = state["last_seq"]
+        return aggregates
+
+
+# --- 5. Reports ---
+def _histogram_quantile(histogram: np.ndarray, q: float):
+    """Quantile from a time histogram, interpolating inside the bin (the open last bin uses its lower edge)."""
+    total = histogram.sum()
+    if total == 0:
+        return None
+    cumulative = np.cumsum(histogram)
+    b = int(np.searchsorted(cumulative, q * total))
+    if b >= N_TIME_BINS - 1:
+        return float(TIME_BIN_EDGES[-1])
+    below = cumulative[b] - histogram[b]
+    share = (q * total - below) / histogram[b] if histogram[b] else 0.0
+    return round(float(TIME_BIN_EDGES[b] + share * (TIME_BIN_EDGES[b + 1] - TIME_BIN_EDGES[b])), 1)
+
+
+def _ratio(numerator, denominator):
+    return round(float(numerator) / float(denominator), 4) if denominator else None
+
+
+def build_reports(aggregates: CohortAggregates) -> dict:
+    """Turns the raw counters into the rows the dashboards show."""
+    cohorts, topics, difficulties = aggregates.cohorts.names, aggregates.topics.names, aggregates.difficulties.names
+    topic_accuracy, time_per_question, hint_usage = [], [], []
+    for (cohort, topic, difficulty), row in sorted(aggregates.groups.items()):
+        counters = dict(zip(COUNTERS, row[:len(COUNTERS)]))
+        histogram = row[len(COUNTERS):]
+        labels = {"cohort": cohorts[cohort], "topic": topics[topic], "difficulty": difficulties[difficulty]}
+        answered = counters["answered"]
+        unhinted = answered - counters["hints"]
+        topic_accuracy.append({
+            **labels,
+            "questions": int(counters["questions"]),
+            "answered": int(answered),
+            "accuracy": _ratio(counters["correct"], answered),
+        })
+        time_per_question.append({
+            **labels,
+            "timed": int(histogram.sum()),
+            "mean_seconds": round(counters["seconds"] / histogram.sum(), 1) if histogram.sum() else None,
+            "p50_seconds": _histogram_quantile(histogram, 0.50),
+            "p90_seconds": _histogram_quantile(histogram, 0.90),
+            "histogram": histogram.astype(int).tolist(),
+        })
+        hint_usage.append({
+            **labels,
+            "hint_rate": _ratio(counters["hints"], counters["questions"]),
+            "accuracy_with_hint": _ratio(counters["hinted_correct"], counters["hints"]),
+            "accuracy_without_hint": _ratio(counters["correct"] - counters["hinted_correct"], unhinted),
+        })
+    dropoff = []
+    for cohort, counts in sorted(aggregates.dropoff.items()):
+        attempts = int(counts.sum())
+        abandoned = counts[:MAX_DROPOFF_POSITION + 1]
+        dropoff.append({
+            "cohort": cohorts[cohort],
+            "attempts": attempts,
+            "completion_rate": _ratio(counts[-1], attempts),
+            # Question number (1-based) -> attempts abandoned there without answering it or anything after
+            "abandoned_at": {str(position + 1): int(n) for position, n in enumerate(abandoned) if n},
+        })
+    return {
+        "meta": {
+            "generated_at": time.time(),
+            "attempts": aggregates.attempts,
+            "last_seq": aggregates.last_seq,
+            "time_bin_edges_seconds": TIME_BIN_EDGES.tolist(),
+        },
+        "topic_accuracy": topic_accuracy,
+        "time_per_question": time_per_question,
+        "hint_usage": hint_usage,
+        "dropoff": dropoff,
+    }
+
+
+def _write_json(path: str, data: dict):
+    """Writes atomically, so a dashboard never reads a half-written file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+# --- 6. Public API ---
+def run(incremental: bool = True, chunk_size: int = CHUNK_ATTEMPTS) -> dict:
+    """
+    Streams the attempt log in chunks and writes the aggregates for the
+    dashboards. With `incremental`, continues from the counters of the last
+    run and only reads attempts logged since.
+
+    Returns:
+        dict: The reports that were written.
+    """
+    aggregates = None
+    if incremental:
+        try:
+            with open(STATE_PATH, "r") as f:
+                aggregates = CohortAggregates.from_state(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            aggregates = None
+    aggregates = aggregates or CohortAggregates()
+
+    start, before = time.time(), aggregates.attempts
+    chunk = []
+    for record in attempt_log.replay(after_seq=aggregates.last_seq):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            aggregates.add_chunk(chunk)
+            chunk = []
+    aggregates.add_chunk(chunk)
+
+    reports = build_reports(aggregates)
+    _write_json(STATE_PATH, aggregates.to_state())
+    _write_json(AGGREGATES_PATH, reports)
+    print(f"LOG: Analytics updated with {aggregates.attempts - before} new attempts in {time.time() - start:.2f}s.")
+    return reports
+
+
+def load_reports():
+    """The aggregates written by the last run, or None if there has been none."""
+    try:
+        with open(AGGREGATES_PATH, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+if __name__ == "__main__":
+    # Offline job: python -m models.analyzer [--full]
+    import sys
+    run(incremental="--full" not in sys.argv)
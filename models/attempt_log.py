@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from models import question_bank
+
+# --- 1. Configuration ---
+LOG_DIR = os.path.join(question_bank.DATA_DIR, "attempts")
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024  # Roll over to a new segment file past this size
+FSYNC_INTERVAL_SECONDS = 0.05         # Group commit window: one fsync covers every append in it
+
+# Per-question fields kept in the log; everything else (text, options,
+# explanations) lives in the question bank and is referenced by hash.
+QUESTION_FIELDS = ("user_answer_index", "correct_answer_index", "status", "time_spent_seconds", "hint_used", "answer_changes")
+TAG_FIELDS = ("topic", "subject", "difficulty", "cognitive_skill_tested")
+
+
+def _segment_name(number: int) -> str:
+    return f"attempts-{number:06d}.jsonl"
+
+
+def compact_attempt(user_id: str, quiz_data: dict) -> dict:
+    """
+    The log record of one submitted quiz: who, when, and per question the
+    answer, the outcome, the time spent and the tags. Records have the same
+    shape as graded quiz data, so profile code can consume either.
+    """
+    questions = []
+    for q in quiz_data.get("questions", []):
+        tags = q.get("tags") if isinstance(q.get("tags"), dict) else {}
+        record = {k: q.get(k) for k in QUESTION_FIELDS}
+        record["tags"] = {k: tags.get(k) for k in TAG_FIELDS if tags.get(k) is not None}
+        record["question_hash"] = question_bank.question_hash(q)[:16]
+        questions.append(record)
+    return {
+        "attempt_id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "ts": time.time(),
+        "quiz_title": quiz_data.get("quiz_title"),
+        "questions": questions,
+    }
+
+
+# --- 2. The Log ---
+class AttemptLog:
+    """
+    Append-only log of submitted quiz attempts, in numbered JSON-lines
+    segment files.
+
+    Each record gets a global sequence number. Appends are written at once
+    but fsynced in groups: a background thread syncs every
+    FSYNC_INTERVAL_SECONDS, and `append(..., durable=True)` waits for the
+    sync that covers its record. Many concurrent submissions therefore
+    share one fsync. On startup a torn last line (from a crash mid-write)
+    is cut off.
+    """
+
+    def __init__(self, log_dir: str = LOG_DIR, segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        self.log_dir = log_dir
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._file = None
+        self._segment = 0
+        self._next_seq = None
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._syncer = None
+
+    # --- Startup ---
+    def _segments(self) -> list:
+        if not os.path.isdir(self.log_dir):
+            return []
+        return sorted(n for n in os.listdir(self.log_dir) if n.startswith("attempts-") and n.endswith(".jsonl"))
+
+    def _open(self):
+        """Finds the last segment and sequence number, repairing a torn tail. Call under the lock."""
+        if self._file is not None:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        segments = self._segments()
+        last_seq = 0
+        if segments:
+            self._segment = int(segments[-1][len("attempts-"):-len(".jsonl")])
+            path = os.path.join(self.log_dir, segments[-1])
+            with open(path, "rb+") as f:
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    print(f"LOG: Cut a torn record off the end of {segments[-1]}.")
+                    f.truncate(end)
+                lines = data[:end].splitlines()
+            if lines:
+                last_seq = json.loads(lines[-1])["seq"]
+            elif len(segments) > 1:
+                last_seq = self._last_seq_of(segments[-2])
+        else:
+            self._segment = 1
+        self._next_seq = last_seq + 1
+        self._written_seq = self._synced_seq = last_seq
+        self._file = open(os.path.join(self.log_dir, _segment_name(self._segment)), "ab")
+        self._syncer = threading.Thread(target=self._sync_loop, daemon=True, name="attempt-log-fsync")
+        self._syncer.start()
+
+    def _last_seq_of(self, segment: str) -> int:
+        last = None
+        with open(os.path.join(self.log_dir, segment), "rb") as f:
+            for line in f:
+                last = line
+        return json.loads(last)["seq"] if last else 0
+
+    # --- Writes ---
+    def append(self, record: dict, durable: bool = True) -> dict:
+        """
+        Appends a record, giving it the next sequence number.
+
+        Args:
+            record (dict): The attempt (see `compact_attempt`).
+            durable (bool): Wait until the record has been fsynced.
+
+        Returns:
+            dict: The record with its `seq`.
+        """
+        with self._lock:
+            self._open()
+            record = {"seq": self._next_seq, **record}
+            self._next_seq += 1
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+            self._file.flush()
+            self._written_seq = record["seq"]
+            if self._file.tell() >= self.segment_max_bytes:
+                self._roll()
+            while durable and self._synced_seq < record["seq"]:
+                self._synced.wait()
+        return record
+
+    def _roll(self):
+        """Closes the full segment (fsynced) and starts the next one. Call under the lock."""
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._synced_seq = self._written_seq
+        self._synced.notify_all()
+        self._segment += 1
+        self._file = open(os.path.join(self.log_dir, _segment_name(self._segment)), "ab")
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(FSYNC_INTERVAL_SECONDS)
+            with self._lock:
+                if self._synced_seq >= self._written_seq:
+                    continue
+                target = self._written_seq
+                fd = self._file.fileno()
+            try:
+                os.fsync(fd)  # Outside the lock, so appends keep flowing meanwhile
+            except OSError:
+                pass  # The segment was rolled (and fsynced) in the meantime
+            with self._lock:
+                self._synced_seq = max(self._synced_seq, target)
+                self._synced.notify_all()
+
+    # --- Reads ---
+    def replay(self, after_seq: int = 0):
+        """
+        Yields every record with seq > `after_seq`, oldest first, reading
+        one line at a time, so memory use does not grow with the log.
+        """
+        for segment in self._segments():
+            with open(os.path.join(self.log_dir, segment), "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # A record still being written
+                    # Records start with '{"seq":N,', so old ones are skipped without parsing
+                    if after_seq and line.startswith(b'{"seq":') and int(line[7:line.index(b",")]) <= after_seq:
+                        continue
+                    record = json.loads(line)
+                    if record["seq"] > after_seq:
+                        yield record
+
+
+# --- 3. Module-level Log ---
+# One log per server process, shared by every Streamlit session.
+LOG = AttemptLog()
+
+
+def record_attempt(user_id: str, quiz_data: dict) -> dict:
+    """Durably appends a submitted quiz to the attempt log. Returns the stored record."""
+    return LOG.append(compact_attempt(user_id, quiz_data))
+
+
+def replay(after_seq: int = 0):
+    """Streams every logged attempt after `after_seq`, oldest first."""
+    return LOG.replay(after_seq)
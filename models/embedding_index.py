@@ -0,0 +1,279 @@
+import json
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from models import question_bank
+
+# --- 1. Configuration ---
+INDEX_DIR = os.path.join(question_bank.DATA_DIR, "embeddings")
+EMBED_DIM = 256
+SYNC_BATCH = 2048          # Questions embedded per batch when catching up with the bank
+SEARCH_CHUNK_ROWS = 65536  # Rows scored at a time, so brute force stays bounded in memory
+IVF_MIN_ROWS = 50000       # Below this, exact search is fast enough
+IVF_LISTS = 256
+IVF_NPROBE = 8
+IVF_TRAIN_SAMPLE = 20000
+IVF_KMEANS_ITERS = 10
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# --- 2. Embedding Functions ---
+# Any callable that maps a list of texts to an (n, dim) float32 array of
+# L2-normalized rows can be plugged in. The default is fully local, so the
+# index works (and can be tested) offline.
+def hashing_embedding(texts: list, dim: int = EMBED_DIM) -> np.ndarray:
+    """
+    Local feature-hashing embedding over word unigrams and bigrams.
+    Deterministic across processes (crc32, not Python's salted hash).
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = _TOKEN_RE.findall((text or "").lower())
+        features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vectors[row, h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    return _normalize(vectors)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+def question_text_for_embedding(question: dict) -> str:
+    """The text a question is embedded by: its topic tag plus the question itself."""
+    tags = question.get("tags") if isinstance(question.get("tags"), dict) else {}
+    return f"{tags.get('topic') or ''} {tags.get('subject') or ''} {question.get('question_text') or ''}"
+
+
+# --- 3. The Index ---
+class EmbeddingIndex:
+    """
+    Vector index over the question bank.
+
+    Vectors are appended to a raw float32 file and read back through a
+    NumPy memory map, so the OS pages them in on demand instead of the
+    process loading the whole matrix. Only questions added to the bank
+    since the last sync are embedded. Search is exact (batched matrix
+    products, chunked) for small banks and IVF-style (k-means lists,
+    probing the closest few) once the bank reaches IVF_MIN_ROWS.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR, embed_fn=hashing_embedding, dim: int = EMBED_DIM,
+                 bank: question_bank.QuestionBank = None):
+        self.index_dir = index_dir
+        self.embed_fn = embed_fn
+        self.dim = dim
+        self.bank = bank or question_bank.BANK
+        self._lock = threading.RLock()
+        self._meta = None
+        self._vectors = None
+        self._ids = None
+        self._ivf = None
+
+    # --- Files ---
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _load(self):
+        """Opens the memory maps for the current files (cheap; no data is read)."""
+        if self._meta is not None:
+            return
+        os.makedirs(self.index_dir, exist_ok=True)
+        try:
+            with open(self._path("meta.json"), "r") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            meta = None
+        if not meta or meta.get("dim") != self.dim or meta.get("embed_fn") != _fn_name(self.embed_fn):
+            # New index, or the embedding changed: start over
+            meta = {"dim": self.dim, "embed_fn": _fn_name(self.embed_fn), "count": 0, "last_id": 0}
+            for name in ("vectors.f32", "ids.i64", "ivf.npz"):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            self._write_meta(meta)
+        self._meta = meta
+        self._map()
+        self._load_ivf()
+
+    def _map(self):
+        count = self._meta["count"]
+        if count == 0:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+            return
+        self._vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(count, self.dim))
+        self._ids = np.memmap(self._path("ids.i64"), dtype=np.int64, mode="r", shape=(count,))
+
+    def _write_meta(self, meta: dict):
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _append_rows(self, name: str, rows: np.ndarray, row_bytes: int):
+        """
+        Appends rows to a data file right after the `count` rows meta.json
+        vouches for. A crash between an append and the meta write leaves
+        extra rows behind; cutting them off first keeps vectors, ids and
+        count lined up.
+        """
+        with open(self._path(name), "ab") as f:
+            f.truncate(self._meta["count"] * row_bytes)
+            f.write(rows.tobytes())
+
+    # --- Incremental sync ---
+    def sync(self) -> int:
+        """
+        Embeds the questions added to the bank since the last sync and
+        appends them to the index.
+
+        Returns:
+            int: How many questions were embedded.
+        """
+        with self._lock:
+            self._load()
+            added = 0
+            while True:
+                rows = self.bank.rows_after(self._meta["last_id"], SYNC_BATCH)
+                if not rows:
+                    break
+                ids = np.array([row_id for row_id, _ in rows], dtype=np.int64)
+                vectors = np.ascontiguousarray(self.embed_fn([question_text_for_embedding(q) for _, q in rows]), dtype=np.float32)
+                self._append_rows("vectors.f32", vectors, self.dim * 4)
+                self._append_rows("ids.i64", ids, 8)
+                self._meta["count"] += len(rows)
+                self._meta["last_id"] = int(ids[-1])
+                self._write_meta(self._meta)
+                added += len(rows)
+            if added:
+                self._map()
+                print(f"LOG: Embedded {added} new questions ({self._meta['count']} in index).")
+            return added
+
+    # --- IVF (coarse quantizer) ---
+    def build_ivf(self, n_lists: int = IVF_LISTS, seed: int = 0):
+        """
+        Trains k-means centroids on a sample of the vectors and groups all
+        rows by their nearest centroid. Rows added later are searched
+        exactly until the next rebuild.
+        """
+        with self._lock:
+            self._load()
+            count = self._meta["count"]
+            if count < n_lists:
+                return
+            rng = np.random.default_rng(seed)
+            sample = self._vectors[np.sort(rng.choice(count, min(count, IVF_TRAIN_SAMPLE), replace=False))]
+            centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+            for _ in range(IVF_KMEANS_ITERS):
+                assign = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(n_lists):
+                    members = sample[assign == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+
+            assign = np.empty(count, dtype=np.int32)
+            for start in range(0, count, SEARCH_CHUNK_ROWS):
+                block = self._vectors[start:start + SEARCH_CHUNK_ROWS]
+                assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable").astype(np.int64)
+            offsets = np.searchsorted(assign[order], np.arange(n_lists + 1)).astype(np.int64)
+            np.savez(self._path("ivf.npz"), centroids=centroids, order=order, offsets=offsets, indexed=np.int64(count))
+            self._load_ivf()
+            print(f"LOG: Built IVF index with {n_lists} lists over {count} vectors.")
+
+    def _load_ivf(self):
+        try:
+            data = np.load(self._path("ivf.npz"))
+        except (FileNotFoundError, OSError, ValueError):
+            self._ivf = None
+            return
+        self._ivf = {k: data[k] for k in ("centroids", "order", "offsets")}
+        self._ivf["indexed"] = int(data["indexed"])
+
+    # --- Search ---
+    def search(self, queries: list, k: int = 5, weights: list = None, nprobe: int = IVF_NPROBE, exact: bool = None) -> list:
+        """
+        Finds the `k` bank questions closest to a batch of query texts.
+
+        Every query is scored in one matrix product. A question's score is
+        the (weighted) best cosine similarity over all queries.
+
+        Args:
+            queries (list): Query texts, e.g. a topic and weak concepts.
+            k (int): How many results to return.
+            weights (list): Optional per-query weights (default all 1).
+            nprobe (int): IVF lists to probe per query.
+            exact (bool): Force exact (True) or IVF (False) search. Default: by bank size.
+
+        Returns:
+            list: (bank_id, score) pairs, best first.
+        """
+        self.sync()
+        with self._lock:
+            count = self._meta["count"]
+            vectors, ids, ivf = self._vectors, self._ids, self._ivf
+        if count == 0 or not queries:
+            return []
+
+        q = np.ascontiguousarray(self.embed_fn(list(queries)), dtype=np.float32)
+        w = np.asarray(weights if weights is not None else [1.0] * len(queries), dtype=np.float32)
+        if exact is None:
+            exact = count < IVF_MIN_ROWS
+        if not exact and (ivf is None or count - ivf["indexed"] > count // 5):
+            self.build_ivf()  # Missing, or too many rows added since the last build
+            ivf = self._ivf
+
+        rows = None  # None means "all rows, in order"
+        if not exact and ivf is not None:
+            # Probe the closest lists of every query, plus the rows added after the build
+            probe = np.argsort(-(q @ ivf["centroids"].T), axis=1)[:, :nprobe]
+            rows = np.concatenate(
+                [ivf["order"][ivf["offsets"][c]:ivf["offsets"][c + 1]] for c in np.unique(probe)]
+                + [np.arange(ivf["indexed"], count, dtype=np.int64)]
+            )
+            rows.sort()  # Sequential reads from the memory map
+
+        n_candidates = count if rows is None else len(rows)
+        best_scores, best_rows = np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        for start in range(0, n_candidates, SEARCH_CHUNK_ROWS):
+            stop = min(start + SEARCH_CHUNK_ROWS, n_candidates)
+            if rows is None:
+                row_idx = np.arange(start, stop, dtype=np.int64)
+                block = vectors[start:stop]
+            else:
+                row_idx = rows[start:stop]
+                block = vectors[row_idx]
+            scores = ((block @ q.T) * w).max(axis=1)
+            best_scores = np.concatenate([best_scores, scores])
+            best_rows = np.concatenate([best_rows, row_idx])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k)[:k]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+
+        order = np.argsort(-best_scores)[:k]
+        return [(int(ids[best_rows[i]]), float(best_scores[i])) for i in order]
+
+
+def _fn_name(fn) -> str:
+    return f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}"
+
+
+# --- 4. Module-level Index ---
+# One index per server process, shared by every Streamlit session.
+INDEX = EmbeddingIndex()
+
+
+def similar_questions(queries: list, k: int = 5, weights: list = None) -> list:
+    """Returns the `k` bank questions closest to the queries, as question dicts."""
+    hits = INDEX.search(queries, k=k, weights=weights)
+    return INDEX.bank.get_many([bank_id for bank_id, _ in hits])
@@ -0,0 +1,185 @@
+import numpy as np
+
+# --- 1. Model Parameters ---
+# Change these and rebuild the profiles (profile_updater.rebuild_profiles)
+# to re-score every student's history under the new model.
+PRIOR_SCORE = 50.0      # Mastery of a topic/skill before any evidence (0-100)
+LEARNING_RATE = 0.35    # Evidence weight of one medium-difficulty question
+UNANSWERED_WEIGHT = 0.5 # A skipped question is weaker evidence than a wrong one
+
+DIFFICULTY_WEIGHT = {"easy": 0.7, "medium": 1.0, "hard": 1.4}
+EXPECTED_SECONDS = {"easy": 60.0, "medium": 120.0, "hard": 180.0}
+SPEED_BONUS = 0.15      # Share of a correct answer's score that depends on speed
+
+WEAKNESS_THRESHOLD = 60.0
+MAX_WEAKNESSES = 3
+
+
+# --- 2. Evidence from Attempts ---
+def _question_arrays(questions: list):
+    """
+    Turns graded questions into parallel arrays: topic and skill labels,
+    the observed score (0-100) and the evidence weight of each question.
+
+    A correct answer scores between 100 - SPEED_BONUS*100 (slow) and 100
+    (at or under the expected time); a wrong or skipped one scores 0.
+    Harder questions carry more weight, skipped ones less.
+    """
+    n = len(questions)
+    topics, skills = [None] * n, [None] * n
+    difficulty = [None] * n
+    status = [None] * n
+    skipped = np.zeros(n, dtype=bool)
+    seconds = np.zeros(n)
+    for i, q in enumerate(questions):
+        tags = q.get("tags") if isinstance(q.get("tags"), dict) else {}
+        topics[i] = tags.get("topic")
+        skills[i] = tags.get("cognitive_skill_tested")
+        difficulty[i] = str(tags.get("difficulty") or "medium").lower()
+        status[i] = q.get("status")
+        # Grading marks a skipped question "incorrect", so only the missing answer tells them apart
+        skipped[i] = q.get("user_answer_index") is None
+        seconds[i] = q.get("time_spent_seconds") or 0.0
+
+    correct = np.array([s == "correct" for s in status], dtype=np.float64)
+    weight = np.array([DIFFICULTY_WEIGHT.get(d, 1.0) for d in difficulty]) * LEARNING_RATE
+    weight[skipped] *= UNANSWERED_WEIGHT
+    expected = np.array([EXPECTED_SECONDS.get(d, EXPECTED_SECONDS["medium"]) for d in difficulty])
+    # No recorded time counts as on time
+    speed = np.clip(expected / np.maximum(seconds, 1e-9), 0.0, 1.0)
+    speed[seconds <= 0] = 1.0
+    observed = correct * 100.0 * ((1.0 - SPEED_BONUS) + SPEED_BONUS * speed)
+    return topics, skills, observed, weight
+
+
+# --- 3. The Fold ---
+def fold(prior: np.ndarray, group: np.ndarray, observed: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    """
+    Applies a sequence of exponentially-weighted updates to many scores
+    at once, in closed form.
+
+    Observation i moves its group's score toward `observed[i]` by
+    a_i = 1 - exp(-weight[i]). Done one after another, in input order,
+    the final score of a group is
+
+        prior * exp(-W) + sum_i a_i * observed[i] * exp(-(W - S_i))
+
+    where W is the group's total weight and S_i its running total up to and
+    including i. That is a handful of cumulative sums and bincounts, so a
+    whole history of many users is scored as fast as a single quiz.
+
+    Args:
+        prior (np.ndarray): Starting score of each group.
+        group (np.ndarray): Group index of each observation, in time order.
+        observed (np.ndarray): Score each observation points to.
+        weight (np.ndarray): Evidence weight of each observation.
+
+    Returns:
+        np.ndarray: The final score of each group.
+    """
+    n_groups = len(prior)
+    if len(group) == 0:
+        return prior.astype(np.float64, copy=True)
+    order = np.argsort(group, kind="stable")  # Keeps time order within a group
+    g, o, w = group[order], observed[order], weight[order]
+    total = np.bincount(g, weights=w, minlength=n_groups)
+    before_group = np.concatenate(([0.0], np.cumsum(total)[:-1]))
+    running = np.cumsum(w) - before_group[g]  # S_i, within the group
+    contribution = (1.0 - np.exp(-w)) * o * np.exp(-(total[g] - running))
+    return prior * np.exp(-total) + np.bincount(g, weights=contribution, minlength=n_groups)
+
+
+def _fold_scores(scores: dict, labels: list, observed: np.ndarray, weight: np.ndarray) -> dict:
+    """Folds labelled observations into a {label: score} dict. Unlabelled ones are ignored."""
+    known = np.array([label is not None for label in labels], dtype=bool)
+    if not known.any():
+        return dict(scores)
+    names, group = np.unique(np.array([label for label in labels if label is not None], dtype=object), return_inverse=True)
+    prior = np.array([scores.get(name, PRIOR_SCORE) for name in names], dtype=np.float64)
+    updated = fold(prior, group, observed[known], weight[known])
+    result = dict(scores)
+    result.update({name: float(score) for name, score in zip(names, updated)})
+    return result
+
+
+def _summaries(profile: dict) -> dict:
+    """Recomputes the fields derived from the scores."""
+    fingerprint = profile["cognitive_skill_fingerprint"]
+    weak = sorted((score, skill) for skill, score in fingerprint.items() if score < WEAKNESS_THRESHOLD)
+    profile["cognitive_skill_weaknesses"] = [skill for _, skill in weak[:MAX_WEAKNESSES]]
+    mastery = list(profile["mastery_scores"].values())
+    profile["overall_progress_percentage"] = round(float(np.mean(mastery)), 1) if mastery else 0.0
+    return profile
+
+
+# --- 4. Public API ---
+def update_profile(profile: dict, attempt: dict) -> dict:
+    """
+    Scores one graded attempt into a profile. Scores are kept at full
+    precision (round them for display), so scoring attempts one by one and
+    in bulk gives the same result.
+
+    Args:
+        profile (dict): The current profile (not modified).
+        attempt (dict): Graded quiz data or an attempt-log record.
+
+    Returns:
+        dict: The new profile.
+    """
+    topics, skills, observed, weight = _question_arrays(attempt.get("questions", []))
+    new_profile = dict(profile)
+    new_profile["mastery_scores"] = _fold_scores(profile.get("mastery_scores", {}), topics, observed, weight)
+    new_profile["cognitive_skill_fingerprint"] = _fold_scores(
+        profile.get("cognitive_skill_fingerprint", {}), skills, observed, weight
+    )
+    new_profile["questions_answered"] = profile.get("questions_answered", 0) + len(topics)
+    return _summaries(new_profile)
+
+
+def recompute(profiles: dict, attempts: list) -> dict:
+    """
+    Bulk version of `update_profile`: scores many attempts of many users,
+    in order, with one vectorized fold per score type.
+
+    Args:
+        profiles (dict): user_id -> starting profile, for every user in `attempts`.
+        attempts (list): Attempt-log records in time order.
+
+    Returns:
+        dict: user_id -> new profile.
+    """
+    rows = {"mastery_scores": ([], [], [], []), "cognitive_skill_fingerprint": ([], [], [], [])}
+    answered = {}
+    for attempt in attempts:
+        user_id = attempt["user_id"]
+        topics, skills, observed, weight = _question_arrays(attempt.get("questions", []))
+        answered[user_id] = answered.get(user_id, 0) + len(topics)
+        for field, labels in (("mastery_scores", topics), ("cognitive_skill_fingerprint", skills)):
+            users, names, obs, wts = rows[field]
+            for i, label in enumerate(labels):
+                if label is not None:
+                    users.append(user_id)
+                    names.append(label)
+                    obs.append(observed[i])
+                    wts.append(weight[i])
+
+    result = {user_id: dict(profile) for user_id, profile in profiles.items()}
+    for field, (users, names, obs, wts) in rows.items():
+        if not users:
+            continue
+        keys = np.array([f"{u}\x00{n}" for u, n in zip(users, names)], dtype=object)
+        unique_keys, group = np.unique(keys, return_inverse=True)
+        pairs = [key.split("\x00", 1) for key in unique_keys]
+        prior = np.array([profiles[u].get(field, {}).get(n, PRIOR_SCORE) for u, n in pairs], dtype=np.float64)
+        updated = fold(prior, group, np.array(obs), np.array(wts))
+        for user_id in {u for u, _ in pairs}:
+            result[user_id][field] = dict(profiles[user_id].get(field, {}))
+        for (user_id, name), score in zip(pairs, updated):
+            result[user_id][field][name] = float(score)
+    for user_id, count in answered.items():
+        result[user_id]["questions_answered"] = profiles[user_id].get("questions_answered", 0) + count
+    for profile in result.values():
+        profile.setdefault("mastery_scores", {})
+        profile.setdefault("cognitive_skill_fingerprint", {})
+        _summaries(profile)
+    return result
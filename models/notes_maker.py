@@ -1,66 +1,113 @@
 import streamlit as st
-import google.generativeai as genai
 import json
+from utils.cache import TieredCache, content_hash
+from utils.model import models
+from utils.prompt_builder import PromptBuilder
+from utils.single_flight import SingleFlight
 
 # --- 1. Configuration ---
-# In a real app, you would get your API key from secrets management
-# For Streamlit, st.secrets is the correct way to do this.
-try:
-    GOOGLE_API_KEY = st.secrets["GOOGLE_API_KEY"]
-    genai.configure(api_key=GOOGLE_API_KEY)
-    MODEL = "gemini-1.5-pro-latest" # Use a powerful, modern model
-except (KeyError, FileNotFoundError):
+# The API key and model settings live in utils/model.py.
+if not models.configure():
     st.error("API Key not found. Please set it in your Streamlit secrets.")
     st.stop()
+MODEL = models.model_name("notes")
 
+# Bump this whenever the prompt below changes, so old cached notes are not reused.
+PROMPT_VERSION = "notes-v2"
 
-# --- 2. The Main Function (The "Master Teacher") ---
-def generate_notes(quiz_results: dict):
-    """
-    Generates a personalized cheat sheet using the Gemini API, based on the
-    questions a user answered incorrectly in a quiz.
+# Notes for a given graded attempt are generated once and then served from
+# here, so reruns of the results page (expanders, buttons) are instant.
+NOTES_CACHE = TieredCache("notes", max_entries=256)
 
-    Args:
-        quiz_results (dict): The completed quiz data, including user answers.
+# Identical notes requests running at the same time (e.g. a class that got
+# the same shared quiz and missed the same questions) share one API call.
+NOTES_FLIGHTS = SingleFlight("notes")
 
-    Returns:
-        str: The generated notes in Markdown format, or an error message.
+
+# --- 2. Caching Helpers ---
+def _notes_cache_key(quiz_results: dict) -> str:
     """
-    print("LOG: Starting notes generation process...")
+    Builds a stable key from the graded quiz content. Only the fields that
+    change the notes are hashed, so timing and UI state do not cause misses.
+    """
+    graded = [
+        {
+            "question_text": q.get("question_text"),
+            "options": q.get("options"),
+            "correct_answer_index": q.get("correct_answer_index"),
+            "user_answer_index": q.get("user_answer_index"),
+        }
+        for q in quiz_results.get("questions", [])
+    ]
+    return content_hash(graded, MODEL, PROMPT_VERSION)
+
+
+def get_notes_cache_stats() -> dict:
+    """Returns the hit/miss counters of the notes cache."""
+    return NOTES_CACHE.stats()
+
 
+# --- 3. Prompt Construction ---
+ALL_CORRECT_MESSAGE = "Great job! You answered all questions correctly. No specific notes needed for this session."
+
+
+def _is_mistake(q: dict) -> bool:
+    """True for a wrong or unanswered question, whichever grading keys it carries."""
+    if "status" in q:
+        return q["status"] != "correct"
+    if "is_correct" in q:
+        return not q["is_correct"]
+    return q.get("user_answer_index") != q.get("correct_answer_index")
+
+
+def _option_text(q: dict, index):
+    options = q.get("options") or []
+    return options[index] if isinstance(index, int) and 0 <= index < len(options) else None
+
+
+def _compact_mistake(q: dict) -> dict:
+    """Only what the tutor needs: the question, what was picked and what was right."""
+    tags = q.get("tags") if isinstance(q.get("tags"), dict) else {}
+    mistake = {
+        "question": q.get("question_text"),
+        "student_answer": _option_text(q, q.get("user_answer_index")) or "(not answered)",
+        "correct_answer": _option_text(q, q.get("correct_answer_index")),
+    }
+    if tags.get("topic"):
+        mistake["topic"] = tags["topic"]
+    return mistake
+
+
+def _build_notes_prompt(quiz_results: dict):
+    """
+    Builds the cheat-sheet prompt from the graded quiz data, or returns None
+    if there is nothing to revise. Only the failed questions are sent, in
+    compact form, within the "notes" prompt budget.
+    """
     # --- Step 1: Identify Weaknesses ---
-    # Find all the questions the user got wrong.
-    # incorrect_questions = []
-    # for q in quiz_results.get("questions", []):
-    #     if not q.get("is_correct", True): # Assume correct if key is missing
-    #         incorrect_questions.append(q)
+    # Find all the questions the user got wrong (or skipped).
+    questions = quiz_results.get("questions", [])
+    wrong = [_compact_mistake(q) for q in questions if _is_mistake(q) and q.get("user_answer_index") is not None]
+    skipped = [_compact_mistake(q) for q in questions if _is_mistake(q) and q.get("user_answer_index") is None]
 
-    # if not incorrect_questions:
-    #     return "Great job! You answered all questions correctly. No specific notes needed for this session."
+    if not wrong and not skipped:
+        return None
 
     # --- Step 2: Dynamic Prompt Generation ---
     # Create a rich context for the LLM using the questions the user failed.
-    # This is a form of RAG using the quiz data itself as context.
-    
-    # We will format the incorrect questions nicely for the prompt.
-#     error_context = ""
-#     for i, q in enumerate(incorrect_questions):
-#         error_context += f"""
-# ### Mistake #{i+1}
-# - **Question:** {q['question_text']}
-# - **User's Answer:** {q['options'][q['user_answer_index']]}
-# - **Correct Explanation:** {q['explanation']}
-# ---
-# """
-
-    prompt = f"""
+    # This is a form of RAG using the quiz data itself as context. Wrong
+    # answers say more about a misconception than skipped ones, so skipped
+    # questions are the first to go if the prompt is over budget.
+    builder = PromptBuilder("notes", models.prompt_budget("notes"))
+    builder.add("""
 # ROLE & GOAL
 You are an expert GATE CSE tutor who excels at creating ultra-concise, high-impact "cheat sheets" for revision. Your goal is to generate a personalized, quick-reference study note for a student based on the concepts they got wrong in a recent quiz.
 
 # CONTEXT: STUDENT'S MISTAKES
-The student made the following answer on the Quiz , i am giving you the quiz data 
-{quiz_results}
-
+""")
+    builder.add_items("Questions answered wrong (one JSON object per line):", wrong, priority=1)
+    builder.add_items("Questions left unanswered:", skipped, priority=0)
+    builder.add("""
 # TASK
 Based on the student's mistakes, generate a personalized cheat sheet in Markdown. For each major concept the student failed, create a "Quick Reference" section. Each section MUST contain only these three things:
 1.  **The Key Formula / Rule:** The single most important formula or rule for this concept.
@@ -97,23 +144,123 @@ Here are the key takeaways for the topics you struggled with. Review these befor
     ```
 * **Core Logic:** To count unique combinations (not permutations), you build up the solution one coin at a time. This structure prevents re-counting the same set of coins in a different order.
 * **💡 Personalized Tip:** You seem to be confusing the logic for permutations with combinations. For combinations, always iterate through your coins in the outer loop to ensure order doesn't matter.
-"""
+""")
+    return builder.build()
+
+
+# --- 4. The Main Functions (The "Master Teacher") ---
+def generate_notes(quiz_results: dict):
+    """
+    Generates a personalized cheat sheet using the Gemini API, based on the
+    questions a user answered incorrectly in a quiz.
+
+    Args:
+        quiz_results (dict): The completed quiz data, including user answers.
+
+    Returns:
+        str: The generated notes in Markdown format, or an error message.
+    """
+    print("LOG: Starting notes generation process...")
+
+    cache_key = _notes_cache_key(quiz_results)
+    cached_notes = NOTES_CACHE.get(cache_key)
+    if cached_notes is not None:
+        print(f"LOG: Notes served from cache. Stats: {NOTES_CACHE.stats()}")
+        return cached_notes
+
+    # --- Step 1 & 2: Identify Weaknesses and Build the Prompt ---
+    prompt = _build_notes_prompt(quiz_results)
+    if prompt is None:
+        return ALL_CORRECT_MESSAGE
 
     # --- Step 3: Secure and Robust API Call ---
     try:
-        print("LOG: Making API call to Gemini for notes generation...")
-        model = genai.GenerativeModel(MODEL)
-        response = model.generate_content(prompt)
-        
-        print("LOG: API call successful.")
-        return response.text
+        notes, shared = NOTES_FLIGHTS.do(cache_key, lambda: _generate_notes(cache_key, prompt))
+        if shared:
+            print("LOG: Notes shared from an identical in-flight request.")
+        return notes
 
     except Exception as e:
         st.error(f"An error occurred while generating notes: {e}")
         print(f"ERROR: Exception during Gemini API call: {e}")
         return "Error: Could not generate notes at this time."
 
-# --- 4. Streamlit Test Harness (For standalone testing) ---
+
+def _generate_notes(cache_key: str, prompt: str) -> str:
+    """The uncoalesced API call behind `generate_notes`. Raises on failure."""
+    print("LOG: Making API call to Gemini for notes generation...")
+    response = models.generate("notes", prompt)
+
+    print("LOG: API call successful.")
+    notes = response.text
+    NOTES_CACHE.set(cache_key, notes)
+    print(f"LOG: Notes cached. Stats: {NOTES_CACHE.stats()}")
+    return notes
+
+
+def stream_notes(quiz_results: dict):
+    """
+    Streaming version of `generate_notes`, made for `st.write_stream`.
+
+    Yields the notes chunk by chunk as the model produces them, so the
+    results page shows text as soon as the first tokens arrive. Once the
+    stream finishes, the full text is cached, and later calls yield the
+    cached notes in one piece. A call made while an identical one is still
+    running waits for it and yields its full text.
+
+    Args:
+        quiz_results (dict): The completed quiz data, including user answers.
+
+    Yields:
+        str: Pieces of the Markdown notes, or an error message.
+    """
+    print("LOG: Starting streamed notes generation...")
+
+    cache_key = _notes_cache_key(quiz_results)
+    cached_notes = NOTES_CACHE.get(cache_key)
+    if cached_notes is not None:
+        print(f"LOG: Notes served from cache. Stats: {NOTES_CACHE.stats()}")
+        yield cached_notes
+        return
+
+    prompt = _build_notes_prompt(quiz_results)
+    if prompt is None:
+        yield ALL_CORRECT_MESSAGE
+        return
+
+    flight, leader = NOTES_FLIGHTS.begin(cache_key)
+    if not leader:
+        try:
+            notes = flight.wait()
+        except Exception as e:
+            print(f"ERROR: Shared notes request failed: {e}")
+            yield "\n\nError: Could not generate notes at this time."
+            return
+        print("LOG: Notes shared from an identical in-flight request.")
+        yield notes
+        return
+
+    chunks = []
+    try:
+        print("LOG: Opening streamed API call to Gemini for notes generation...")
+        for text in models.stream("notes", prompt):
+            chunks.append(text)
+            yield text
+        print("LOG: Notes stream finished.")
+        notes = "".join(chunks)
+        NOTES_CACHE.set(cache_key, notes)
+        NOTES_FLIGHTS.end(cache_key, flight, result=notes)
+        print(f"LOG: Notes cached. Stats: {NOTES_CACHE.stats()}")
+    except Exception as e:
+        print(f"ERROR: Exception during streamed Gemini API call: {e}")
+        NOTES_FLIGHTS.end(cache_key, flight, error=e)
+        yield "\n\nError: Could not generate notes at this time."
+    finally:
+        if not flight.done():
+            # The reader stopped early; don't leave followers waiting
+            NOTES_FLIGHTS.end(cache_key, flight, error=RuntimeError("Notes stream was abandoned."))
+
+# --- 5. Streamlit Test Harness (For standalone testing) ---
 if __name__ == "__main__":
     st.title("Clurious Notes Maker - Test Module")
 
@@ -186,12 +333,6 @@ if __name__ == "__main__":
     st.write("Click the button below to send the user's mistakes to the Gemini API.")
 
     if st.button("📝 Generate My Personal Notes"):
-        with st.spinner("Your personal tutor is writing your notes..."):
-            generated_notes = generate_notes(dummy_quiz_results)
-        
         st.header("3. Your Custom Cheat Sheet")
-        if generated_notes:
-            st.write(generated_notes,unsafe_allow_html=True)
-        else:
-            st.error("Failed to generate notes.")
+        st.write_stream(stream_notes(dummy_quiz_results))
 
@@ -0,0 +1,78 @@
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from models import notes_maker, profile_updater
+
+# --- 1. Configuration ---
+# Shared by every session in the server process. Each submitted quiz uses up
+# to three workers (notes, metrics, insight) for a few seconds.
+MAX_WORKERS = 12
+EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="post-submit")
+
+
+# --- 2. Notes Buffer ---
+class NotesBuffer:
+    """
+    Collects the streamed notes chunks in a worker thread so the results
+    page can show whatever has arrived so far on each rerun.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._lock = threading.Lock()
+        self.done = False
+
+    def consume(self, stream):
+        try:
+            for text in stream:
+                with self._lock:
+                    self._chunks.append(text)
+        finally:
+            self.done = True
+
+    def text(self) -> str:
+        with self._lock:
+            return "".join(self._chunks)
+
+
+# --- 3. The Pipeline ---
+class PostSubmitPipeline:
+    """
+    Everything that happens after a quiz is submitted, started at once:
+
+    - notes: the personalized cheat sheet, streamed into a NotesBuffer
+    - metrics: the new profile numbers (fast, no AI)
+    - insight: the LLM summary of the profile change; it waits only for
+      the metrics, so it overlaps with the notes call
+
+    Each part is a future the results page can poll.
+    """
+
+    def __init__(self, quiz_data: dict, user_id: str):
+        # The workers get their own copy, so later UI edits can't race with them
+        self.quiz_data = copy.deepcopy(quiz_data)
+        self.started_at = time.time()
+        self.notes = NotesBuffer()
+        self.notes_future = EXECUTOR.submit(self.notes.consume, notes_maker.stream_notes(self.quiz_data))
+        self.metrics = EXECUTOR.submit(profile_updater.calculate_profile_update, self.quiz_data, user_id)
+        self.insight = EXECUTOR.submit(self._insight)
+        print("LOG: Post-submit pipeline launched (notes, metrics, insight).")
+
+    def _insight(self) -> str:
+        result = self.metrics.result()
+        if "error" in result:
+            return result["error"]
+        return profile_updater.generate_profile_insight(result["old_profile_data"], result["updated_profile_data"])
+
+    def is_done(self) -> bool:
+        return self.notes_future.done() and self.metrics.done() and self.insight.done()
+
+
+def launch(quiz_data: dict, user_id: str) -> PostSubmitPipeline:
+    """
+    Starts notes, profile metrics and profile insight concurrently for a
+    graded quiz. `user_id` is the student's own id in the profile store.
+    """
+    return PostSubmitPipeline(quiz_data, user_id)
@@ -0,0 +1,309 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
+# --- 1. Configuration ---
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DB_PATH = os.path.join(DATA_DIR, "profiles.db")
+
+# The single-user profile file this store replaces. It is imported once, the
+# first time the store is opened, so the demo user keeps their history.
+LEGACY_PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user.json")
+DEFAULT_USER_ID = "hackathon_demo_user"
+
+MAX_UPDATE_RETRIES = 10
+REBUILD_CHUNK_EVENTS = 5000  # Attempts scored together while rebuilding
+REBUILD_CACHE_USERS = 2000   # Profiles held in memory while rebuilding; the rest wait in SQLite
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id    TEXT PRIMARY KEY,
+    version    INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    payload    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS baselines (
+    user_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class VersionConflict(RuntimeError):
+    """The profile changed since it was read; re-read and try again."""
+
+
+# --- 2. Immutable Snapshots ---
+def _freeze(value):
+    """Read-only view of parsed JSON: dicts become mapping proxies, lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """A plain, mutable (and JSON-serializable) copy of a frozen value."""
+    if isinstance(value, MappingProxyType):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+class ProfileSnapshot:
+    """
+    One version of a user's profile. `data` is read-only all the way down,
+    so a snapshot can be handed to any number of threads and sessions
+    without copying, and an update can never change an older version.
+    """
+
+    __slots__ = ("user_id", "version", "updated_at", "data")
+
+    def __init__(self, user_id: str, version: int, updated_at: float, payload: str):
+        self.user_id = user_id
+        self.version = version
+        self.updated_at = updated_at
+        self.data = _freeze(json.loads(payload))
+
+
+def new_profile(user_id: str) -> dict:
+    """The starting profile of a student with no history."""
+    return {
+        "user_id": user_id,
+        "mastery_scores": {},
+        "cognitive_skill_fingerprint": {},
+        "cognitive_skill_weaknesses": [],
+        "overall_progress_percentage": 0.0,
+    }
+
+
+# --- 3. The Store ---
+class ProfileStore:
+    """
+    Student profiles in SQLite, one row per `user_id`.
+
+    Every write is a compare-and-set on the row's version, so two quiz
+    submissions for the same student at the same time can never silently
+    overwrite each other: the loser re-reads the new version and reapplies
+    its change. Different students never contend. The database runs in WAL
+    mode, so reads are not blocked by writes, and each thread gets its own
+    connection.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, legacy_path: str = LEGACY_PROFILE_PATH):
+        self.db_path = db_path
+        self.legacy_path = legacy_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    # --- Connections ---
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._import_legacy(conn)
+                    self._initialized = True
+        return conn
+
+    def _import_legacy(self, conn: sqlite3.Connection):
+        """Imports the old user.json once, if it exists."""
+        with conn:
+            if conn.execute("SELECT 1 FROM store_meta WHERE key = 'legacy_imported'").fetchone():
+                return
+            try:
+                with open(self.legacy_path, "r") as f:
+                    profile = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                profile = None
+            if profile:
+                user_id = profile.get("user_id") or DEFAULT_USER_ID
+                conn.execute(
+                    "INSERT OR IGNORE INTO profiles (user_id, version, updated_at, payload) VALUES (?, 1, ?, ?)",
+                    (user_id, time.time(), json.dumps(profile)),
+                )
+                # Rebuilds from the attempt log start this user from here
+                conn.execute("INSERT OR IGNORE INTO baselines (user_id, payload) VALUES (?, ?)", (user_id, json.dumps(profile)))
+                print(f"LOG: Imported legacy profile for '{user_id}' into the profile store.")
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('legacy_imported', '1')")
+
+    # --- Reads ---
+    def get(self, user_id: str):
+        """Returns the latest ProfileSnapshot of `user_id`, or None for an unknown user."""
+        row = self._conn().execute(
+            "SELECT version, updated_at, payload FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return ProfileSnapshot(user_id, *row) if row else None
+
+    def baseline(self, user_id: str) -> dict:
+        """The profile a user started from before any logged attempt (mutable)."""
+        row = self._conn().execute("SELECT payload FROM baselines WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else new_profile(user_id)
+
+    # --- Writes ---
+    def put(self, user_id: str, profile: dict, expected_version: int = 0) -> ProfileSnapshot:
+        """
+        Writes a new version of a profile.
+
+        Args:
+            user_id (str): Whose profile.
+            profile (dict): The full new profile.
+            expected_version (int): The version the change was based on
+                (0 for a user who has no profile yet).
+
+        Returns:
+            ProfileSnapshot: The stored version.
+
+        Raises:
+            VersionConflict: If the stored version is not `expected_version`.
+        """
+        payload = json.dumps(profile, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            if expected_version == 0:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO profiles (user_id, version, updated_at, payload) VALUES (?, 1, ?, ?)",
+                    (user_id, now, payload),
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE profiles SET version = version + 1, updated_at = ?, payload = ? "
+                    "WHERE user_id = ? AND version = ?",
+                    (now, payload, user_id, expected_version),
+                )
+        if cursor.rowcount == 0:
+            raise VersionConflict(f"Profile '{user_id}' changed since version {expected_version}.")
+        return ProfileSnapshot(user_id, expected_version + 1, now, payload)
+
+    def update(self, user_id: str, change, create: bool = True):
+        """
+        Applies `change(old_data) -> new_profile_dict` atomically, retrying
+        on concurrent updates. `change` may run more than once, so it must
+        not have side effects, and must build a new dict rather than edit
+        `old_data` (which is read-only anyway).
+
+        Returns:
+            tuple: (old ProfileSnapshot, new ProfileSnapshot). For a new
+            user the old one is the starting profile, at version 0.
+        """
+        for _ in range(MAX_UPDATE_RETRIES):
+            old = self.get(user_id)
+            if old is None:
+                if not create:
+                    raise KeyError(f"No profile for user '{user_id}'.")
+                old = ProfileSnapshot(user_id, 0, 0.0, json.dumps(new_profile(user_id)))
+            try:
+                new = self.put(user_id, change(old.data), expected_version=old.version)
+            except VersionConflict:
+                continue
+            return old, new
+        raise VersionConflict(f"Profile '{user_id}' kept changing; gave up after {MAX_UPDATE_RETRIES} tries.")
+
+    # --- Rebuild ---
+    def rebuild(self, events, apply_batch, chunk_size: int = REBUILD_CHUNK_EVENTS,
+                cache_size: int = REBUILD_CACHE_USERS) -> int:
+        """
+        Recomputes every profile from scratch in one streaming pass: each
+        user starts from their baseline, and events are handed to
+        `apply_batch(profiles, events) -> profiles` in chunks of
+        `chunk_size`, in order.
+
+        Only the current chunk and up to `cache_size` profiles are kept in
+        memory; the rest are parked in a staging table, so memory does not
+        grow with the number of events or users. The staged profiles replace
+        the live ones in a single transaction at the end (users with no
+        events go back to their baseline).
+
+        Returns:
+            int: How many events were applied.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS profiles_rebuild")
+            conn.execute("CREATE TABLE profiles_rebuild (user_id TEXT PRIMARY KEY, payload TEXT NOT NULL)")
+
+        def park(items):
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO profiles_rebuild (user_id, payload) VALUES (?, ?)",
+                    [(user_id, json.dumps(profile, ensure_ascii=False, separators=(",", ":"))) for user_id, profile in items],
+                )
+
+        cache = OrderedDict()  # user_id -> profile, least recently used first
+
+        def apply_chunk(chunk):
+            profiles = {}
+            for user_id in dict.fromkeys(event["user_id"] for event in chunk):
+                profile = cache.pop(user_id, None)
+                if profile is None:
+                    row = conn.execute("SELECT payload FROM profiles_rebuild WHERE user_id = ?", (user_id,)).fetchone()
+                    profile = json.loads(row[0]) if row else self.baseline(user_id)
+                profiles[user_id] = profile
+            cache.update(apply_batch(profiles, chunk))
+            if len(cache) > cache_size:
+                park([cache.popitem(last=False) for _ in range(len(cache) - cache_size // 2)])
+
+        chunk, applied = [], 0
+        for event in events:
+            chunk.append(event)
+            if len(chunk) >= chunk_size:
+                apply_chunk(chunk)
+                applied += len(chunk)
+                chunk = []
+        if chunk:
+            apply_chunk(chunk)
+            applied += len(chunk)
+        park(cache.items())
+
+        now = time.time()
+        with conn:
+            conn.execute(
+                "UPDATE profiles SET version = version + 1, updated_at = ?, payload = COALESCE("
+                "(SELECT r.payload FROM profiles_rebuild r WHERE r.user_id = profiles.user_id), "
+                "(SELECT b.payload FROM baselines b WHERE b.user_id = profiles.user_id), payload)",
+                (now,),
+            )
+            conn.execute(
+                "INSERT INTO profiles (user_id, version, updated_at, payload) "
+                "SELECT r.user_id, 1, ?, r.payload FROM profiles_rebuild r "
+                "WHERE r.user_id NOT IN (SELECT user_id FROM profiles)",
+                (now,),
+            )
+            conn.execute("DROP TABLE profiles_rebuild")
+        return applied
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+
+# --- 4. Module-level Store ---
+# One store per server process, shared by every Streamlit session.
+STORE = ProfileStore()
+
+
+def get_profile(user_id: str = DEFAULT_USER_ID):
+    """Returns the latest read-only snapshot of a user's profile, or None."""
+    return STORE.get(user_id)
+
+
+def update_profile(user_id: str, change):
+    """Atomically applies `change` to a user's profile. Returns (old, new) snapshots."""
+    return STORE.update(user_id, change)
@@ -1,60 +1,89 @@
-import google.generativeai as genai
-import json
-import time
+from models import adaptive_quiz, attempt_log, mastery_engine, profile_store
+from utils.model import models
+from utils.prompt_builder import PromptBuilder, compact_json
 
 # --- 1. Configuration ---
-try:
-    GOOGLE_API_KEY = st.secrets["GOOGLE_API_KEY"]
-    genai.configure(api_key=GOOGLE_API_KEY)
-    MODEL = "gemini-1.5-pro-latest"
-except (KeyError, FileNotFoundError):
+# The API key and model settings live in utils/model.py.
+if models.configure():
+    MODEL = models.model_name("insight")
+else:
     # This allows the file to be run even without an API key for testing UI
     print("Warning: API Key not found. AI features will be disabled.")
     MODEL = None
 
+# Seqs remembered per profile above its floor; only attempts of one user
+# committing out of log order need them, so a few are plenty.
+RECENT_SEQS_KEPT = 16
 
-# --- 2. Helper Functions for Data Handling ---
-def _load_user_profile(file_path: str = 'user.json') -> dict:
-    """Loads the user's current profile from a JSON file."""
-    try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {} # Return an empty profile if it's a new user
 
-def _save_user_profile(profile_data: dict, file_path: str = 'user.json'):
-    """Saves the updated user profile to a JSON file."""
-    with open(file_path, 'w') as f:
-        json.dump(profile_data, f, indent=2)
+# --- 2. The Core Logic (The "Nurse" + "Doctor") ---
+
+def _calculate_updated_metrics(old_profile, quiz_data: dict) -> dict:
+    """
+    (The Nurse) Calculates the new user metrics based on quiz performance.
+    NO AI is used here - this is fast, deterministic math (see
+    models/mastery_engine.py).
 
+    `old_profile` is a read-only snapshot; the result is a new dict that
+    shares nothing mutable with it.
+    """
+    new_profile = mastery_engine.update_profile(profile_store.thaw(old_profile), quiz_data)
+    new_profile["topic_abilities"] = adaptive_quiz.update_abilities(new_profile.get("topic_abilities", {}), quiz_data)
+    return new_profile
 
-# --- 3. The Core Logic (The "Nurse" + "Doctor") ---
 
-def _calculate_updated_metrics(old_profile: dict, quiz_data: dict) -> dict:
+def _is_applied(profile, seq: int) -> bool:
     """
-    (The Nurse) Calculates the new user metrics based on quiz performance.
-    NO AI is used here - this is fast, deterministic math.
-    """
-    new_profile = old_profile.copy()
-    
-    # Example Logic: Update Mastery Score with a weighted average
-    weakest_topic = quiz_data['ai_analysis']['performance_highlights']['weakest_topic']
-    strongest_topic = quiz_data['ai_analysis']['performance_highlights']['strongest_topic']
-    
-    # Simulate score changes based on this quiz
-    # A real implementation would be more complex
-    if weakest_topic in new_profile['mastery_scores']:
-        new_profile['mastery_scores'][weakest_topic] = round(new_profile['mastery_scores'][weakest_topic] * 0.8 + 70.0 * 0.2, 1)
-    
-    if strongest_topic in new_profile['mastery_scores']:
-         new_profile['mastery_scores'][strongest_topic] = round(new_profile['mastery_scores'][strongest_topic] * 0.8 + 95.0 * 0.2, 1)
-
-    # Example: Update cognitive skill fingerprint
-    new_profile['cognitive_skill_fingerprint']['Mathematical-Reasoning'] = round(new_profile['cognitive_skill_fingerprint']['Mathematical-Reasoning'] * 0.8 + 55.0 * 0.2, 1)
+    Whether attempt `seq` is already folded into `profile`: every seq up to
+    `attempt_seq_floor`, plus the ones in `recent_attempt_seqs`. Attempts of
+    one user may commit out of log order, so a single high-water mark would
+    wrongly count an earlier attempt that commits later as applied.
+    """
+    floor = profile.get("attempt_seq_floor", profile.get("last_attempt_seq", 0))
+    return seq <= floor or seq in (profile.get("recent_attempt_seqs") or ())
+
+
+def _mark_applied(new_profile: dict, seq: int):
+    """Records `seq` as applied, folding the oldest remembered seqs into the floor."""
+    floor = new_profile.get("attempt_seq_floor", new_profile.get("last_attempt_seq", 0))
+    recent = sorted([*(new_profile.get("recent_attempt_seqs") or ()), seq])
+    while len(recent) > RECENT_SEQS_KEPT:
+        floor = max(floor, recent.pop(0))
+    new_profile["attempt_seq_floor"] = floor
+    new_profile["recent_attempt_seqs"] = recent
+    new_profile["last_attempt_seq"] = max(seq, new_profile.get("last_attempt_seq", 0))
+
 
+def _apply_attempt(profile, attempt: dict) -> dict:
+    """
+    Folds one logged attempt into a profile. Attempts already reflected in
+    the profile are skipped, so replaying is safe.
+    """
+    if _is_applied(profile, attempt["seq"]):
+        return profile_store.thaw(profile)
+    new_profile = _calculate_updated_metrics(profile, attempt)
+    _mark_applied(new_profile, attempt["seq"])
     return new_profile
 
 
+def _apply_attempts(profiles: dict, attempts: list) -> dict:
+    """
+    Bulk `_apply_attempt`: folds a chunk of logged attempts of many users
+    into their profiles with one vectorized pass.
+    """
+    fresh = [a for a in attempts if not _is_applied(profiles[a["user_id"]], a["seq"])]
+    updated = mastery_engine.recompute(profiles, fresh)
+    for attempt in fresh:
+        profile = updated[attempt["user_id"]]
+        profile["topic_abilities"] = adaptive_quiz.update_abilities(profile.get("topic_abilities", {}), attempt)
+        _mark_applied(profile, attempt["seq"])
+    return updated
+
+
+def _rounded(score):
+    return round(score, 1) if score is not None else None
+
+
 def _generate_profile_update_insight(old_profile: dict, new_profile: dict) -> str:
     """
     (The Doctor) Calls an LLM to generate a human-like summary of the
@@ -63,55 +92,118 @@ def _generate_profile_update_insight(old_profile: dict, new_profile: dict) -> st
     if not MODEL:
         return "AI insight disabled. API key not found."
 
-    prompt = f"""
+    # Only what changed goes to the model: the mastery moves, biggest first,
+    # and the skill weaknesses before and after.
+    old_mastery = old_profile.get("mastery_scores", {})
+    new_mastery = new_profile.get("mastery_scores", {})
+    changes = [
+        {"topic": topic, "old": _rounded(old_mastery.get(topic)), "new": round(score, 1)}
+        for topic, score in new_mastery.items() if old_mastery.get(topic) != score
+    ]
+    changes.sort(key=lambda c: abs((c["new"] or 0) - (c["old"] or 0)), reverse=True)
+    changes = [c for c in changes if c["old"] != c["new"]]
+    weaknesses = {
+        "old": old_profile.get("cognitive_skill_weaknesses", []),
+        "new": new_profile.get("cognitive_skill_weaknesses", []),
+    }
+
+    builder = PromptBuilder("insight", models.prompt_budget("insight"))
+    builder.add(f"""
 # ROLE & GOAL
 You are an expert GATE CSE learning coach. Your goal is to analyze a student's progress by comparing their profile before and after a quiz. You need to provide a concise, encouraging summary of the most important changes.
 
 # CONTEXT: STUDENT'S PROGRESS
-- **Old Profile Snapshot:** {json.dumps(old_profile)}
-- **New Profile Snapshot (After Quiz):** {json.dumps(new_profile)}
-
+Cognitive skill weaknesses (before/after): {compact_json(weaknesses)}
+""")
+    builder.add_items("Mastery changes (0-100), biggest first:", changes, priority=0)
+    builder.add("""
 # TASK
 Based on the change from the old to the new profile, write a short, human-like summary (2-3 sentences) for the user. Highlight one key improvement and one area that still needs focus.
 
 # OUTPUT FORMAT
 A single paragraph of encouraging text.
-"""
+""")
+    prompt = builder.build()
     try:
-        model = genai.GenerativeModel(MODEL)
-        response = model.generate_content(prompt)
+        response = models.generate("insight", prompt)
         return response.text
     except Exception as e:
         print(f"ERROR: AI insight generation failed: {e}")
         return "Could not generate AI insight at this time."
 
 
-# --- 4. The Main Orchestrator Function ---
-def update_user_profile(quiz_data: dict):
+# --- 3. The Main Orchestrator Functions ---
+def calculate_profile_update(quiz_data: dict, user_id: str = profile_store.DEFAULT_USER_ID):
     """
-    The main public function for this module. It orchestrates the entire
-    profile update process.
+    (Nurse only) Appends the attempt to the attempt log, then folds it into
+    the user's profile as a new version, atomically. No AI is called, so
+    this finishes in milliseconds and can run alongside the LLM calls that
+    follow a quiz.
+
+    Returns:
+        dict: The read-only profile before and after the quiz.
     """
     print("LOG: Starting user profile update...")
-    
-    # 1. Load the user's state before the quiz
-    old_profile = _load_user_profile()
-    if not old_profile:
-        return {"error": "User profile not found."}
-
-    # 2. (Nurse) Calculate the new numerical metrics
-    updated_profile_data = _calculate_updated_metrics(old_profile, quiz_data)
-    
-    # 3. (Doctor) Call the LLM to get a qualitative summary of the changes
-    ai_insight_text = _generate_profile_update_insight(old_profile, updated_profile_data)
-    
-    # 4. Save the new profile to persist the changes
-    _save_user_profile(updated_profile_data)
-    print("LOG: User profile successfully updated and saved.")
-    
-    # 5. Return the complete package for the UI
+
+    # The log is the source of truth; the profile is materialized from it
+    attempt = attempt_log.record_attempt(user_id, quiz_data)
+
+    # Load, (Nurse) recalculate and save in one step; a concurrent submission
+    # for the same user makes this re-read and recalculate, never overwrite.
+    # Only this attempt is folded in; the log is replayed only by rebuild_profiles
+    old, new = profile_store.update_profile(user_id, lambda old_profile: _apply_attempt(old_profile, attempt))
+    print(f"LOG: Profile of '{user_id}' updated to version {new.version}.")
+
     return {
-        "old_profile_data": old_profile,
-        "updated_profile_data": updated_profile_data,
-        "ai_insight_text": ai_insight_text
+        "old_profile_data": old.data,
+        "updated_profile_data": new.data
     }
+
+
+def generate_profile_insight(old_profile: dict, new_profile: dict) -> str:
+    """(Doctor only) The LLM summary of the change between two profiles."""
+    return _generate_profile_update_insight(old_profile, new_profile)
+
+
+def update_user_profile(quiz_data: dict, user_id: str = profile_store.DEFAULT_USER_ID):
+    """
+    The main public function for this module. It orchestrates the entire
+    profile update process.
+    """
+    result = calculate_profile_update(quiz_data, user_id)
+    if "error" in result:
+        return result
+
+    # (Doctor) Call the LLM to get a qualitative summary of the changes
+    result["ai_insight_text"] = generate_profile_insight(result["old_profile_data"], result["updated_profile_data"])
+
+    # Return the complete package for the UI
+    return result
+
+
+def rebuild_profiles() -> int:
+    """
+    Recomputes every profile from the attempt log in one streaming pass,
+    scoring the log in vectorized chunks. Run it after changing the
+    parameters in models/mastery_engine.py. Attempts submitted while the
+    rebuild runs are applied afterwards.
+
+    Returns:
+        int: How many attempts were replayed.
+    """
+    print("LOG: Rebuilding all profiles from the attempt log...")
+    last_seq = 0
+
+    def tracked(events):
+        nonlocal last_seq
+        for event in events:
+            last_seq = event["seq"]
+            yield event
+
+    applied = profile_store.STORE.rebuild(tracked(attempt_log.replay()), _apply_attempts)
+    # Catch up on attempts logged during the rebuild; already-applied ones are skipped
+    for attempt in attempt_log.replay(after_seq=last_seq):
+        profile_store.update_profile(attempt["user_id"], lambda old_profile, a=attempt: _apply_attempt(old_profile, a))
+        applied += 1
+    print(f"LOG: Rebuilt profiles from {applied} attempts.")
+    return applied
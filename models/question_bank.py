@@ -0,0 +1,273 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from utils import minhash
+from utils.cache import content_hash
+
+# --- 1. Configuration ---
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DB_PATH = os.path.join(DATA_DIR, "question_bank.db")
+
+# Per-attempt keys the quiz pages add to a question; never stored in the bank
+SESSION_KEYS = ("user_answer_index", "status", "time_spent_seconds", "hint_used", "answer_changes")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id              INTEGER PRIMARY KEY,
+    content_hash    TEXT NOT NULL UNIQUE,
+    subject         TEXT COLLATE NOCASE,
+    topic           TEXT COLLATE NOCASE,
+    difficulty      TEXT COLLATE NOCASE,
+    cognitive_skill TEXT COLLATE NOCASE,
+    source          TEXT NOT NULL,
+    created_at      REAL NOT NULL,
+    payload         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_questions_topic   ON questions (topic, difficulty, cognitive_skill);
+CREATE INDEX IF NOT EXISTS idx_questions_subject ON questions (subject, difficulty, cognitive_skill);
+CREATE INDEX IF NOT EXISTS idx_questions_skill   ON questions (cognitive_skill, difficulty);
+CREATE TABLE IF NOT EXISTS question_signatures (
+    id      INTEGER PRIMARY KEY REFERENCES questions (id),
+    minhash BLOB NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+"""
+
+FILTER_COLUMNS = ("subject", "topic", "difficulty", "cognitive_skill")
+
+
+# --- 2. Helpers ---
+def _clean_tag(value):
+    """Tags come from the LLM, so collapse stray whitespace and drop blanks."""
+    if not isinstance(value, str):
+        return None
+    value = " ".join(value.split())
+    return value or None
+
+
+def question_hash(question: dict) -> str:
+    """Hash of the parts that make two questions the same question."""
+    return content_hash(question.get("question_text"), question.get("options"), question.get("correct_answer_index"))
+
+
+def _row_for(question: dict, subject: str, source: str, now: float):
+    tags = question.get("tags") if isinstance(question.get("tags"), dict) else {}
+    payload = {k: v for k, v in question.items() if k not in SESSION_KEYS}
+    return (
+        question_hash(question),
+        _clean_tag(tags.get("subject") or subject),
+        _clean_tag(tags.get("topic")),
+        _clean_tag(tags.get("difficulty")),
+        _clean_tag(tags.get("cognitive_skill_tested")),
+        source,
+        now,
+        json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+    )
+
+
+# --- 3. The Bank ---
+class QuestionBank:
+    """
+    Local SQLite store of every generated and curated question.
+
+    Near-duplicates are rejected on insert: every question's MinHash
+    signature is stored next to it and kept in an in-memory LSH index, so
+    the check stays sub-linear as the bank grows.
+
+    Questions are indexed by subject, topic, difficulty and cognitive skill.
+    Filtered id lists are cached in memory until the next insert, so
+    repeated sampling for the same filter never goes back to SQLite for
+    the candidate set. Each thread gets its own connection; the database
+    runs in WAL mode so readers never block the writer.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._id_cache = {}  # filter tuple -> list of ids
+        self._tag_cache = {}  # subject -> (ids, topics, difficulties)
+        self._initialized = False
+        self._write_lock = threading.Lock()
+        self._lsh = None
+
+    # --- Connections ---
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    # Banks created before signatures were versioned
+                    if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(question_signatures)")}:
+                        conn.execute("ALTER TABLE question_signatures ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    # --- Near-duplicate index ---
+    def _near_duplicates(self) -> minhash.LSHIndex:
+        """
+        Builds the LSH index from stored signatures on first use, backfilling
+        missing ones and recomputing those made by an older shingling.
+        """
+        if self._lsh is not None:
+            return self._lsh
+        with self._write_lock:
+            if self._lsh is not None:
+                return self._lsh
+            conn = self._conn()
+            missing = conn.execute(
+                "SELECT q.id, q.payload FROM questions q "
+                "LEFT JOIN question_signatures s ON s.id = q.id WHERE s.id IS NULL OR s.version != ?",
+                (minhash.SIGNATURE_VERSION,),
+            ).fetchall()
+            if missing:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO question_signatures (id, minhash, version) VALUES (?, ?, ?)",
+                        [(row_id, minhash.signature(json.loads(payload)).tobytes(), minhash.SIGNATURE_VERSION)
+                         for row_id, payload in missing],
+                    )
+            lsh = minhash.LSHIndex()
+            for row_id, blob in conn.execute("SELECT id, minhash FROM question_signatures"):
+                lsh.add(row_id, np.frombuffer(blob, dtype=np.uint32))
+            self._lsh = lsh
+            print(f"LOG: Near-duplicate index loaded with {len(lsh)} signatures.")
+        return self._lsh
+
+    def find_duplicate(self, question: dict):
+        """Returns the id of a near-duplicate already in the bank, or None."""
+        return self._near_duplicates().find_duplicate(minhash.signature(question))
+
+    # --- Writes ---
+    def add_questions(self, questions: list, subject: str = None, source: str = "generated") -> int:
+        """
+        Inserts questions in one transaction. Exact repeats and
+        near-duplicates of questions already in the bank (or earlier in the
+        same batch) are skipped.
+
+        Returns:
+            int: How many new questions were stored.
+        """
+        now = time.time()
+        candidates = [(q, minhash.signature(q)) for q in questions if q.get("question_text")]
+        if not candidates:
+            return 0
+        lsh = self._near_duplicates()
+        conn = self._conn()
+        added, rejected = 0, 0
+        with self._write_lock, conn:
+            for question, sig in candidates:
+                if lsh.find_duplicate(sig) is not None:
+                    rejected += 1
+                    continue
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO questions "
+                    "(content_hash, subject, topic, difficulty, cognitive_skill, source, created_at, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    _row_for(question, subject, source, now),
+                )
+                if cursor.rowcount:
+                    conn.execute(
+                        "INSERT INTO question_signatures (id, minhash, version) VALUES (?, ?, ?)",
+                        (cursor.lastrowid, sig.tobytes(), minhash.SIGNATURE_VERSION),
+                    )
+                    lsh.add(cursor.lastrowid, sig)
+                    added += 1
+        if rejected:
+            print(f"LOG: Question bank rejected {rejected} near-duplicate questions.")
+        if added:
+            with self._lock:
+                self._id_cache.clear()
+                self._tag_cache.clear()
+        return added
+
+    # --- Reads ---
+    def ids(self, subject=None, topic=None, difficulty=None, cognitive_skill=None) -> list:
+        """Returns the ids matching the given tags (None means "any")."""
+        values = (_clean_tag(subject), _clean_tag(topic), _clean_tag(difficulty), _clean_tag(cognitive_skill))
+        with self._lock:
+            cached = self._id_cache.get(values)
+        if cached is not None:
+            return cached
+
+        clauses, params = [], []
+        for column, value in zip(FILTER_COLUMNS, values):
+            if value is not None:
+                clauses.append(f"{column} = ?")  # Columns are declared COLLATE NOCASE
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        ids = [row[0] for row in self._conn().execute(f"SELECT id FROM questions{where}", params)]
+        with self._lock:
+            self._id_cache[values] = ids
+        return ids
+
+    def item_tags(self, subject=None) -> tuple:
+        """
+        Returns the id, topic and difficulty of every question of `subject`
+        (None means "any") as three parallel lists, without loading the
+        payloads. Cached until the next insert.
+        """
+        value = _clean_tag(subject)
+        with self._lock:
+            cached = self._tag_cache.get(value)
+        if cached is not None:
+            return cached
+        where, params = (" WHERE subject = ?", (value,)) if value is not None else ("", ())
+        rows = self._conn().execute(f"SELECT id, topic, difficulty FROM questions{where}", params).fetchall()
+        columns = tuple(list(column) for column in zip(*rows)) if rows else ([], [], [])
+        with self._lock:
+            self._tag_cache[value] = columns
+        return columns
+
+    def get_many(self, ids: list) -> list:
+        """Loads question payloads by id, in the order given."""
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        rows = dict(self._conn().execute(f"SELECT id, payload FROM questions WHERE id IN ({placeholders})", ids))
+        return [json.loads(rows[i]) for i in ids if i in rows]
+
+    def sample(self, k: int, subject=None, topic=None, difficulty=None, cognitive_skill=None, exclude=()) -> list:
+        """Returns up to `k` random questions matching the given tags."""
+        ids = self.ids(subject, topic, difficulty, cognitive_skill)
+        if exclude:
+            excluded = set(exclude)
+            ids = [i for i in ids if i not in excluded]
+        return self.get_many(random.sample(ids, min(k, len(ids))))
+
+    def rows_after(self, last_id: int, limit: int) -> list:
+        """Returns up to `limit` (id, question) pairs with id > last_id, oldest first."""
+        rows = self._conn().execute(
+            "SELECT id, payload FROM questions WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+        )
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+
+# --- 4. Module-level Bank ---
+# One bank per server process, shared by every Streamlit session.
+BANK = QuestionBank()
+
+
+def add_questions(questions: list, subject: str = None, source: str = "generated") -> int:
+    """Stores questions in the shared bank. Returns how many were new."""
+    return BANK.add_questions(questions, subject=subject, source=source)
+
+
+def sample(k: int, **filters) -> list:
+    """Samples up to `k` questions from the shared bank by tag filters."""
+    return BANK.sample(k, **filters)
@@ -0,0 +1,251 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from models import quiz_gen
+from utils.cache import CACHE_DIR, content_hash
+
+# --- 1. Configuration ---
+# A warm pool of ready-made quizzes per (subject set, difficulty), so the
+# "Generate" buttons can start a quiz without waiting on the LLM. Nothing is
+# generated up front: a key is kept warm once a student has asked for it,
+# since pool generations spend the same quota as interactive requests.
+POOL_DEPTH = 1               # Ready quizzes kept per (subject set, difficulty)
+POOL_QUIZ_SIZE = 10          # Questions per pooled quiz; smaller requests get a slice
+REFILL_WORKERS = 2           # Pool generations allowed to run at the same time
+REFILL_INTERVAL_SECONDS = 30 # How often the worker checks for empty slots
+MAX_AGE_SECONDS = 24 * 3600  # Pooled quizzes older than this are thrown away
+WATCH_IDLE_SECONDS = 6 * 3600  # Keys nobody asked for in this long stop being refilled
+MAX_WATCHED_KEYS = 24        # Keys refilled at most; the least recently asked-for goes first
+POOL_DIR = os.path.join(CACHE_DIR, "quiz_pool")
+
+# Pooled quizzes are shared by everyone, so they are generated for a neutral profile
+POOL_PROFILE = {"user_id": "quiz_pool", "cognitive_skill_weaknesses": [], "mastery_scores": {}}
+
+
+# --- 2. Helpers ---
+def _pool_key(quiz_ask: dict) -> tuple:
+    """Normalizes a request to its pool key: (sorted subjects, difficulty)."""
+    subjects = quiz_ask.get("subject/topic")
+    subjects = tuple(sorted(subjects)) if isinstance(subjects, list) else (str(subjects),)
+    return subjects, quiz_ask.get("difficulty", "Medium")
+
+
+# --- 3. The Pool ---
+class QuizPool:
+    """
+    Keeps POOL_DEPTH generated quizzes per key on disk and refills them in
+    the background as they are consumed.
+
+    Each quiz is one JSON file in a folder per key, so a pool survives
+    server restarts. `pop` only touches the local disk and returns in
+    milliseconds; generation happens on the refill worker's thread pool.
+
+    Only keys students asked for within watch_idle_seconds are refilled,
+    and at most max_watched_keys of them.
+    """
+
+    def __init__(self, depth: int = POOL_DEPTH, refill_workers: int = REFILL_WORKERS,
+                 max_age_seconds: float = MAX_AGE_SECONDS, quiz_size: int = POOL_QUIZ_SIZE,
+                 pool_dir: str = POOL_DIR, watch_idle_seconds: float = WATCH_IDLE_SECONDS,
+                 max_watched_keys: int = MAX_WATCHED_KEYS):
+        self.depth = depth
+        self.refill_workers = refill_workers
+        self.max_age_seconds = max_age_seconds
+        self.quiz_size = quiz_size
+        self.pool_dir = pool_dir
+        self.watch_idle_seconds = watch_idle_seconds
+        self.max_watched_keys = max_watched_keys
+
+        self._watched = OrderedDict()  # pool key -> template request, least recently asked-for first
+        self._last_asked = {}   # pool key -> when it was last asked for
+        self._in_flight = {}    # pool key -> generations running
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "stale_dropped": 0, "generated": 0, "failed": 0}
+
+    # --- Public API ---
+    def start(self):
+        """Starts the refill worker once per process. Safe to call on every rerun."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.refill_workers, thread_name_prefix="quiz-pool")
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="quiz-pool-refill")
+            self._thread.start()
+        print("LOG: Quiz pool refill worker started.")
+
+    def pop(self, quiz_ask: dict):
+        """
+        Takes a ready quiz for this request out of the pool.
+
+        Returns:
+            dict: The quiz trimmed to the requested size, or None on a miss.
+        """
+        num_questions = int(quiz_ask.get("Num ques", self.quiz_size))
+        key = _pool_key(quiz_ask)
+        if num_questions > self.quiz_size:
+            # The pool could never serve this, so it is not kept warm either
+            with self._lock:
+                self._stats["bypassed"] += 1
+            return None
+        self._watch(key, quiz_ask)
+
+        quiz = None
+        with self._lock:
+            for path in self._fresh_files(key):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        quiz = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    _silent_remove(path)  # Unreadable, so no later request could use it either
+                    quiz = None
+                    continue
+                if quiz and len(quiz.get("questions", [])) >= num_questions:
+                    _silent_remove(path)
+                    break
+                quiz = None  # Too short for this request; kept for smaller ones
+            self._stats["hits" if quiz else "misses"] += 1
+        self._wake.set()  # Refill the slot we just emptied (or missed)
+
+        if quiz is None:
+            print(f"LOG: Quiz pool miss for {key}.")
+            return None
+        print(f"LOG: Quiz pool hit for {key}.")
+        quiz["questions"] = quiz["questions"][:num_questions]
+        return quiz
+
+    def stats(self) -> dict:
+        """Returns pool counters, the hit rate and how many quizzes are ready per key."""
+        with self._lock:
+            stats = dict(self._stats)
+            keys = list(self._watched)
+            stats["ready"] = {" + ".join(k[0]) + f" ({k[1]})": len(self._fresh_files(k)) for k in keys}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    # --- Storage ---
+    def _key_dir(self, key: tuple) -> str:
+        return os.path.join(self.pool_dir, content_hash(key)[:16])
+
+    def _fresh_files(self, key: tuple) -> list:
+        """Lists the pooled quiz files for a key, oldest first, dropping stale ones."""
+        folder = self._key_dir(key)
+        if not os.path.isdir(folder):
+            return []
+        now = time.time()
+        fresh = []
+        for entry in os.scandir(folder):
+            if not entry.name.endswith(".json"):
+                continue
+            mtime = entry.stat().st_mtime
+            if now - mtime > self.max_age_seconds:
+                _silent_remove(entry.path)
+                self._stats["stale_dropped"] += 1
+            else:
+                fresh.append((mtime, entry.path))
+        return [path for _, path in sorted(fresh)]
+
+    def _store(self, key: tuple, quiz: dict):
+        folder = self._key_dir(key)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{time.time_ns()}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(quiz, f, ensure_ascii=False)
+        os.replace(tmp_path, path)  # Atomic, so pop never reads half a quiz
+
+    # --- Refilling ---
+    def _watch(self, key: tuple, quiz_ask: dict):
+        """Keeps `key` refilled, evicting the least recently asked-for keys beyond max_watched_keys."""
+        with self._lock:
+            if key not in self._watched:
+                self._watched[key] = {"subject/topic": quiz_ask.get("subject/topic"), "difficulty": key[1]}
+            self._watched.move_to_end(key)
+            self._last_asked[key] = time.time()
+            while len(self._watched) > self.max_watched_keys:
+                self._unwatch(next(iter(self._watched)))
+
+    def _unwatch(self, key: tuple):
+        """Stops refilling a key; its pooled quizzes stay poppable until stale. Call under the lock."""
+        del self._watched[key]
+        self._last_asked.pop(key, None)
+        print(f"LOG: Quiz pool stopped refilling {key}.")
+
+    def _drop_idle_keys(self):
+        """Stops refilling keys nobody asked for within watch_idle_seconds. Call under the lock."""
+        cutoff = time.time() - self.watch_idle_seconds
+        for key in [k for k, asked in self._last_asked.items() if asked < cutoff]:
+            self._unwatch(key)
+
+    def _loop(self):
+        while True:
+            try:
+                self._refill_once()
+            except Exception as e:
+                print(f"ERROR: Quiz pool refill pass failed: {e}")
+            self._wake.wait(REFILL_INTERVAL_SECONDS)
+            self._wake.clear()
+
+    def _refill_once(self):
+        with self._lock:
+            self._drop_idle_keys()
+            jobs = []
+            for key, request in self._watched.items():
+                missing = self.depth - len(self._fresh_files(key)) - self._in_flight.get(key, 0)
+                for _ in range(max(missing, 0)):
+                    self._in_flight[key] = self._in_flight.get(key, 0) + 1
+                    jobs.append((key, request))
+        for key, request in jobs:
+            self._executor.submit(self._generate, key, request)
+
+    def _generate(self, key: tuple, request: dict):
+        try:
+            quiz = quiz_gen.generate_quiz(POOL_PROFILE, {**request, "Num ques": self.quiz_size}, use_cache=False)
+            if quiz and quiz.get("questions"):
+                self._store(key, quiz)
+                with self._lock:
+                    self._stats["generated"] += 1
+            else:
+                with self._lock:
+                    self._stats["failed"] += 1
+        except Exception as e:
+            print(f"ERROR: Quiz pool generation for {key} failed: {e}")
+            with self._lock:
+                self._stats["failed"] += 1
+        finally:
+            with self._lock:
+                self._in_flight[key] -= 1
+
+
+def _silent_remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# --- 4. Module-level Pool ---
+# One pool per server process, shared by every Streamlit session.
+POOL = QuizPool()
+
+
+def start():
+    """Starts the background refill worker (idempotent)."""
+    POOL.start()
+
+
+def pop(quiz_ask: dict):
+    """Returns a ready quiz for `quiz_ask`, or None if the pool has none."""
+    return POOL.pop(quiz_ask)
+
+
+def get_pool_stats() -> dict:
+    """Returns pool hit/miss counters and ready counts per key."""
+    return POOL.stats()
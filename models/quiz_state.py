@@ -0,0 +1,381 @@
+import json
+import struct
+import sys
+import threading
+import weakref
+
+import numpy as np
+
+# --- 1. Configuration ---
+STATUSES = ("unanswered", "correct", "incorrect")  # Stored as their index
+UNANSWERED, CORRECT, INCORRECT = range(len(STATUSES))
+NO_ANSWER = -1          # Answer array value of an unanswered question
+MAX_ANSWER_CHANGES = np.iinfo(np.uint16).max
+
+# Per-attempt keys of a question dict; the arrays hold these instead
+SESSION_FIELDS = ("user_answer_index", "status", "time_spent_seconds", "hint_used", "answer_changes")
+
+# Binary format: header, the question contents as one JSON document, then the
+# per-question arrays back to back in ARRAY_FIELDS order.
+MAGIC = b"CLQZ"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBII")  # magic, version, question count, JSON length
+
+ARRAY_FIELDS = (
+    ("answers", np.int8),
+    ("correct", np.int8),
+    ("status", np.uint8),
+    ("time_spent", np.float32),
+    ("hint_used", np.bool_),
+    ("answer_changes", np.uint16),
+)
+
+
+# --- 2. Questions ---
+class Question:
+    """
+    The fixed content of one quiz question. Slotted, so a 65-question mock
+    holds 65 small records instead of 65 dicts; keys the quiz does not use
+    itself (e.g. `bank_id`) are kept in `extra`.
+    """
+
+    __slots__ = ("question_id", "question_text", "options", "correct_answer_index", "hint", "explanation", "tags", "extra")
+
+    FIELDS = ("question_id", "question_text", "options", "correct_answer_index", "hint", "explanation", "tags")
+
+    def __init__(self, question_id=None, question_text="", options=(), correct_answer_index=None,
+                 hint="", explanation="", tags=None, extra=None):
+        self.question_id = question_id
+        self.question_text = question_text
+        self.options = tuple(options or ())
+        self.correct_answer_index = correct_answer_index
+        self.hint = hint
+        self.explanation = explanation
+        self.tags = tags if isinstance(tags, dict) else {}
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, question: dict, skip: tuple = ()) -> "Question":
+        extra = {k: v for k, v in question.items() if k not in cls.FIELDS and k not in skip}
+        return cls(**{k: question.get(k) for k in cls.FIELDS}, extra=extra)
+
+    def to_dict(self) -> dict:
+        question = dict(self.extra or {})
+        question.update({
+            "question_id": self.question_id,
+            "question_text": self.question_text,
+            "options": list(self.options),
+            "correct_answer_index": self.correct_answer_index,
+            "hint": self.hint,
+            "explanation": self.explanation,
+            "tags": dict(self.tags),
+        })
+        return question
+
+    def get(self, key: str, default=None):
+        """Dict-style read, so code written for question dicts works on either."""
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return (self.extra or {}).get(key, default)
+
+    def __getitem__(self, key: str):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return (self.extra or {})[key]
+
+
+# --- 3. The Quiz ---
+class QuizState:
+    """
+    One student's quiz in progress: the questions, plus the answers,
+    grades and timings as parallel compact arrays (one slot per question)
+    instead of keys patched into every question dict.
+
+    The arrays grow in place as streamed or adaptive questions arrive.
+    Properties like `answers` and `time_spent` are read-only views of the
+    live arrays (no copy); `to_bytes` / `from_bytes` persist the whole
+    state, and `memory_bytes` reports what it holds.
+    """
+
+    __slots__ = ("quiz_title", "questions", "_positions", "_size") + tuple(f"_{name}" for name, _ in ARRAY_FIELDS) + ("__weakref__",)
+
+    def __init__(self, quiz_title: str = None, questions: list = (), capacity: int = 0):
+        self.quiz_title = quiz_title
+        self.questions = []
+        self._positions = {}  # question_id -> index
+        self._size = 0
+        capacity = max(capacity, len(questions), 1)
+        for name, dtype in ARRAY_FIELDS:
+            setattr(self, f"_{name}", np.zeros(capacity, dtype=dtype))
+        self._answers.fill(NO_ANSWER)
+        self.extend(questions)
+        _register(self)
+
+    @classmethod
+    def from_quiz_data(cls, quiz_data: dict) -> "QuizState":
+        """Builds the state from quiz dicts, keeping any answers and timings they already carry."""
+        return cls(quiz_data.get("quiz_title"), quiz_data.get("questions") or [])
+
+    # --- Questions ---
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self, needed: int):
+        capacity = len(self._answers)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name, dtype in ARRAY_FIELDS:
+            old = getattr(self, f"_{name}")
+            new = np.full(capacity, NO_ANSWER if name == "answers" else 0, dtype=dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, f"_{name}", new)
+
+    def extend(self, questions: list) -> int:
+        """
+        Appends questions (dicts or Question records). Session keys on a dict
+        (user_answer_index, status, time_spent_seconds, ...) fill its slots.
+
+        Returns:
+            int: How many questions were added.
+        """
+        self._grow(self._size + len(questions))
+        for q in questions:
+            i = self._size
+            if isinstance(q, Question):
+                question, session = q, {}
+            else:
+                question, session = Question.from_dict(q, skip=SESSION_FIELDS), q
+            self.questions.append(question)
+            self._positions.setdefault(str(question.question_id), i)
+            correct = question.correct_answer_index
+            self._correct[i] = correct if isinstance(correct, int) else NO_ANSWER
+            answer = session.get("user_answer_index")
+            self._answers[i] = answer if answer is not None else NO_ANSWER
+            self._status[i] = STATUSES.index(session.get("status") or "unanswered")
+            self._time_spent[i] = session.get("time_spent_seconds") or 0.0
+            self._hint_used[i] = bool(session.get("hint_used"))
+            self._answer_changes[i] = min(session.get("answer_changes") or 0, MAX_ANSWER_CHANGES)
+            self._size += 1
+        return len(questions)
+
+    def append(self, question) -> int:
+        """Appends one question and returns its index."""
+        self.extend([question])
+        return self._size - 1
+
+    def pop(self) -> Question:
+        """Removes and returns the last question (its slots are reset)."""
+        self._size -= 1
+        i = self._size
+        question = self.questions.pop()
+        if self._positions.get(str(question.question_id)) == i:
+            del self._positions[str(question.question_id)]
+        for name, _ in ARRAY_FIELDS:
+            getattr(self, f"_{name}")[i] = NO_ANSWER if name == "answers" else 0
+        return question
+
+    def question(self, index: int) -> Question:
+        return self.questions[index]
+
+    def index_of(self, question_id) -> int:
+        """Position of a question by its id, or None."""
+        return self._positions.get(str(question_id))
+
+    # --- Per-question Slots ---
+    def answer(self, index: int):
+        """The selected option index, or None."""
+        value = int(self._answers[index])
+        return None if value == NO_ANSWER else value
+
+    def set_answer(self, index: int, answer):
+        self._answers[index] = NO_ANSWER if answer is None else answer
+
+    def set_correct_answer(self, index: int, answer: int):
+        """Changes a question's answer key (e.g. after the answer-key check corrected it)."""
+        self.questions[index].correct_answer_index = answer
+        self._correct[index] = answer
+
+    def status(self, index: int) -> str:
+        return STATUSES[self._status[index]]
+
+    def hint_was_used(self, index: int) -> bool:
+        return bool(self._hint_used[index])
+
+    def mark_hint_used(self, index: int):
+        self._hint_used[index] = True
+
+    def seconds_spent(self, index: int) -> float:
+        return float(self._time_spent[index])
+
+    def record_tracking(self, index: int, seconds: float, hint_used: bool, answer_changes: int):
+        """Stores the browser-measured totals of a question (see utils/quiz_tracker.py)."""
+        self._time_spent[index] = seconds
+        self._hint_used[index] |= bool(hint_used)
+        self._answer_changes[index] = min(answer_changes, MAX_ANSWER_CHANGES)
+
+    # --- Zero-copy Views ---
+    def _view(self, name: str) -> np.ndarray:
+        view = getattr(self, f"_{name}")[:self._size]
+        view.flags.writeable = False  # Only this view; the state itself stays writable
+        return view
+
+    @property
+    def answers(self) -> np.ndarray:
+        """Selected option per question (NO_ANSWER when unanswered)."""
+        return self._view("answers")
+
+    @property
+    def status_codes(self) -> np.ndarray:
+        """Index into STATUSES per question."""
+        return self._view("status")
+
+    @property
+    def time_spent(self) -> np.ndarray:
+        return self._view("time_spent")
+
+    @property
+    def hints_used(self) -> np.ndarray:
+        return self._view("hint_used")
+
+    @property
+    def answer_changes(self) -> np.ndarray:
+        return self._view("answer_changes")
+
+    def answered_mask(self) -> np.ndarray:
+        return self.answers != NO_ANSWER
+
+    def answered_count(self) -> int:
+        return int(np.count_nonzero(self.answered_mask()))
+
+    # --- Grading ---
+    def grade(self):
+        """Marks every question correct or incorrect (an unanswered one is incorrect)."""
+        n = self._size
+        right = (self._answers[:n] == self._correct[:n]) & (self._answers[:n] != NO_ANSWER)
+        self._status[:n] = np.where(right, CORRECT, INCORRECT)
+
+    def correct_count(self) -> int:
+        return int(np.count_nonzero(self.status_codes == CORRECT))
+
+    def total_time(self) -> float:
+        return float(self.time_spent.sum(dtype=np.float64))
+
+    # --- Conversion ---
+    def question_dict(self, index: int) -> dict:
+        """One question as the dict shape the rest of the app uses (content plus session keys)."""
+        question = self.questions[index].to_dict()
+        question.update({
+            "user_answer_index": self.answer(index),
+            "status": self.status(index),
+            "time_spent_seconds": self.seconds_spent(index),
+            "hint_used": self.hint_was_used(index),
+            "answer_changes": int(self._answer_changes[index]),
+        })
+        return question
+
+    def to_quiz_data(self) -> dict:
+        """A fresh `quiz_data` dict, for the notes, profile and attempt-log code."""
+        return {"quiz_title": self.quiz_title, "questions": [self.question_dict(i) for i in range(self._size)]}
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the state: a small header, the question contents as one
+        JSON document and the raw bytes of each per-question array.
+        """
+        content = json.dumps({
+            "quiz_title": self.quiz_title,
+            "questions": [q.to_dict() for q in self.questions],
+        }, separators=(",", ":")).encode("utf-8")
+        parts = [HEADER.pack(MAGIC, FORMAT_VERSION, self._size, len(content)), content]
+        for name, _ in ARRAY_FIELDS:
+            parts.append(getattr(self, f"_{name}")[:self._size].tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QuizState":
+        """
+        Restores a state written by `to_bytes`.
+
+        Raises:
+            ValueError: If the data is not a serialized quiz state of this version.
+        """
+        if len(data) < HEADER.size:
+            raise ValueError("Serialized quiz state is truncated")
+        magic, version, size, content_length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a serialized quiz state (version {FORMAT_VERSION})")
+        offset = HEADER.size
+        content = json.loads(bytes(data[offset:offset + content_length]).decode("utf-8"))
+        offset += content_length
+
+        state = cls(content.get("quiz_title"), capacity=size)
+        state.extend([Question.from_dict(q) for q in content.get("questions", [])])
+        if len(state) != size:
+            raise ValueError("Serialized quiz state is inconsistent")
+        for name, dtype in ARRAY_FIELDS:
+            array = np.frombuffer(data, dtype=dtype, count=size, offset=offset)
+            getattr(state, f"_{name}")[:size] = array
+            offset += array.nbytes
+        return state
+
+    # --- Memory ---
+    def memory_bytes(self) -> dict:
+        """
+        Approximate memory held by this quiz: the question records (with
+        their strings), the per-question arrays and the total.
+        """
+        seen = set()
+        content = sys.getsizeof(self.questions) + sum(_deep_size(q, seen) for q in self.questions)
+        arrays = sum(getattr(self, f"_{name}").nbytes for name, _ in ARRAY_FIELDS)
+        index = _deep_size(self._positions, seen)
+        return {
+            "questions": len(self),
+            "content_bytes": content + index,
+            "array_bytes": arrays,
+            "total_bytes": content + index + arrays + sys.getsizeof(self),
+        }
+
+
+# --- 4. Memory Helpers ---
+def _deep_size(obj, seen: set) -> int:
+    """sys.getsizeof of an object and everything it holds, counting shared objects once."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__") and not isinstance(obj, np.ndarray):
+        size += sum(_deep_size(getattr(obj, name, None), seen) for name in obj.__slots__)
+    return size
+
+
+# Every live quiz in this server process (one per session), for the memory report
+_LIVE = weakref.WeakSet()
+_LIVE_LOCK = threading.Lock()
+
+
+def _register(state: QuizState):
+    with _LIVE_LOCK:
+        _LIVE.add(state)
+
+
+def memory_report() -> list:
+    """
+    Per live quiz in this process: its title, size and memory use, next to
+    what the same quiz takes as plain question dicts. Largest first.
+    """
+    with _LIVE_LOCK:
+        states = list(_LIVE)
+    rows = []
+    for state in states:
+        if not len(state):
+            continue
+        usage = state.memory_bytes()
+        usage["as_dicts_bytes"] = _deep_size(state.to_quiz_data(), set())
+        rows.append({"quiz_title": state.quiz_title or "Quiz", **usage})
+    rows.sort(key=lambda r: r["total_bytes"], reverse=True)
+    return rows
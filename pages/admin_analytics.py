@@ -0,0 +1,73 @@
+# admin view of how students do :)
+# Reads the aggregates precomputed by models/analyzer.py (run it offline with
+# `python -m models.analyzer`, or with the button below); nothing here scans
+# the attempt log itself.
+import time
+
+import streamlit as st
+
+from models import analyzer
+
+st.set_page_config(page_title="Clurious Admin - Cohort Analytics", layout="wide")
+st.title("Cohort Analytics")
+
+if st.button("Update now"):
+    with st.spinner("Reading new attempts..."):
+        analyzer.run()
+
+reports = analyzer.load_reports()
+if reports is None:
+    st.info("No aggregates yet. Run `python -m models.analyzer` or press 'Update now'.")
+    st.stop()
+
+meta = reports["meta"]
+st.caption(
+    f"{meta['attempts']} attempts, computed "
+    f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(meta['generated_at']))}."
+)
+
+cohorts = sorted({row["cohort"] for row in reports["topic_accuracy"]})
+difficulties = sorted({row["difficulty"] for row in reports["topic_accuracy"]})
+col1, col2 = st.columns(2)
+chosen_cohorts = col1.multiselect("Cohorts (week of first quiz)", cohorts, default=cohorts)
+chosen_difficulties = col2.multiselect("Difficulty", difficulties, default=difficulties)
+
+
+def _selected(rows):
+    return [r for r in rows if r["cohort"] in chosen_cohorts and r.get("difficulty", "") in chosen_difficulties]
+
+
+# --- 1. Per-topic Accuracy ---
+st.subheader("Per-topic accuracy")
+accuracy = _selected(reports["topic_accuracy"])
+st.dataframe(accuracy, use_container_width=True, hide_index=True)
+by_topic = {}
+for row in accuracy:
+    answered, correct = by_topic.get(row["topic"], (0, 0))
+    by_topic[row["topic"]] = (answered + row["answered"], correct + (row["accuracy"] or 0) * row["answered"])
+chart = [{"topic": topic, "accuracy": correct / answered} for topic, (answered, correct) in by_topic.items() if answered]
+if chart:
+    st.bar_chart(chart, x="topic", y="accuracy")
+
+# --- 2. Time per Question ---
+st.subheader("Time per question")
+st.caption(f"Histogram bins (seconds): {meta['time_bin_edges_seconds']} and above.")
+st.dataframe(_selected(reports["time_per_question"]), use_container_width=True, hide_index=True)
+
+# --- 3. Hint Usage ---
+st.subheader("Hint usage")
+st.dataframe(_selected(reports["hint_usage"]), use_container_width=True, hide_index=True)
+
+# --- 4. Drop-off Points ---
+st.subheader("Where students abandon quizzes")
+dropoff = [r for r in reports["dropoff"] if r["cohort"] in chosen_cohorts]
+st.dataframe(
+    [{k: r[k] for k in ("cohort", "attempts", "completion_rate")} for r in dropoff],
+    use_container_width=True, hide_index=True,
+)
+abandoned = {}
+for row in dropoff:
+    for question, count in row["abandoned_at"].items():
+        abandoned[int(question)] = abandoned.get(int(question), 0) + count
+if abandoned:
+    st.bar_chart([{"question": q, "abandoned": n} for q, n in sorted(abandoned.items())], x="question", y="abandoned")
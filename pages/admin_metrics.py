@@ -0,0 +1,104 @@
+# admin view of the model calls :)
+# Shows where the latency (and money) goes, per call site, from the metrics
+# every call through utils/model.py writes to utils/llm_metrics.py.
+import time
+
+import streamlit as st
+
+from models import notes_maker, quiz_gen, quiz_pool, quiz_state
+from utils import llm_metrics, render_timing
+from utils.model import models
+
+st.set_page_config(page_title="Clurious Admin - LLM Metrics", layout="wide")
+st.title("LLM Call Metrics")
+
+WINDOWS = {
+    "Last hour": 3600,
+    "Last 24 hours": 24 * 3600,
+    "Last 7 days": 7 * 24 * 3600,
+    "All time": None,
+}
+
+window = st.selectbox("Time window", list(WINDOWS), index=1)
+since = time.time() - WINDOWS[window] if WINDOWS[window] else 0.0
+if st.button("Refresh"):
+    st.rerun()
+
+# --- 1. Totals ---
+rows = llm_metrics.rollup(since)
+total_calls = sum(r["calls"] for r in rows)
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Calls", total_calls)
+col2.metric("Errors", sum(r["errors"] for r in rows))
+col3.metric("Parse failures", sum(r["parse_failures"] for r in rows))
+col4.metric("Estimated cost", f"${sum(r['cost_usd'] for r in rows):.4f}")
+
+health = models.health()
+if health:
+    st.caption("Circuit breakers: " + ", ".join(f"{name}: **{state}**" for name, state in health.items()))
+
+# --- 2. Per Call Site ---
+st.subheader("Per call site")
+if not rows:
+    st.info("No model calls recorded in this window yet.")
+else:
+    st.caption("Latency percentiles cover successful calls only. Slowest p95 first.")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    chart = [{"call site": f"{r['call_site']} ({r['model']})", "p95 wall time (ms)": r["wall_p95_ms"] or 0} for r in rows]
+    st.bar_chart(chart, x="call site", y="p95 wall time (ms)")
+
+# --- 3. Recent Failures ---
+st.subheader("Recent failures")
+failures = llm_metrics.recent_failures(since)
+if failures:
+    for event in failures:
+        event["time"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event["ts"]))
+    columns = ["time", "kind", "call_site", "model", "error", "detail", "count", "wall_ms"]
+    st.dataframe([{c: e.get(c) for c in columns} for e in failures], use_container_width=True, hide_index=True)
+else:
+    st.write("None 🎉")
+
+# --- 4. Caches (this server process) ---
+st.subheader("Caches")
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.write("**Notes cache**")
+    st.json(notes_maker.get_notes_cache_stats())
+    st.write("**Quiz cache**")
+    st.json(quiz_gen.get_quiz_cache_stats())
+with col2:
+    st.write("**Quiz pool**")
+    st.json(quiz_pool.get_pool_stats())
+with col3:
+    st.write("**Shared identical requests**")
+    st.json({"quiz": quiz_gen.QUIZ_FLIGHTS.stats(), "notes": notes_maker.NOTES_FLIGHTS.stats()})
+
+# --- 5. Page Render Times (this server process) ---
+st.subheader("Page render times")
+st.caption("Server time per script run or fragment run. On the quiz page an answer click reruns only the question panel.")
+renders = render_timing.stats()
+if renders:
+    st.dataframe(renders, use_container_width=True, hide_index=True)
+else:
+    st.write("No pages rendered yet.")
+
+# --- 6. Quiz Session Memory (this server process) ---
+st.subheader("Quiz session memory")
+st.caption("Memory held by each open quiz, next to what the same quiz would take as plain question dicts.")
+sessions = quiz_state.memory_report()
+if sessions:
+    col1, col2 = st.columns(2)
+    col1.metric("Open quizzes", len(sessions))
+    col2.metric("Total", f"{sum(r['total_bytes'] for r in sessions) / 1024:.1f} KiB")
+    st.dataframe(sessions, use_container_width=True, hide_index=True)
+else:
+    st.write("No quizzes open.")
+
+# --- 7. Question Validation ---
+st.subheader("Question validation")
+st.caption("Share of generated questions that failed the schema check, per model and prompt version. Invalid questions are repaired in one extra call (the quiz_repair rows).")
+validation = llm_metrics.validation_rollup(since)
+if validation:
+    st.dataframe(validation, use_container_width=True, hide_index=True)
+else:
+    st.write("No questions checked in this window yet.")
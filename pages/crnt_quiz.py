@@ -1,7 +1,8 @@
 import streamlit as st
 import time
-from streamlit.components.v1 import html
-from models import notes_maker
+import uuid
+from models import notes_maker, quiz_state
+from utils import quiz_tracker
 
 # --- PAGE CONFIGURATION & STYLING ---
 # This sets the page to a wide layout and a custom theme.
@@ -50,8 +51,8 @@ st.markdown(hide_pages_css, unsafe_allow_html=True)
 # --- 1. SETUP & DUMMY DATA ---
 def initialize_quiz_state():
     """Initializes the session state for the quiz."""
-    if 'quiz_data' not in st.session_state:
-        st.session_state.quiz_data = [
+    if not st.session_state.get('quiz'):
+        st.session_state.quiz = quiz_state.QuizState.from_quiz_data({"questions": [
             # ... (Dummy data remains the same) ...
             {
                 "question_id": "DS_TREE_01",
@@ -123,16 +124,8 @@ def initialize_quiz_state():
                 "correct_answer_index": 3,
                 "hint": "2NF specifically deals with the problem of partial dependencies, where a non-key attribute depends on only a part of a composite primary key."
             }
-        ]
-    # Robustly initialize keys for each question on every run
-    for item in st.session_state.quiz_data["questions"]:
-        if 'user_answer_index' not in item:
-            item['user_answer_index'] = None
-        if 'status' not in item:
-            item['status'] = "unanswered"
-        # NEW: Key to store time spent on each question
-        if 'time_spent_seconds' not in item:
-            item['time_spent_seconds'] = 0.0
+        ]})
+    # Answers, grades and timings are kept in the QuizState arrays (models/quiz_state.py)
 
     if 'current_question_index' not in st.session_state:
         st.session_state.current_question_index = 0
@@ -143,19 +136,13 @@ def initialize_quiz_state():
     if 'start_time' not in st.session_state:
         st.session_state.start_time = time.time()
     
-    # NEW: Key to track when the user switched to the current question
-    if 'last_question_switch_time' not in st.session_state:
-        st.session_state.last_question_switch_time = time.time()
-
-
-# --- UTILITY FUNCTION FOR TIME TRACKING ---
-def _update_time_spent():
-    """Calculates time spent on the previous question and updates the state."""
-    time_spent = time.time() - st.session_state.last_question_switch_time
-    # This ensures we only update the time for the question that was being viewed
-    previous_index = st.session_state.get('previous_question_index', st.session_state.current_question_index)
-    st.session_state.quiz_data["questions"][previous_index]['time_spent_seconds'] += time_spent
-    st.session_state.last_question_switch_time = time.time()
+    # Per-question timing is measured in the browser (utils/quiz_tracker.py)
+    if 'quiz_token' not in st.session_state:
+        st.session_state.quiz_token = uuid.uuid4().hex
+    if 'hint_nonce' not in st.session_state:
+        st.session_state.hint_nonce = 0
+    if 'flush_token' not in st.session_state:
+        st.session_state.flush_token = None
 
 
 # Call the initialization function at the start of the script
@@ -169,14 +156,7 @@ def confirm_submit():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("✅ Yes, Submit"):
-            # Record time for the final question before submitting
-            st.session_state.previous_question_index = st.session_state.current_question_index
-            _update_time_spent() 
-            for q in st.session_state.quiz_data["questions"]:
-                if q['user_answer_index'] == q['correct_answer_index']:
-                    q['status'] = 'correct'
-                else:
-                    q['status'] = 'incorrect'
+            st.session_state.quiz.grade()
             st.session_state.quiz_submitted = True
             st.rerun()
     with col2:
@@ -193,15 +173,16 @@ if st.session_state.quiz_submitted:
         if st.button("Home"):
             st.switch_page("main.py")
             st.session_state.quiz_submitted = False
-    correct_answers = sum(1 for q in st.session_state.quiz_data["questions"] if q['status'] == 'correct')
-    score = (correct_answers / len(st.session_state.quiz_data["questions"])) * 100
-    total_time = sum(q['time_spent_seconds'] for q in st.session_state.quiz_data['questions'])
+    quiz = st.session_state.quiz
+    correct_answers = quiz.correct_count()
+    score = (correct_answers / len(quiz)) * 100
+    total_time = quiz.total_time()
 
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("Final Score", f"{score:.2f}%")
     with col2:
-        st.metric("Correct Answers", f"{correct_answers} / {len(st.session_state.quiz_data['questions'])}")
+        st.metric("Correct Answers", f"{correct_answers} / {len(quiz)}")
     with col3:
         st.metric("Total Time", f"{int(total_time // 60)}m {int(total_time % 60)}s")
 
@@ -209,23 +190,26 @@ if st.session_state.quiz_submitted:
 
     st.write("---")
     st.subheader("Detailed Review:")
-    for i, q in enumerate(st.session_state.quiz_data["questions"]):
-        with st.expander(f"**Question {i+1}: { 'Correct ✅' if q['status'] == 'correct' else 'Incorrect ❌'}**"):
-            st.markdown(f"**{q['question_text']}**")
-            user_answer = q['options'][q['user_answer_index']] if q['user_answer_index'] is not None else "Not Answered"
-            correct_answer = q['options'][q['correct_answer_index']]
+    for i, q in enumerate(quiz.questions):
+        status = quiz.status(i)
+        with st.expander(f"**Question {i+1}: { 'Correct ✅' if status == 'correct' else 'Incorrect ❌'}**"):
+            st.markdown(f"**{q.question_text}**")
+            answer_index = quiz.answer(i)
+            user_answer = q.options[answer_index] if answer_index is not None else "Not Answered"
+            correct_answer = q.options[q.correct_answer_index]
             
-            time_spent = q['time_spent_seconds']
+            time_spent = quiz.seconds_spent(i)
             st.caption(f"Time spent on this question: {int(time_spent // 60)}m {int(time_spent % 60)}s")
 
-            if q['status'] == 'correct':
+            if status == 'correct':
                 st.success(f"✔️ Your answer: {user_answer}")
             else:
                 st.error(f"❌ Your answer: {user_answer}")
                 st.info(f"💡 Correct answer: {correct_answer}")
 
-            st.write(q["explanation"])
-    st.write(notes_maker.generate_notes(st.session_state.quiz_data))
+            st.write(q.explanation)
+    # Streamed so the first tokens show up right away; cached after the first run
+    st.write_stream(notes_maker.stream_notes(quiz.to_quiz_data()))
     #  update the user profile for the next outcome :) 
     
         # got the coginitive analysis and show and show the home button  :) 
@@ -236,51 +220,10 @@ else:
         st.title("Clurious Navigator")
         st.write("---")
 
-        # --- LIVE RUNNING CLOCK (Using JavaScript) ---
-        # st.subheader("Current Time")
-        # st.markdown("<div id='live-clock' class='live-display'></div>", unsafe_allow_html=True)
-        
-        # --- LIVE TIMER (Using JavaScript) ---
-        st.subheader("Time Elapsed")
-        st.markdown("<div id='live-timer' class='live-display' style='font-size: 1.75rem; font-weight: 600;'>00:00</div>", unsafe_allow_html=True)
-        
-        start_time_ms = int(st.session_state.start_time * 1000)
-        live_update_js = f"""
-        <script>
-        function updateClock() {{
-            var now = new Date();
-            var clockElement = window.parent.document.getElementById('live-clock');
-            if (clockElement) {{
-                clockElement.textContent = now.toLocaleTimeString('en-US');
-            }}
-            setTimeout(updateClock, 1000);
-        }}
-
-        var startTime = {start_time_ms};
-        function updateTimer() {{
-            var now = new Date().getTime();
-            var distance = now - startTime;
-            var minutes = Math.floor((distance % (1000 * 60 * 60)) / (1000 * 60));
-            var seconds = Math.floor((distance % (1000 * 60)) / 1000);
-            
-            minutes = minutes < 10 ? "0" + minutes : minutes;
-            seconds = seconds < 10 ? "0" + seconds : seconds;
-
-            var timerElement = window.parent.document.getElementById('live-timer');
-            if (timerElement) {{
-                timerElement.textContent = minutes + ":" + seconds;
-            }}
-            setTimeout(updateTimer, 1000);
-        }}
-        
-        updateClock();
-        updateTimer();
-        </script>
-        """
-        html(live_update_js, height=0)
-        
-        total_questions = len(st.session_state.quiz_data["questions"])
-        answered_questions = sum(1 for q in st.session_state.quiz_data["questions"] if q['user_answer_index'] is not None)
+        quiz = st.session_state.quiz
+        total_questions = len(quiz)
+        answered = quiz.answered_mask()
+        answered_questions = int(answered.sum())
         # st.metric("Answered", f"{answered_questions} / {total_questions}")
 
         st.subheader("Question Palette")
@@ -288,19 +231,15 @@ else:
         cols = st.columns(2)
         for i in range(total_questions):
             with cols[i % 2]:
-                q_data = st.session_state.quiz_data["questions"][i]
                 def on_nav_click(new_index):
-                    # Store the current index before updating, to correctly calculate time spent
-                    st.session_state.previous_question_index = st.session_state.current_question_index
-                    _update_time_spent()
                     st.session_state.current_question_index = new_index
 
                 if st.session_state.current_question_index == i:
-                    if q_data['user_answer_index'] is not None:
+                    if answered[i]:
                         st.button(f"✅ Q {i+1}", key=f"nav_{i}", use_container_width=True, type="primary")
                     else:
                         st.button(f"Q {i+1}", key=f"nav_{i}", use_container_width=True, type="primary")
-                elif q_data['user_answer_index'] is not None:
+                elif answered[i]:
                     st.button(f"✅ Q {i+1}", key=f"nav_{i}", use_container_width=True, on_click=on_nav_click, args=(i,))
                 else:
                     st.button(f"Q {i+1}", key=f"nav_{i}", use_container_width=True, on_click=on_nav_click, args=(i,))
@@ -320,45 +259,60 @@ else:
     st.write("---")
 
     index = st.session_state.current_question_index
-    question_data = st.session_state.quiz_data["questions"][index]
-    
+    question_data = quiz.question(index)
+
+    # Live clock; focus time, hints and answer changes are measured in the browser and sent in batches
+    batch = quiz_tracker.quiz_tracker(
+        st.session_state.quiz_token,
+        str(question_data.question_id),
+        quiz.answer(index),
+        st.session_state.hint_nonce,
+        st.session_state.start_time,
+        flush_token=st.session_state.flush_token,
+    )
+    submit_ready = False
+    if batch and batch.get("token") == st.session_state.quiz_token:
+        quiz_tracker.apply_batch(quiz, batch)
+        if st.session_state.flush_token and batch.get("ack") == st.session_state.flush_token:
+            st.session_state.flush_token = None
+            submit_ready = True
+
     with st.container(border=True):
         st.subheader(f"Question {index + 1}")
-        st.markdown(f"**{question_data['question_text']}**")
+        st.markdown(f"**{question_data.question_text}**")
 
         user_answer_index = st.radio(
             "Choose your answer:",
-            options=range(len(question_data['options'])),
-            format_func=lambda i: question_data['options'][i],
-            index=question_data['user_answer_index'],
-            key=f"q_{question_data['question_id']}"
+            options=range(len(question_data.options)),
+            format_func=lambda i: question_data.options[i],
+            index=quiz.answer(index),
+            key=f"q_{question_data.question_id}"
         )
         
-        if user_answer_index is not None and st.session_state.quiz_data["questions"][index]['user_answer_index'] != user_answer_index:
-            st.session_state.quiz_data["questions"][index]['user_answer_index'] = user_answer_index
+        if user_answer_index is not None and quiz.answer(index) != user_answer_index:
+            quiz.set_answer(index, user_answer_index)
             st.rerun()
 
         # --- ADD THIS BLOCK FOR THE CLEAR BUTTON ---
         # This button only appears if an answer has been selected.
         hint,clr = st.columns(2)
 
-        if question_data['user_answer_index'] is not None:
+        if quiz.answer(index) is not None:
             if clr.button("Clear Selection 🗑️"):
                 # Set the answer for the current question back to None
-                st.session_state.quiz_data["questions"][index]['user_answer_index'] = None
+                quiz.set_answer(index, None)
                 # Rerun the app to reflect the change immediately
                 st.rerun()
         # --- END OF BLOCK ---
         st.write("")
         if hint.button("💡 Hint"):
-            st.info(question_data['hint'])
-            #  changing the tag that hint has been used :)
+            quiz.mark_hint_used(index)
+            st.session_state.hint_nonce += 1
+            st.info(question_data.hint)
 
     st.write("---")
 
     def on_nav_button_click(direction):
-        st.session_state.previous_question_index = st.session_state.current_question_index
-        _update_time_spent()
         st.session_state.current_question_index += direction
 
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -373,8 +327,17 @@ else:
     st.write("")
     
     # if answered_questions == total_questions:
+    # Submit first asks the browser for its latest timings; the dialog opens once they arrive
     if st.button("Submit Quiz ✅", type="primary", use_container_width=True):
+        st.session_state.flush_token = uuid.uuid4().hex
+        st.rerun()
+    if submit_ready:
         confirm_submit()
         st.stop()
+    elif st.session_state.flush_token:
+        st.caption("⏳ Saving your question timings...")
+        if st.button("Submit without timings"):
+            confirm_submit()
+            st.stop()
         
 
@@ -74,7 +74,7 @@ if st.session_state.quiz_state == "create":
 
     if quiz_type == "Full Syllabus":
         with st.form("full_syllabus_form"):
-            numberQues_full = st.number_input("Number of Questions", min_value=1, max_value=5, value=5,help="Number of Question can be maximum 5")
+            numberQues_full = st.number_input("Number of Questions", min_value=1, max_value=65, value=5,help="Up to 65 questions (a full GATE mock)")
             Mode = st.select_slider("Select the Level of Quiz",["Easy","Medium","Hard"],value="Medium")
             if st.form_submit_button("🚀 Generate Full Syllabus Quiz"):
                 st.success("Quiz parameters received! Generating your quiz...")
@@ -86,7 +86,7 @@ if st.session_state.quiz_state == "create":
             subject_name = st.multiselect("Choose Subjects",
                                           gate_cse_subjects,help="You can select Multiple Subjects")
             
-            numberQues_custom = st.number_input("Number of Questions", min_value=1, max_value=5, value=5,help="Number of Question can be maximum 5")
+            numberQues_custom = st.number_input("Number of Questions", min_value=1, max_value=65, value=5,help="Up to 65 questions (a full GATE mock)")
             Mode = st.select_slider("Select the Level of Quiz",["Easy","Medium","Hard"],value="Medium")
             if st.form_submit_button("🚀 Generate Custom Quiz"):
                 if not subject_name:
@@ -99,7 +99,10 @@ if st.session_state.quiz_state == "create":
                         with st.spinner("Please Wait"):
                             st.session_state.quiz_data = quiz_gen.generate_quiz(dummy_user_profile,quiz_info)
                         # st.write(st.session_state.quiz_data)
-                    st.switch_page("pages/crnt_quiz.py")
+                    if st.session_state.quiz_data is None:
+                        st.error("An error occurred while generating the quiz. Please try again.")
+                    else:
+                        st.switch_page("pages/crnt_quiz.py")
 else:
     # just show please select the name and the test to continue starting 
     st.info("Please select the exam to conintue")
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- 1. Configuration ---
+# All on-disk caches live under one folder at the project root so they are
+# easy to find and to wipe.
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+
+
+# --- 2. Helpers ---
+def content_hash(*parts) -> str:
+    """
+    Returns a stable SHA-256 hex digest of any JSON-serializable values.
+    Dict keys are sorted so two equal payloads always hash the same,
+    no matter how they were built.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# --- 3. The Cache ---
+class TieredCache:
+    """
+    A two-tier cache: an in-memory LRU in front of an optional on-disk store.
+
+    The memory tier is bounded by entry count. The disk tier keeps one JSON
+    file per key, expires entries after `ttl_seconds` and evicts the oldest
+    files once the folder grows past `max_disk_bytes`. Values must be
+    JSON-serializable. It is safe to share one instance across Streamlit
+    sessions (threads) of the same server process.
+    """
+
+    def __init__(self, name: str, max_entries: int = 128, use_disk: bool = True,
+                 ttl_seconds: float = 7 * 24 * 3600, max_disk_bytes: int = 50 * 1024 * 1024):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = os.path.join(CACHE_DIR, name) if use_disk else None
+
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # Computed lazily on first disk write
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    # --- Public API ---
+    def get(self, key: str):
+        """Returns the cached value for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._put_memory(key, entry[0], entry[1])
+            return entry[1]
+
+    def set(self, key: str, value):
+        """Stores `value` under `key` in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, now, value)
+        self._write_disk(key, now, value)
+
+    def delete(self, key: str):
+        """Drops `key` from both tiers."""
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.disk_dir:
+            self._remove_disk_file(self._path(key))
+
+    def clear(self):
+        """Drops every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self.disk_dir and os.path.isdir(self.disk_dir):
+                for entry in os.scandir(self.disk_dir):
+                    if entry.name.endswith(".json"):
+                        _silent_remove(entry.path)
+            self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    # --- Memory tier ---
+    def _put_memory(self, key, stored_at, value):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    # --- Disk tier ---
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str, now: float):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return None
+        if now - record.get("stored_at", 0) > self.ttl_seconds:
+            self._remove_disk_file(path)
+            return None
+        return record["stored_at"], record["value"]
+
+    def _write_disk(self, key: str, stored_at: float, value):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": stored_at, "value": value}, f, ensure_ascii=False)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)  # Atomic, so readers never see half a file
+            new_size = os.path.getsize(path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"ERROR: Could not write '{self.name}' cache entry to disk: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += new_size - old_size
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _scan_disk_bytes(self) -> int:
+        return sum(e.stat().st_size for e in os.scandir(self.disk_dir) if e.name.endswith(".json"))
+
+    def _evict_disk(self):
+        """Drops expired files first, then the oldest ones, until under budget."""
+        now = time.time()
+        files = sorted(
+            (e.stat().st_mtime, e.stat().st_size, e.path)
+            for e in os.scandir(self.disk_dir) if e.name.endswith(".json")
+        )
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            if total <= self.max_disk_bytes and now - mtime <= self.ttl_seconds:
+                break
+            _silent_remove(path)
+            total -= size
+            self._stats["evictions"] += 1
+        self._disk_bytes = total
+
+    def _remove_disk_file(self, path: str):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        _silent_remove(path)
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+
+
+def _silent_remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
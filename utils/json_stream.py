@@ -0,0 +1,95 @@
+import json
+
+
+class QuestionStreamParser:
+    """
+    Incremental parser for the quiz JSON while it is still being streamed.
+
+    Feed it text chunks as they arrive. Every time an object inside the
+    top-level "questions" array is closed, it is decoded and returned, so
+    callers get question 1 long before the model has written question 5.
+    It only tracks strings, escapes and nesting depth, so each character is
+    looked at once no matter how the chunks are split.
+    """
+
+    def __init__(self, array_key: str = "questions"):
+        self.array_key = array_key
+        self._buffer = []          # Every chunk seen so far
+        self._text = ""            # Unscanned tail plus the open object, if any
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None  # Index in _text where the current string began
+        self._last_string = None   # Last complete string at depth 1 (the key)
+        self._array_depth = None   # Depth inside the target array, once found
+        self._object_start = None  # Index in _text of the open question object
+        self.errors = 0
+
+    def feed(self, chunk: str) -> list:
+        """Consumes one chunk and returns the questions completed by it."""
+        self._buffer.append(chunk)
+        start = len(self._text)
+        self._text += chunk
+        completed = []
+
+        i = start
+        text = self._text
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._array_depth is None:
+                        self._last_string = text[self._string_start + 1:i]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._last_string == self.array_key:
+                    self._array_depth = self._depth
+                elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._object_start = i
+            elif ch in "}]":
+                if ch == "}" and self._object_start is not None and self._depth == self._array_depth + 1:
+                    question = self._decode(text[self._object_start:i + 1])
+                    if question is not None:
+                        completed.append(question)
+                    self._object_start = None
+                elif ch == "]" and self._depth == self._array_depth:
+                    self._array_depth = None
+                    self._last_string = None
+                self._depth -= 1
+            i += 1
+
+        # Keep only the part we still need: the open question object, if any
+        if self._object_start is not None:
+            offset = self._object_start
+            self._text = text[offset:]
+            self._object_start = 0
+            if self._in_string:
+                self._string_start -= offset
+        else:
+            self._text = ""
+            if self._in_string:
+                # A key split across chunks: keep it so it can still be read
+                self._text = text[self._string_start:]
+                self._string_start = 0
+        return completed
+
+    def full_text(self) -> str:
+        """Returns everything fed so far."""
+        return "".join(self._buffer)
+
+    def _decode(self, raw: str):
+        try:
+            question = json.loads(raw)
+        except json.JSONDecodeError:
+            self.errors += 1
+            print("ERROR: Skipping a malformed question object in the stream.")
+            return None
+        return question if isinstance(question, dict) else None
@@ -0,0 +1,262 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# --- 1. Configuration ---
+METRICS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "llm_metrics")
+
+# USD per million tokens (input, output). Only used for the cost estimate on
+# the admin page; unknown models are counted as free.
+MODEL_PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-1.5-pro-latest": (1.25, 5.00),
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+def estimate_cost(model: str, prompt_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * input_price + (output_tokens or 0) * output_price) / 1_000_000
+
+
+# --- 2. One Model Call ---
+class CallRecord:
+    """
+    Times one model call. The gateway marks the first token and the end of
+    the call; the finished record is written to the store exactly once.
+    """
+
+    def __init__(self, store, call_site: str, model: str, stream: bool, attempt: int = 1):
+        self.store = store
+        self.call_site = call_site
+        self.model = model
+        self.stream = stream
+        self.attempt = attempt
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._first_token = None
+        self.finished = False
+
+    def first_token(self):
+        if self._first_token is None:
+            self._first_token = time.perf_counter()
+
+    def finish(self, usage=None, error: Exception = None, cancelled: bool = False):
+        """
+        Writes the record.
+
+        Args:
+            usage: The response's `usage_metadata`, if any.
+            error (Exception): The exception the call failed with, if any.
+            cancelled (bool): True if the caller stopped reading a stream early.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        end = time.perf_counter()
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        if error is not None:
+            status = "error"
+        elif cancelled:
+            status = "cancelled"
+        else:
+            status = "ok"
+        first = self._first_token if self._first_token is not None else (end if status == "ok" else None)
+        self.store.append({
+            "kind": "call",
+            "ts": self.started_at,
+            "call_site": self.call_site,
+            "model": self.model,
+            "stream": self.stream,
+            "attempt": self.attempt,
+            "status": status,
+            "error": f"{type(error).__name__}: {error}"[:300] if error is not None else None,
+            "wall_ms": round((end - self._start) * 1000, 1),
+            "ttft_ms": round((first - self._start) * 1000, 1) if first is not None else None,
+            "prompt_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "cost_usd": estimate_cost(self.model, prompt_tokens, output_tokens),
+        })
+
+
+# --- 3. The Store ---
+class MetricsStore:
+    """
+    Append-only JSON-lines log of model calls and parse failures, one file
+    per day. Lines are only ever appended, so a crash can cost at most the
+    line being written, and old days can be deleted or archived as whole
+    files. Rollups are computed on read.
+    """
+
+    def __init__(self, directory: str = METRICS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path_for(self, ts: float) -> str:
+        return os.path.join(self.directory, time.strftime("calls-%Y-%m-%d.jsonl", time.localtime(ts)))
+
+    def append(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            with self._lock:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._path_for(event["ts"]), "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            # Metrics must never break a model call
+            print(f"ERROR: Could not write LLM metrics: {e}")
+
+    def start_call(self, call_site: str, model: str, stream: bool = False, attempt: int = 1) -> CallRecord:
+        return CallRecord(self, call_site, model, stream, attempt)
+
+    def record_parse_failure(self, call_site: str, model: str, count: int = 1, detail: str = ""):
+        self.append({
+            "kind": "parse_failure",
+            "ts": time.time(),
+            "call_site": call_site,
+            "model": model,
+            "count": count,
+            "detail": detail[:300],
+        })
+
+    def record_validation(self, call_site: str, model: str, prompt_version: str, checked: int, errors: list):
+        """
+        Records the schema check of one response's questions: how many were
+        checked and, per invalid question, its list of problem fields.
+        """
+        fields = {}
+        for question_fields in errors:
+            for field in set(question_fields):
+                fields[field] = fields.get(field, 0) + 1
+        self.append({
+            "kind": "validation",
+            "ts": time.time(),
+            "call_site": call_site,
+            "model": model,
+            "prompt_version": prompt_version,
+            "checked": checked,
+            "invalid": len(errors),
+            "fields": fields,
+        })
+
+    def events(self, since: float = 0.0) -> list:
+        """Returns every event at or after the `since` timestamp, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        first_file = os.path.basename(self._path_for(since)) if since else ""
+        events = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".jsonl") or name < first_file:
+                continue
+            with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A torn last line from a crash
+                    if event.get("ts", 0) >= since:
+                        events.append(event)
+        return events
+
+    def rollup(self, since: float = 0.0) -> list:
+        """
+        Aggregates events per (call site, model).
+
+        Latency percentiles only cover successful calls; failed and
+        cancelled calls are counted separately.
+
+        Returns:
+            list: One dict per call site and model, slowest p95 first.
+        """
+        groups = {}
+        for event in self.events(since):
+            if event.get("kind") not in ("call", "parse_failure"):
+                continue
+            key = (event.get("call_site"), event.get("model"))
+            group = groups.setdefault(key, {"calls": [], "parse_failures": 0})
+            if event.get("kind") == "call":
+                group["calls"].append(event)
+            elif event.get("kind") == "parse_failure":
+                group["parse_failures"] += event.get("count", 1)
+
+        rows = []
+        for (call_site, model), group in groups.items():
+            calls = group["calls"]
+            ok = [c for c in calls if c["status"] == "ok"]
+            row = {
+                "call_site": call_site,
+                "model": model,
+                "calls": len(calls),
+                "errors": sum(1 for c in calls if c["status"] == "error"),
+                "cancelled": sum(1 for c in calls if c["status"] == "cancelled"),
+                "retries": sum(1 for c in calls if c.get("attempt", 1) > 1),
+                "parse_failures": group["parse_failures"],
+                "prompt_tokens": sum(c.get("prompt_tokens") or 0 for c in calls),
+                "output_tokens": sum(c.get("output_tokens") or 0 for c in calls),
+                "cost_usd": round(sum(c.get("cost_usd") or 0 for c in calls), 4),
+            }
+            for field in ("wall_ms", "ttft_ms"):
+                values = np.array([c[field] for c in ok if c.get(field) is not None], dtype=np.float64)
+                for p in PERCENTILES:
+                    row[f"{field[:-3]}_p{p}_ms"] = round(float(np.percentile(values, p)), 1) if len(values) else None
+            rows.append(row)
+        rows.sort(key=lambda r: r["wall_p95_ms"] or 0, reverse=True)
+        return rows
+
+
+# --- 4. Module-level Store ---
+# One store per server process, shared by every Streamlit session.
+STORE = MetricsStore()
+
+
+def rollup(since: float = 0.0) -> list:
+    """Per call site latency percentiles, token totals, cost and failure counts."""
+    return STORE.rollup(since)
+
+
+def validation_rollup(since: float = 0.0) -> list:
+    """
+    Question validation failure rates per (call site, model, prompt version),
+    with the fields that fail most often. Highest failure rate first.
+    """
+    groups = {}
+    for event in STORE.events(since):
+        if event.get("kind") != "validation":
+            continue
+        key = (event.get("call_site"), event.get("model"), event.get("prompt_version"))
+        group = groups.setdefault(key, {"generations": 0, "checked": 0, "invalid": 0, "fields": {}})
+        group["generations"] += 1
+        group["checked"] += event.get("checked", 0)
+        group["invalid"] += event.get("invalid", 0)
+        for field, count in (event.get("fields") or {}).items():
+            group["fields"][field] = group["fields"].get(field, 0) + count
+
+    rows = []
+    for (call_site, model, prompt_version), group in groups.items():
+        top_fields = sorted(group["fields"].items(), key=lambda item: item[1], reverse=True)[:3]
+        rows.append({
+            "call_site": call_site,
+            "model": model,
+            "prompt_version": prompt_version,
+            "generations": group["generations"],
+            "questions": group["checked"],
+            "invalid": group["invalid"],
+            "failure_rate": round(group["invalid"] / group["checked"], 4) if group["checked"] else None,
+            "top_fields": ", ".join(f"{field} ({count})" for field, count in top_fields),
+        })
+    rows.sort(key=lambda r: r["failure_rate"] or 0, reverse=True)
+    return rows
+
+
+def recent_failures(since: float = 0.0, limit: int = 50) -> list:
+    """The latest failed calls and parse failures, newest first."""
+    failures = [
+        e for e in STORE.events(since)
+        if e.get("kind") == "parse_failure" or e.get("status") == "error"
+    ]
+    return failures[::-1][:limit]
@@ -0,0 +1,103 @@
+import re
+import threading
+import zlib
+
+import numpy as np
+
+# --- 1. Configuration ---
+NUM_PERM = 128             # MinHash signature length
+LSH_BANDS = 32             # NUM_PERM must equal LSH_BANDS * rows per band; 4 rows catch nearly all pairs at 0.7
+DUPLICATE_THRESHOLD = 0.7  # Estimated Jaccard similarity that counts as a duplicate
+SHINGLE_WORDS = 3          # Stem shingles are runs of this many words
+SIGNATURE_VERSION = 2      # Bump whenever shingling changes; stored signatures are then recomputed
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)  # Fixed seed: signatures must be stable across restarts
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.int64)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _words(text) -> list:
+    # "What's" and "whats" are the same word
+    return _TOKEN_RE.findall(str(text or "").lower().replace("'", "").replace("\u2019", ""))
+
+
+# --- 2. Signatures ---
+def question_shingles(question: dict) -> np.ndarray:
+    """
+    Hashed shingles of a question: every run of SHINGLE_WORDS words of its
+    normalized stem, plus each normalized option as one whole shingle. Case,
+    punctuation, spacing and option order do not matter.
+
+    Word runs make a one-word change that flips the meaning ("worst-case"
+    vs "best-case") break several shingles, while a trailing reword only
+    breaks the runs it touches. An option counts as much as one run, so a
+    shared option set does not make two different stems look alike.
+    """
+    words = _words(question.get("question_text"))
+    n = SHINGLE_WORDS
+    shingles = {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))} if words else set()
+    for option in question.get("options") or []:
+        shingles.add("option:" + " ".join(_words(option)))
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.int64, count=len(shingles))
+
+
+def signature(question: dict) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values) of a question."""
+    shingles = question_shingles(question) % _PRIME
+    if len(shingles) == 0:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint32)
+    # Every permutation hash of every shingle in one vectorized step
+    hashes = (shingles[:, None] * _A[None, :] + _B[None, :]) % _PRIME
+    return hashes.min(axis=0).astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+# --- 3. LSH Index ---
+class LSHIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures.
+
+    Each signature is cut into LSH_BANDS bands; two questions become
+    candidates only if a whole band matches, so a lookup touches a handful
+    of buckets instead of the whole bank. Candidates are then confirmed
+    against DUPLICATE_THRESHOLD using their full signatures.
+    """
+
+    def __init__(self, bands: int = LSH_BANDS, threshold: float = DUPLICATE_THRESHOLD):
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.threshold = threshold
+        self._buckets = [dict() for _ in range(bands)]
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def _band_keys(self, sig: np.ndarray) -> list:
+        return [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+    def add(self, key, sig: np.ndarray):
+        with self._lock:
+            self._signatures[key] = sig
+            for band, band_key in enumerate(self._band_keys(sig)):
+                self._buckets[band].setdefault(band_key, []).append(key)
+
+    def find_duplicate(self, sig: np.ndarray):
+        """Returns the key of a stored near-duplicate of `sig`, or None."""
+        with self._lock:
+            candidates = set()
+            for band, band_key in enumerate(self._band_keys(sig)):
+                candidates.update(self._buckets[band].get(band_key, ()))
+            best_key, best_score = None, self.threshold
+            for key in candidates:
+                score = similarity(sig, self._signatures[key])
+                if score >= best_score:
+                    best_key, best_score = key, score
+        return best_key
+
+    def __len__(self):
+        return len(self._signatures)
@@ -1,22 +1,496 @@
-#  this model will genrate the question for us :) 
+#  this model will genrate the question for us :)
+# Every Gemini call in the app goes through the `models` gateway below, so the
+# API is configured once and each model client is built once per process.
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
+import streamlit as st
+import google.generativeai as genai
 
+from utils import llm_metrics, safe_eval
+from utils.cache import TieredCache, content_hash
+from utils.prompt_builder import CHARS_PER_TOKEN, PromptBuilder, estimate_tokens
+from utils.resilience import (
+    CircuitBreaker, CircuitOpenError, RateLimiter, RateLimitTimeout, decorrelated_jitter, is_retryable,
+)
+from utils.single_flight import SingleFlight
+
+# --- 1. Central Configuration ---
+# One entry per call site. Tune model, temperature, timeout (seconds) and
+# prompt budget (input tokens) here instead of inside the feature modules.
+CALL_SITES = {
+    "quiz": {
+        "model": "gemini-2.5-flash",
+        "temperature": 0.7,  # A bit of creativity
+        "timeout": 120,
+        "response_mime_type": "application/json",
+        "prompt_budget": 3000,  # Estimated input tokens; see utils/prompt_builder.py
+    },
+    "quiz_repair": {
+        "model": "gemini-2.5-flash",
+        "temperature": 0.3,  # Fix what is broken, do not get creative
+        "timeout": 60,
+        "response_mime_type": "application/json",
+        "prompt_budget": 2000,
+    },
+    "verify": {
+        "model": "gemini-2.5-flash",
+        "temperature": 0.0,  # The solver should answer the same way every time
+        "timeout": 60,
+        "response_mime_type": "application/json",
+        "prompt_budget": 1500,
+    },
+    "notes": {
+        "model": "gemini-1.5-pro-latest",
+        "temperature": None,  # Use the model default
+        "timeout": 90,
+        "response_mime_type": None,
+        "prompt_budget": 2500,
+    },
+    "insight": {
+        "model": "gemini-1.5-pro-latest",
+        "temperature": None,
+        "timeout": 30,
+        "response_mime_type": None,
+        "prompt_budget": 1200,
+    },
+}
+
+# Per-model quotas (requests and tokens per minute). Set these to the
+# project's limits: the limiter keeps the whole server just under them, so
+# calls queue briefly instead of failing with 429.
+MODEL_QUOTAS = {
+    "gemini-2.5-flash": {"rpm": 1000, "tpm": 1_000_000},
+    "gemini-1.5-pro-latest": {"rpm": 360, "tpm": 2_000_000},
+}
+DEFAULT_QUOTA = {"rpm": 60, "tpm": 250_000}
+
+# Retries on 429 / transient 5xx, with decorrelated-jitter delays (seconds)
+MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 20.0
+
+# Consecutive retryable failures that open a model's circuit, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 30.0
+
+# Answer-key verification (see Verify_Quiz): concurrent solver calls per
+# server process, how long a caller waits for them, the solver confidence
+# needed to dispute a key it cannot prove wrong locally, and the confidence
+# at which its expression alone may replace a key its own answer_index
+# does not back
+VERIFY_WORKERS = 8
+VERIFY_TIMEOUT_SECONDS = 90
+DISPUTE_CONFIDENCE = 0.8
+CORRECTION_CONFIDENCE = 0.9
+VERDICT_TTL_SECONDS = 30 * 24 * 3600
+
+
+def _read_api_key():
+    """Reads the API key from Streamlit secrets, falling back to the environment."""
+    try:
+        return st.secrets["GOOGLE_API_KEY"]
+    except (KeyError, FileNotFoundError):
+        return os.environ.get("GOOGLE_API_KEY")
+
+
+# --- 2. The Gateway ---
 class models:
-    
-    
-    def __init__(self):
-        pass 
+    """
+    Process-wide gateway to the Gemini API.
+
+    Streamlit re-executes page scripts on every interaction, but imported
+    modules stay loaded, so the state kept on this class is shared by all
+    sessions of the server. `genai.configure` runs once, and one
+    `GenerativeModel` is kept per model name. Those clients sit on top of
+    genai's shared transport, so connections are reused between requests.
+
+    Every call waits for the model's rate limiter, is retried with jittered
+    backoff on quota and transient server errors, and fails fast while the
+    model's circuit breaker is open.
+
+    Every call is timed and logged to `utils.llm_metrics` (wall time, time
+    to first token, token usage, outcome), see pages/admin_metrics.py.
+    """
+
+    _clients = {}
+    _limiters = {}
+    _breakers = {}
+    _lock = threading.Lock()
+    _configured = None
+
+    @classmethod
+    def configure(cls) -> bool:
+        """Configures the API key once. Returns False if no key is available."""
+        if cls._configured is None:
+            with cls._lock:
+                if cls._configured is None:
+                    api_key = _read_api_key()
+                    if api_key:
+                        genai.configure(api_key=api_key)
+                    cls._configured = bool(api_key)
+        return cls._configured
+
+    @classmethod
+    def model_name(cls, call_site: str) -> str:
+        """Returns the model configured for a call site."""
+        return CALL_SITES[call_site]["model"]
+
+    @classmethod
+    def prompt_budget(cls, call_site: str) -> int:
+        """Returns the input-token budget of a call site's prompt."""
+        return CALL_SITES[call_site]["prompt_budget"]
+
+    @classmethod
+    def client(cls, model_name: str) -> genai.GenerativeModel:
+        """Returns the shared client for `model_name`, creating it on first use."""
+        client = cls._clients.get(model_name)
+        if client is None:
+            with cls._lock:
+                client = cls._clients.get(model_name)
+                if client is None:
+                    print(f"LOG: Creating shared Gemini client for '{model_name}'.")
+                    client = genai.GenerativeModel(model_name)
+                    cls._clients[model_name] = client
+        return client
+
+    @classmethod
+    def _guards(cls, model_name: str):
+        """Returns the shared rate limiter and circuit breaker of `model_name`."""
+        with cls._lock:
+            if model_name not in cls._limiters:
+                quota = MODEL_QUOTAS.get(model_name, DEFAULT_QUOTA)
+                cls._limiters[model_name] = RateLimiter(quota["rpm"], quota["tpm"])
+                cls._breakers[model_name] = CircuitBreaker(
+                    model_name, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS
+                )
+            return cls._limiters[model_name], cls._breakers[model_name]
+
+    @classmethod
+    def _retry_delay(cls, call_site: str, breaker: CircuitBreaker, error: Exception, attempt: int,
+                     delay: float, can_retry: bool = True, trial: bool = False):
+        """
+        Handles a failed attempt. Returns the seconds to wait before the
+        next attempt, or None if the error should be raised. `trial` is
+        what `breaker.before_call()` returned for the attempt.
+        """
+        if isinstance(error, (CircuitOpenError, RateLimitTimeout)):
+            if trial:
+                breaker.cancel_trial()  # Stopped by the rate limiter; the backend was never asked
+        else:
+            breaker.record_failure(error)
+        if not can_retry or attempt >= MAX_ATTEMPTS or not is_retryable(error):
+            return None
+        delay = decorrelated_jitter(delay, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+        print(f"LOG: '{call_site}' call failed ({type(error).__name__}); retry {attempt} in {delay:.1f}s.")
+        return delay
+
+    @classmethod
+    def _prepare(cls, call_site: str, overrides: dict):
+        """Resolves the client and request settings for one call."""
+        if not cls.configure():
+            raise RuntimeError("Gemini API key not found. Please set it in your Streamlit secrets.")
+
+        settings = {**CALL_SITES[call_site], **overrides}
+        config = {}
+        if settings.get("temperature") is not None:
+            config["temperature"] = settings["temperature"]
+        if settings.get("response_mime_type"):
+            config["response_mime_type"] = settings["response_mime_type"]
+
+        request = {
+            "generation_config": genai.GenerationConfig(**config),
+            "request_options": {"timeout": settings["timeout"]},
+        }
+        return cls.client(settings["model"]), request, settings["model"]
+
+    @classmethod
+    def generate(cls, call_site: str, prompt: str, **overrides):
+        """
+        Runs one `generate_content` call with the settings of `call_site`.
+
+        Args:
+            call_site (str): A key of CALL_SITES, e.g. "quiz" or "notes".
+            prompt (str): The full prompt to send.
+            **overrides: Any CALL_SITES setting to override for this call.
+
+        Returns:
+            The raw Gemini response.
+        """
+        client, request, model_name = cls._prepare(call_site, overrides)
+        limiter, breaker = cls._guards(model_name)
+        estimated = estimate_tokens(prompt)
+        max_wait = request["request_options"]["timeout"]
+        delay = RETRY_BASE_DELAY
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            call = llm_metrics.STORE.start_call(call_site, model_name, attempt=attempt)
+            trial = False
+            try:
+                trial = breaker.before_call()
+                limiter.acquire(estimated, max_wait)
+                response = client.generate_content(prompt, **request)
+            except Exception as e:
+                call.finish(error=e)
+                delay = cls._retry_delay(call_site, breaker, e, attempt, delay, trial=trial)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            usage = getattr(response, "usage_metadata", None)
+            limiter.settle(estimated, getattr(usage, "total_token_count", 0))
+            call.finish(usage=usage)
+            return response
+
+    @classmethod
+    def stream(cls, call_site: str, prompt: str, **overrides):
+        """
+        Streaming version of `generate`. Yields the text of each chunk as
+        soon as the model sends it.
+        """
+        client, request, model_name = cls._prepare(call_site, overrides)
+        limiter, breaker = cls._guards(model_name)
+        estimated = estimate_tokens(prompt)
+        max_wait = request["request_options"]["timeout"]
+        delay = RETRY_BASE_DELAY
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            call = llm_metrics.STORE.start_call(call_site, model_name, stream=True, attempt=attempt)
+            usage = None
+            yielded = False
+            trial = False
+            acquired = False
+            received = 0  # Characters handed out, to estimate usage when none was reported
+            try:
+                trial = breaker.before_call()
+                limiter.acquire(estimated, max_wait)
+                acquired = True
+                response = client.generate_content(prompt, stream=True, **request)
+                for chunk in response:
+                    # Usage totals arrive on the last chunk
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    # Chunks with no text parts (e.g. the final usage chunk) raise on .text
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        continue
+                    if text:
+                        call.first_token()
+                        yielded = True
+                        received += len(text)
+                        yield text
+                call.finish(usage=usage)
+            except Exception as e:
+                call.finish(usage=usage, error=e)
+                # Once text has been handed out, a retry would repeat it
+                delay = cls._retry_delay(call_site, breaker, e, attempt, delay, can_retry=not yielded, trial=trial)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            finally:
+                if not call.finished:
+                    # The caller stopped reading early; the model was answering fine
+                    call.finish(usage=usage, cancelled=True)
+                    breaker.record_success()
+                if acquired:
+                    # Also on errors and early closes, or the reservation never gets corrected.
+                    # A stream cut short has no usage totals, so count the prompt plus what arrived.
+                    actual = getattr(usage, "total_token_count", 0) or estimated + received // CHARS_PER_TOKEN
+                    limiter.settle(estimated, actual)
+            breaker.record_success()
+            return
+
+    @classmethod
+    def health(cls) -> dict:
+        """Returns the circuit breaker state of every model used so far."""
+        with cls._lock:
+            return {name: breaker.state for name, breaker in cls._breakers.items()}
+
+    @classmethod
+    def report_parse_failure(cls, call_site: str, count: int = 1, detail: str = ""):
+        """Records that a call site's response (or `count` items of it) could not be parsed."""
+        llm_metrics.STORE.record_parse_failure(call_site, cls.model_name(call_site), count, detail)
+
+    @classmethod
+    def report_validation(cls, call_site: str, prompt_version: str, checked: int, errors: list):
+        """
+        Records a schema check of `checked` questions from a call site's
+        response; `errors` holds the problem fields of each invalid one.
+        """
+        llm_metrics.STORE.record_validation(call_site, cls.model_name(call_site), prompt_version, checked, errors)
+
+    @classmethod
+    def Verify_Quiz(cls, questions: list, timeout: float = VERIFY_TIMEOUT_SECONDS) -> list:
+        """
+        Checks the answer key of every question before students are graded
+        against it. Uncached questions are checked concurrently on a shared
+        pool of VERIFY_WORKERS threads (see `_verify_answer_key`).
+
+        What the solver settled on is cached by question content (text and
+        options in any order, not the key), and each verdict is judged from
+        it against the current key. So re-served, pooled and shuffled copies
+        of a question are never solved twice, a key corrected after a check
+        re-checks from the cache, and identical checks running at once share
+        one call.
+
+        Args:
+            questions (list): Question dicts, or records with the same `.get`
+                (models/quiz_state.py).
+            timeout (float): Seconds to wait for the uncached checks. Checks
+                still running then count as "unverified" here; their verdicts
+                are cached when they finish.
+
+        Returns:
+            list: One verdict per question, in order: {"status": "verified" |
+            "corrected" | "disputed" | "unverified", "answer": the text of the
+            option the check settled on (or None), "method": "expression" |
+            "solver" (or None), "confidence": the solver's confidence}.
+        """
+        verdicts = [None] * len(questions)
+        futures = {}
+        for i, question in enumerate(questions):
+            options = [str(option) for option in question.get("options") or []]
+            key_index = question.get("correct_answer_index")
+            if not _keyable(question.get("question_text"), options, key_index):
+                verdicts[i] = _verdict("unverified")
+                continue
+            key = _solution_key(question.get("question_text"), options)
+            cached = VERDICT_CACHE.get(key)
+            if cached is not None:
+                verdicts[i] = _judge(cached, options, key_index)
+            else:
+                args = (key, question.get("question_text"), options, key_index)
+                futures[_VERIFY_POOL.submit(_check_answer_key, *args)] = i
+        if futures:
+            print(f"LOG: Verifying {len(futures)} answer keys ({len(questions) - len(futures)} cached)...")
+            done, _ = wait(futures, timeout=timeout)
+            for future, i in futures.items():
+                if future in done and future.exception() is None:
+                    verdicts[i] = future.result()
+                    continue
+                if future in done:
+                    print(f"ERROR: Answer-key check failed: {future.exception()}")
+                verdicts[i] = _verdict("unverified")
+        counts = {}
+        for verdict in verdicts:
+            counts[verdict["status"]] = counts.get(verdict["status"], 0) + 1
+        print(f"LOG: Answer keys checked: {counts}.")
+        return verdicts
+
+
+# --- 3. Answer-key Verification ---
+# An independent solver, which never sees the key, the hint or the
+# explanation, answers each question. When it also gives the answer as an
+# arithmetic expression, that expression is evaluated locally
+# (utils/safe_eval.py) and compared with every option, so numeric and
+# formula questions are settled deterministically.
+VERDICT_CACHE = TieredCache("verdicts", max_entries=4096, ttl_seconds=VERDICT_TTL_SECONDS)
+VERIFY_FLIGHTS = SingleFlight("verify")
+_VERIFY_POOL = ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix="verify")
+
+
+def _verdict(status: str, answer: str = None, method: str = None, confidence: float = None) -> dict:
+    return {"status": status, "answer": answer, "method": method, "confidence": confidence}
+
+
+def _solution_key(question_text, options: list) -> str:
+    """Cache key of a solution: the same question in any option order, whatever its key."""
+    return content_hash("answer-key", question_text, sorted(options))
+
+
+def _build_solver_prompt(question_text: str, options: list) -> str:
+    builder = PromptBuilder("verify", models.prompt_budget("verify"))
+    builder.add(f"""
+# ROLE & GOAL
+You are an expert GATE Computer Science (CSE) examiner. Solve the multiple-choice question below yourself, carefully and step by step, and pick the correct option.
+
+# QUESTION
+{question_text}
+
+# OPTIONS (0-based)
+""")
+    builder.add("".join(f"{i}: {option}\n" for i, option in enumerate(options)))
+    builder.add("""
+# OUTPUT FORMAT REQUIREMENTS
+Respond with a single JSON object:
+{"answer_index": 0, "confidence": 0.9, "expression": null}
+"answer_index" is the 0-based index of the correct option and "confidence" how sure you are, from 0 to 1.
+If the answer is a number or a formula, also give it in "expression" as one arithmetic expression that computes it, e.g. "2^(h+1) - 1" or "comb(6, 2) * 3". Use only numbers, the question's variable names, + - * / // % ^ and log, log2, log10, sqrt, factorial, comb, perm, min, max, ceil, floor. Do not evaluate it yourself. Otherwise set it to null.
+""")
+    return builder.build()
+
+
+def _keyable(question_text, options: list, key_index) -> bool:
+    return bool(question_text) and len(options) >= 2 and isinstance(key_index, int) and 0 <= key_index < len(options)
+
+
+def _solve(question_text: str, options: list) -> dict:
+    """
+    Has the solver answer one question. A numeric or formula answer whose
+    expression matches exactly one option settles it by local evaluation.
+    Raises if the solver call fails, so nothing is cached.
+
+    Returns:
+        dict: {"answer": the text of the chosen option (or None), "method":
+        "expression" | "solver", "confidence": the solver's confidence,
+        "solver_answer": the text of the option at its answer_index (or None)}.
+    """
+    response = models.generate("verify", _build_solver_prompt(question_text, options))
+    try:
+        solution = json.loads(response.text)
+        answer = solution.get("answer_index")
+        confidence = float(solution.get("confidence") or 0.0)
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        models.report_parse_failure("verify", detail="solver response was not a valid JSON object")
+        raise ValueError("Solver response was not a valid JSON object.")
+
+    method, chosen = "solver", answer if isinstance(answer, int) and 0 <= answer < len(options) else None
+    solver_answer = options[chosen] if chosen is not None else None
+    expression = solution.get("expression")
+    if isinstance(expression, str) and expression.strip():
+        # Local evaluation settles it when exactly one option has the expression's value
+        matches = [i for i, option in enumerate(options) if safe_eval.equivalent(option, expression)]
+        if len(matches) == 1:
+            method, chosen = "expression", matches[0]
+    return {
+        "answer": options[chosen] if chosen is not None else None,
+        "method": method,
+        "confidence": confidence,
+        "solver_answer": solver_answer,
+    }
 
-    def Genrate_Quiz():
-        pass
 
-    
-    def Verify_Quiz():
-        pass
+def _judge(solution: dict, options: list, key_index) -> dict:
+    """
+    The verdict on a key, given the solution. A "corrected" verdict replaces
+    the key at grading, so the evaluated expression must agree with the
+    solver's own answer_index (or come with CORRECTION_CONFIDENCE); a lone
+    expression against the key only makes it "disputed", as does a solver
+    that confidently disagrees with it.
+    """
+    answer, method, confidence = solution["answer"], solution["method"], solution["confidence"]
+    if answer not in options:
+        return _verdict("unverified", confidence=confidence)
+    if answer == options[key_index]:
+        return _verdict("verified", answer, method, confidence)
+    if method == "expression":
+        if answer == solution.get("solver_answer") or confidence >= CORRECTION_CONFIDENCE:
+            return _verdict("corrected", answer, method, confidence)
+        return _verdict("disputed", answer, method, confidence)
+    if confidence >= DISPUTE_CONFIDENCE:
+        return _verdict("disputed", answer, method, confidence)
+    return _verdict("unverified", answer, method, confidence)
 
-    
-    def Genrate_Notes():
-        # return the latex
-        pass
 
+def _check_answer_key(key: str, question_text: str, options: list, key_index) -> dict:
+    """Runs (or joins) the solving of one question, caches the solution and judges the key."""
+    def run():
+        solution = _solve(question_text, options)
+        VERDICT_CACHE.set(key, solution)
+        return solution
 
+    solution, _ = VERIFY_FLIGHTS.do(key, run)
+    return _judge(solution, options, key_index)
@@ -0,0 +1,83 @@
+import json
+
+# --- 1. Token Estimation ---
+# Gemini averages roughly 4 characters per token for English text. This is
+# only used for budgeting and logging, so a cheap local estimate is enough
+# (an exact count would cost an extra API round-trip per prompt).
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of `text`."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_json(value) -> str:
+    """JSON with no extra whitespace: the cheapest way to hand structured data to the model."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+# --- 2. The Builder ---
+class PromptBuilder:
+    """
+    Assembles a prompt from fixed text and lists of data items, and keeps
+    it under a token budget.
+
+    Fixed text (instructions, output format) is never cut. Item lists are
+    trimmed from the end, lowest priority first, until the prompt fits.
+    Each item list is rendered as a header followed by one compact JSON
+    line per item.
+    """
+
+    def __init__(self, name: str, budget_tokens: int):
+        self.name = name
+        self.budget_tokens = budget_tokens
+        self._parts = []  # ("text", str) or ("items", section dict)
+
+    def add(self, text: str):
+        """Adds fixed text that is always kept."""
+        self._parts.append(("text", text))
+        return self
+
+    def add_items(self, header: str, items: list, priority: int = 0, empty_text: str = "(none)"):
+        """
+        Adds a trimmable list of items. Higher `priority` survives longer.
+        Put the most important items first; trimming starts at the end.
+        """
+        lines = [compact_json(item) for item in items]
+        self._parts.append(("items", {
+            "header": header,
+            "lines": lines,
+            "priority": priority,
+            "empty_text": empty_text,
+            "tokens": [estimate_tokens(line) + 1 for line in lines],  # +1 for the newline
+        }))
+        return self
+
+    def build(self) -> str:
+        """Renders the prompt, trimming items to fit the budget, and logs its size."""
+        total = sum(estimate_tokens(part) for kind, part in self._parts if kind == "text")
+        sections = [part for kind, part in self._parts if kind == "items"]
+        total += sum(estimate_tokens(s["header"]) + sum(s["tokens"]) for s in sections)
+
+        trimmed = 0
+        for section in sorted(sections, key=lambda s: s["priority"]):
+            while total > self.budget_tokens and section["lines"]:
+                section["lines"].pop()
+                total -= section["tokens"].pop()
+                trimmed += 1
+
+        rendered = []
+        for kind, part in self._parts:
+            if kind == "text":
+                rendered.append(part)
+            else:
+                body = "\n".join(part["lines"]) if part["lines"] else part["empty_text"]
+                rendered.append(f"{part['header']}\n{body}\n")
+        prompt = "".join(rendered)
+
+        tokens = estimate_tokens(prompt)
+        note = f", trimmed {trimmed} items" if trimmed else ""
+        over = " (OVER BUDGET: fixed text alone is too long)" if tokens > self.budget_tokens else ""
+        print(f"LOG: Prompt '{self.name}' is ~{tokens} tokens (budget {self.budget_tokens}{note}){over}.")
+        return prompt
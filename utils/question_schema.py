@@ -0,0 +1,116 @@
+# --- 1. The Question Schema ---
+# What every quiz question must look like before a student sees it. Each
+# field maps to its rules; `compile_schema` turns them into plain check
+# functions once, at import, so validating a question is a loop over a few
+# precomputed closures instead of a walk over this dict.
+DIFFICULTIES = ("easy", "medium", "hard")
+
+QUESTION_SCHEMA = {
+    "question_text": {"type": str, "min_length": 1},
+    "options": {"type": list, "min_items": 2, "max_items": 6, "items": {"type": str, "min_length": 1}, "unique": True},
+    "correct_answer_index": {"type": int, "index_into": "options"},
+    "hint": {"type": str, "min_length": 1},
+    "explanation": {"type": str, "min_length": 1},
+    "tags": {
+        "type": dict,
+        "properties": {
+            "topic": {"type": str, "min_length": 1},
+            "difficulty": {"type": str, "one_of": DIFFICULTIES},
+            "cognitive_skill_tested": {"type": str, "min_length": 1},
+        },
+    },
+}
+
+
+# --- 2. The Compiler ---
+def _normalize(value, expected: type):
+    """Cheap fixes that never change meaning: trimmed strings, integer strings as ints."""
+    if isinstance(value, str):
+        value = value.strip()
+        if expected is int and value.lstrip("-").isdigit():
+            return int(value)
+    if expected is int and isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _compile_value(path: str, rules: dict):
+    """
+    Compiles the rules of one value into a function (value, parent) ->
+    (normalized value, errors). `parent` is the object holding the value,
+    for rules that look at a sibling (index_into).
+    """
+    expected = rules["type"]
+    type_name = expected.__name__
+    min_length = rules.get("min_length")
+    min_items, max_items = rules.get("min_items"), rules.get("max_items")
+    one_of = rules.get("one_of")
+    unique = rules.get("unique", False)
+    index_into = rules.get("index_into")
+    item_check = _compile_value(f"{path}[]", rules["items"]) if "items" in rules else None
+    properties = [(name, _compile_value(f"{path}.{name}", sub)) for name, sub in rules.get("properties", {}).items()]
+
+    def check(value, parent):
+        value = _normalize(value, expected)
+        # bool is an int subclass, but True is not an answer index
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            return value, [f"{path}: missing" if value is None else f"{path}: expected {type_name}, got {type(value).__name__}"]
+        errors = []
+        if min_length is not None and len(value) < min_length:
+            errors.append(f"{path}: empty")
+        if one_of is not None and value.lower() not in one_of:
+            errors.append(f"{path}: not one of {', '.join(one_of)}")
+        if item_check is not None:
+            items = []
+            for item in value:
+                item, item_errors = item_check(item, value)
+                items.append(item)
+                errors.extend(item_errors)
+            value = items
+        if min_items is not None and len(value) < min_items or max_items is not None and len(value) > max_items:
+            errors.append(f"{path}: needs {min_items} to {max_items} items")
+        if unique and len({str(v).lower() for v in value}) != len(value):
+            errors.append(f"{path}: duplicate items")
+        if index_into is not None:
+            siblings = parent.get(index_into)
+            if isinstance(siblings, list) and not 0 <= value < len(siblings):
+                errors.append(f"{path}: out of range for {len(siblings)} {index_into}")
+        for name, sub_check in properties:
+            sub_value, sub_errors = sub_check(value.get(name), value)
+            if name in value or sub_value is not None:
+                value[name] = sub_value
+            errors.extend(sub_errors)
+        return value, errors
+
+    return check
+
+
+def compile_schema(schema: dict):
+    """
+    Compiles an object schema into a validator: a function that takes a
+    dict, normalizes its fields in place and returns the list of problems
+    (empty if the object is valid). Problems read "field: what is wrong".
+    """
+    fields = [(name, _compile_value(name, rules)) for name, rules in schema.items()]
+
+    def validate(obj: dict) -> list:
+        if not isinstance(obj, dict):
+            return ["question: not an object"]
+        errors = []
+        for name, check in fields:
+            value, field_errors = check(obj.get(name), obj)
+            if name in obj or value is not None:
+                obj[name] = value
+            errors.extend(field_errors)
+        return errors
+
+    return validate
+
+
+# --- 3. Module-level Validator ---
+validate_question = compile_schema(QUESTION_SCHEMA)
+
+
+def error_fields(errors: list) -> list:
+    """The field paths of a validator's problems, e.g. "tags.topic", for counting failures per field."""
+    return [error.split(":", 1)[0] for error in errors]
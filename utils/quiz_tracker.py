@@ -0,0 +1,72 @@
+import os
+
+import streamlit.components.v1 as components
+
+# --- 1. Configuration ---
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_tracker_frontend")
+FLUSH_EVERY_QUESTIONS = 5      # Send a batch after this many question switches...
+FLUSH_INTERVAL_SECONDS = 60    # ...or on the first switch after this long
+
+_component = components.declare_component("quiz_tracker", path=FRONTEND_DIR)
+
+
+# --- 2. The Component ---
+def quiz_tracker(quiz_token: str, question_id: str, answer, hint_nonce: int, started_at: float,
+                 flush_token: str = None, key: str = "quiz_tracker"):
+    """
+    Renders the live quiz timer and tracks, in the browser, the focus time,
+    hint views and answer changes of each question.
+
+    The browser sends its totals only now and then (every
+    FLUSH_EVERY_QUESTIONS question switches or FLUSH_INTERVAL_SECONDS) and
+    at once when `flush_token` changes, so the server is not contacted per
+    question and timing does not depend on rerun latency.
+
+    Args:
+        quiz_token (str): Identifies the quiz attempt; totals are kept per token.
+        question_id (str): The question on screen.
+        answer: Its selected option index (or None).
+        hint_nonce (int): Incremented by the server whenever a hint is opened.
+        started_at (float): Quiz start time (epoch seconds), for the elapsed clock.
+        flush_token (str): Set to a new value to ask for a batch right away.
+
+    Returns:
+        dict: The latest batch: {"token", "seq", "ack", "questions": {question_id:
+        {"focus_ms", "hint_views", "answer_changes"}}}, or None before the first.
+    """
+    return _component(
+        quiz_token=quiz_token,
+        question_id=question_id,
+        answer=answer,
+        hint_nonce=hint_nonce,
+        started_at_ms=int(started_at * 1000),
+        flush_token=flush_token,
+        flush_every=FLUSH_EVERY_QUESTIONS,
+        flush_interval_ms=FLUSH_INTERVAL_SECONDS * 1000,
+        key=key,
+        default=None,
+    )
+
+
+def apply_batch(quiz, batch: dict) -> int:
+    """
+    Copies a batch's per-question totals (time spent, hint use, answer
+    changes) into the quiz (a models.quiz_state.QuizState). Batches carry
+    running totals, so applying one twice changes nothing.
+
+    Returns:
+        int: How many questions were updated.
+    """
+    updated = 0
+    for question_id, tracked in (batch.get("questions") or {}).items():
+        index = quiz.index_of(question_id)
+        if index is None:
+            continue
+        quiz.record_tracking(
+            index,
+            tracked.get("focus_ms", 0) / 1000.0,
+            tracked.get("hint_views", 0) > 0,
+            tracked.get("answer_changes", 0),
+        )
+        updated += 1
+    return updated
@@ -0,0 +1,71 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Server-side time spent rendering each part of a page, per interaction, so
+# a full script rerun can be compared with a fragment rerun.
+
+WINDOW = 500  # Most recent timings kept per kind
+
+
+class RenderTimings:
+    """Rolling per-kind render timings, shared by every session in the process."""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._samples = {}  # kind -> list of seconds, oldest first
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, seconds: float):
+        with self._lock:
+            samples = self._samples.setdefault(kind, [])
+            samples.append(seconds)
+            if len(samples) > self.window:
+                del samples[:len(samples) - self.window]
+
+    def record_since(self, kind: str, started: float):
+        """Records the time since `started` (a time.perf_counter() value)."""
+        self.record(kind, time.perf_counter() - started)
+
+    @contextmanager
+    def measure(self, kind: str):
+        """Times the block, including when it ends in an st.rerun()."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_since(kind, started)
+
+    def stats(self) -> list:
+        """Per kind: count and p50/p95/max in milliseconds."""
+        with self._lock:
+            snapshot = {kind: list(samples) for kind, samples in self._samples.items()}
+        rows = []
+        for kind, samples in sorted(snapshot.items()):
+            ms = np.array(samples) * 1000.0
+            rows.append({
+                "render": kind,
+                "count": len(ms),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "max_ms": round(float(ms.max()), 2),
+            })
+        return rows
+
+
+# --- Module-level Timings ---
+TIMINGS = RenderTimings()
+
+
+def measure(kind: str):
+    return TIMINGS.measure(kind)
+
+
+def record_since(kind: str, started: float):
+    TIMINGS.record_since(kind, started)
+
+
+def stats() -> list:
+    return TIMINGS.stats()
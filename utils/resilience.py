@@ -0,0 +1,190 @@
+import random
+import threading
+import time
+
+from google.api_core import exceptions as google_exceptions
+
+# --- 1. Configuration ---
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,   # 429: over quota
+    google_exceptions.TooManyRequests,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class RateLimitTimeout(RuntimeError):
+    """The rate limiter could not admit a call within its wait budget."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The backend is considered unhealthy; calls fail fast until the cooldown ends."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for quota and transient server/network errors, False for bad requests."""
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    return getattr(error, "code", None) in RETRYABLE_CODES
+
+
+# --- 2. Token Bucket ---
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens and refills at
+    `capacity / period` tokens per second. Callers take tokens before a
+    request and wait (outside the lock) when there are not enough.
+
+    The level may go negative through `debit`, e.g. when a response used
+    more tokens than estimated; later callers then wait for the refill.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float) -> float:
+        """Takes `amount` tokens if available. Returns 0, or the seconds to wait before trying again."""
+        amount = min(amount, self.capacity)  # An oversized request must still get through eventually
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._level >= amount:
+                self._level -= amount
+                return 0.0
+            return (amount - self._level) / self.rate
+
+    def debit(self, amount: float):
+        """Takes tokens without waiting (may go negative). A negative amount gives tokens back."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._level = min(self.capacity, self._level - amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for one model, shared
+    by every session in the process.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def acquire(self, estimated_tokens: int, max_wait: float):
+        """
+        Blocks until one request and `estimated_tokens` tokens are available.
+        Raises RateLimitTimeout if that would take longer than `max_wait` seconds.
+        """
+        deadline = time.monotonic() + max_wait
+        for bucket, amount in ((self.requests, 1), (self.tokens, estimated_tokens)):
+            while True:
+                wait = bucket.try_acquire(amount)
+                if wait == 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    if bucket is self.tokens:
+                        self.requests.debit(-1)  # Give the request slot back
+                    raise RateLimitTimeout(f"Rate limit: no capacity within {max_wait:.0f}s.")
+                time.sleep(wait)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Corrects the token bucket once the real usage of a call is known."""
+        if actual_tokens:
+            self.tokens.debit(actual_tokens - estimated_tokens)
+
+
+# --- 3. Circuit Breaker ---
+class CircuitBreaker:
+    """
+    Stops calling a backend that keeps failing.
+
+    closed: calls go through; `failure_threshold` consecutive retryable
+    failures open the circuit.
+    open: calls fail at once with CircuitOpenError for `cooldown` seconds.
+    half-open: after the cooldown one trial call goes through; success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """
+        Raises CircuitOpenError if the call should not be attempted.
+
+        Returns:
+            bool: True if this call is the half-open trial. If it then never
+            reaches the backend, hand the slot back with `cancel_trial`.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return False
+            if self.state == "open":
+                remaining = self._opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(f"'{self.name}' is unavailable; retrying in {remaining:.0f}s.")
+                self.state = "half-open"
+            if self._trial_running:
+                raise CircuitOpenError(f"'{self.name}' is recovering; a trial call is in flight.")
+            self._trial_running = True
+            return True
+
+    def cancel_trial(self):
+        """Frees the trial slot of a call that was stopped before it reached the backend."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                print(f"LOG: Circuit for '{self.name}' closed.")
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self, error: Exception):
+        """Counts retryable failures only; a bad request says nothing about backend health."""
+        with self._lock:
+            self._trial_running = False
+            if not is_retryable(error):
+                if self.state == "half-open":
+                    self.state = "closed"  # The backend answered, so it is up
+                    self._failures = 0
+                return
+            self._failures += 1
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"ERROR: Circuit for '{self.name}' opened after {self._failures} failures: {error}")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+# --- 4. Backoff ---
+def decorrelated_jitter(previous: float, base: float, cap: float) -> float:
+    """
+    Next retry delay: uniform between `base` and three times the previous
+    delay, capped. Spreads out clients that failed at the same moment
+    better than plain exponential backoff.
+    """
+    return min(cap, random.uniform(base, max(base, previous * 3)))
@@ -0,0 +1,161 @@
+import ast
+import math
+import operator
+
+# --- 1. Configuration ---
+# Deterministic evaluation of the small arithmetic expressions and formulas
+# that appear in numeric questions ("2^(h+1) - 1", "log2(1024) * 8").
+# Only numbers, a few operators, the functions below and single-word
+# variables are allowed; anything else is rejected before evaluation.
+MAX_EXPRESSION_CHARS = 200
+MAX_NODES = 100
+MAX_EXPONENT = 4096
+MAX_FACTORIAL = 500
+MAX_MAGNITUDE = 1e300
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+
+def _factorial(n):
+    if n != int(n) or not 0 <= n <= MAX_FACTORIAL:
+        raise ValueError("factorial argument out of range")
+    return math.factorial(int(n))
+
+
+def _int_args(fn):
+    def call(*args):
+        if any(a != int(a) or abs(a) > 10 * MAX_FACTORIAL for a in args):
+            raise ValueError(f"{fn.__name__} needs small integers")
+        return fn(*(int(a) for a in args))
+    return call
+
+
+FUNCTIONS = {
+    "log": math.log, "log2": math.log2, "log10": math.log10, "ln": math.log,
+    "sqrt": math.sqrt, "exp": math.exp, "ceil": math.ceil, "floor": math.floor,
+    "abs": abs, "min": min, "max": max,
+    "factorial": _factorial, "comb": _int_args(math.comb), "perm": _int_args(math.perm),
+}
+CONSTANTS = {"pi": math.pi, "e": math.e}
+
+# Formulas are compared by evaluating both sides at these fixed variable values
+SAMPLE_POINTS = (3, 5, 7, 11)
+REL_TOLERANCE = 1e-9
+
+
+# --- 2. Parsing ---
+def _parse(expression: str) -> ast.Expression:
+    """Parses an expression, accepting ^ for powers, and rejects anything outside the allowed subset."""
+    if not isinstance(expression, str) or not expression.strip() or len(expression) > MAX_EXPRESSION_CHARS:
+        raise ValueError("not a short expression")
+    text = expression.strip().replace("^", "**").replace("×", "*").replace("−", "-")
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"not an expression: {e.msg}") from None
+    nodes = list(ast.walk(tree))
+    if len(nodes) > MAX_NODES:
+        raise ValueError("expression too long")
+    for node in nodes:
+        if isinstance(node, (ast.Expression, ast.Load, ast.operator, ast.unaryop)):
+            continue
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            continue
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            continue
+        if isinstance(node, ast.Name):
+            continue
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+            continue
+        raise ValueError(f"'{type(node).__name__}' is not allowed")
+    return tree
+
+
+def variables(expression: str) -> set:
+    """The free variable names of an expression (functions and constants excluded)."""
+    tree = _parse(expression)
+    called = {node.func.id for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)} - called - set(CONSTANTS)
+
+
+# --- 3. Evaluation ---
+def _eval(node, names: dict):
+    if isinstance(node, ast.Expression):
+        return _eval(node.body, names)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id in names:
+            return names[node.id]
+        if node.id in CONSTANTS:
+            return CONSTANTS[node.id]
+        raise ValueError(f"unknown name '{node.id}'")
+    if isinstance(node, ast.UnaryOp):
+        return UNARY_OPERATORS[type(node.op)](_eval(node.operand, names))
+    if isinstance(node, ast.Call):
+        return FUNCTIONS[node.func.id](*(_eval(arg, names) for arg in node.args))
+    left, right = _eval(node.left, names), _eval(node.right, names)
+    if isinstance(node.op, ast.Pow) and (abs(right) > MAX_EXPONENT or abs(left) > MAX_MAGNITUDE):
+        raise ValueError("power too large")
+    value = BINARY_OPERATORS[type(node.op)](left, right)
+    if isinstance(value, complex) or abs(value) > MAX_MAGNITUDE:
+        raise ValueError("value out of range")
+    return value
+
+
+def evaluate(expression: str, names: dict = None):
+    """
+    Evaluates an arithmetic expression or formula.
+
+    Args:
+        expression (str): E.g. "2^(h+1) - 1" or "comb(5, 2) * log2(8)".
+        names (dict): Values of the variables it uses.
+
+    Returns:
+        The value (int or float).
+
+    Raises:
+        ValueError: If the expression is not in the allowed subset or cannot be evaluated.
+    """
+    tree = _parse(expression)
+    try:
+        return _eval(tree, names or {})
+    except (ArithmeticError, TypeError) as e:
+        raise ValueError(f"cannot evaluate: {e}") from None
+
+
+def _close(a, b) -> bool:
+    return math.isclose(a, b, rel_tol=REL_TOLERANCE, abs_tol=REL_TOLERANCE)
+
+
+def equivalent(expression_a: str, expression_b: str):
+    """
+    Whether two expressions have the same value: directly for numbers,
+    and at every one of a fixed set of sample points for formulas.
+
+    Returns:
+        True or False, or None if either side cannot be evaluated.
+    """
+    try:
+        free = sorted(variables(expression_a) | variables(expression_b))
+        if not free:
+            return _close(evaluate(expression_a), evaluate(expression_b))
+        for shift in range(len(SAMPLE_POINTS)):
+            # A different value per variable, so x*y and x^2 do not match by accident
+            names = {name: SAMPLE_POINTS[(shift + i) % len(SAMPLE_POINTS)] + i for i, name in enumerate(free)}
+            if not _close(evaluate(expression_a, names), evaluate(expression_b, names)):
+                return False
+        return True
+    except (ValueError, ArithmeticError):  # e.g. OverflowError comparing huge ints
+        return None
@@ -0,0 +1,100 @@
+import threading
+
+# Identical requests that arrive while the same work is already running wait
+# for that run and share its result, instead of each starting their own.
+
+
+class Flight:
+    """One in-flight call that any number of callers can wait on."""
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.followers = 0
+        self._done = threading.Event()
+
+    def resolve(self, result=None, error: Exception = None):
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None):
+        """Blocks until the call finishes. Returns its result or raises its error."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Timed out waiting for an identical in-flight request.")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls by key, across every session of the server
+    process.
+
+    The first caller for a key (the leader) does the work; callers that
+    arrive before it finishes (followers) wait and get the same result, or
+    the same exception. Nothing is kept once the call finishes; caching
+    results is a separate concern.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "followers": 0}
+
+    def begin(self, key):
+        """
+        Joins the flight for `key`, starting one if there is none.
+
+        Returns:
+            tuple: (Flight, is_leader). A leader must call `end` exactly once.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self._stats["followers"] += 1
+                return flight, False
+            flight = Flight()
+            self._flights[key] = flight
+            self._stats["leaders"] += 1
+            return flight, True
+
+    def end(self, key, flight: Flight, result=None, error: Exception = None):
+        """Publishes the leader's outcome to its followers and closes the flight."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if flight.followers:
+            print(f"LOG: '{self.name}' request shared with {flight.followers} identical concurrent request(s).")
+        flight.resolve(result, error)
+
+    def do(self, key, fn):
+        """
+        Runs `fn()` unless an identical call is already running, in which
+        case it waits for that one.
+
+        Returns:
+            tuple: (result, shared). `shared` is True for followers.
+        """
+        flight, leader = self.begin(key)
+        if not leader:
+            return flight.wait(), True
+        try:
+            result = fn()
+        except Exception as e:
+            self.end(key, flight, error=e)
+            raise
+        self.end(key, flight, result=result)
+        return result, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._flights)
+        return stats